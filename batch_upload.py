@@ -0,0 +1,425 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from dailymotion_api import DailymotionAPI
+from upload_index import UploadIndex
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi', '.webm', '.m4v')
+
+# Lấy số tập từ tên file (giống dialog playlist). Không có số trơn: số như
+# 1080p, 2024 trong tên file không phải số tập
+EPISODE_PATTERNS = [
+    r"part\s*(\d+)",
+    r"tập\s*(\d+)",
+    r"episode\s*(\d+)",
+    r"ep\s*(\d+)",
+    r"第\s*(\d+)\s*集",
+    r"(\d+)\s*集",
+]
+
+
+class UploadJournal:
+    """Nhật ký upload theo file (JSON), ghi atomic sau mỗi lần đổi stage
+
+    Stage của mỗi file: pending → uploaded → created → published (hoặc failed).
+    Batch bị ngắt (tắt máy, crash) thì lần chạy sau đọc journal và làm tiếp
+    từ stage đã ghi, không upload lại file đã xong.
+    """
+
+    def __init__(self, path: str, save_interval: float = 2.0):
+        """
+        Args:
+            path: File journal
+            save_interval: Khoảng cách tối thiểu (giây) giữa 2 lần ghi do cập nhật
+                tiến trình upload (đổi stage luôn ghi ngay)
+        """
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.entries = data.get('files', {}) if isinstance(data, dict) else {}
+            except (OSError, ValueError) as e:
+                raise Exception(f"Lỗi khi đọc journal {path}: {e}")
+
+    def get(self, key: str) -> Dict:
+        with self._lock:
+            return dict(self.entries.get(key) or {})
+
+    def update(self, key: str, force_save: bool = True, **fields):
+        with self._lock:
+            entry = self.entries.setdefault(key, {})
+            entry.update(fields)
+            entry['updated'] = time.time()
+            if force_save or time.monotonic() - self._last_save >= self.save_interval:
+                self._save_locked()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        # Ghi file tạm rồi replace để crash giữa chừng không làm hỏng journal
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+
+
+class BatchUploader:
+    """Upload cả bộ phim (thư mục hoặc manifest) lên Dailymotion
+
+    - N file upload song song; create_video + get_video_info chạy trên pool
+      riêng ngay khi từng file upload xong (pipeline)
+    - Mỗi file ghi stage vào UploadJournal; chạy lại sẽ bỏ qua file đã xong và
+      upload tiếp (resumable) file đang dở
+    - Cuối batch ghi toàn bộ video vào Google Sheet bằng 1 request
+    """
+
+    def __init__(self, api: DailymotionAPI, journal_path: str = "upload_journal.json",
+                 sheet_manager=None, upload_workers: int = 3, publish_workers: int = 2,
+                 log_callback=None):
+        """
+        Args:
+            api: DailymotionAPI (dùng chung session, rate limit, token)
+            journal_path: File journal
+            sheet_manager: GoogleSheetManager để ghi kết quả (None = không ghi sheet)
+            upload_workers: Số file upload đồng thời
+            publish_workers: Số luồng create/publish video
+            log_callback: Callback log
+        """
+        self.api = api
+        self.journal = UploadJournal(journal_path)
+        self.sheet_manager = sheet_manager
+        self.upload_workers = upload_workers
+        self.publish_workers = publish_workers
+        self.log_callback = log_callback
+
+    def _log(self, msg: str):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    # ------------------------------------------------------------------
+    # Danh sách file
+    # ------------------------------------------------------------------
+    @staticmethod
+    def load_items(source: str, film_name: str = None) -> List[Dict]:
+        """Đọc danh sách file cần upload từ thư mục hoặc manifest JSON
+
+        Manifest: list [{file, film_name?, episode?, title?, description?}] hoặc
+        {"film_name": ..., "items": [...]}. Đường dẫn file tương đối tính theo
+        thư mục chứa manifest.
+
+        Returns:
+            List dict {file, film_name, episode, title, description}, sort theo tập
+        """
+        items = []
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    items.append({'file': os.path.join(source, name)})
+            base_dir = source
+            default_film = film_name or os.path.basename(os.path.abspath(source))
+        else:
+            try:
+                with open(source, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                raise Exception(f"Lỗi khi đọc manifest {source}: {e}")
+            if isinstance(manifest, dict):
+                film_name = film_name or manifest.get('film_name')
+                manifest = manifest.get('items', [])
+            items = [dict(m) if isinstance(m, dict) else {'file': m} for m in manifest]
+            base_dir = os.path.dirname(os.path.abspath(source))
+            default_film = film_name or "Không tên"
+
+        for item in items:
+            path = item['file']
+            if not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+            item['file'] = os.path.abspath(path)
+            item['film_name'] = item.get('film_name') or default_film
+            if not item.get('episode'):
+                item['episode'] = BatchUploader._episode_from_name(item['file'])
+            if not item.get('title'):
+                item['title'] = (f"Tập {item['episode']} - {item['film_name']}"
+                                 if item['episode'] != '' else item['film_name'])
+            item.setdefault('description', "")
+
+        items.sort(key=lambda x: (x['film_name'], BatchUploader._episode_sort_key(x['episode']), x['file']))
+        return items
+
+    @staticmethod
+    def _episode_sort_key(episode) -> tuple:
+        """Tập số sort theo số, tập chữ ("FULL", "SP") xếp sau theo chữ"""
+        text = str(episode if episode is not None else '').strip()
+        return (0, int(text)) if text.isdigit() else (1, text)
+
+    @staticmethod
+    def _episode_from_name(path: str):
+        """Số tập trong tên file, '' nếu không khớp mẫu nào (để trống tập)"""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for p in EPISODE_PATTERNS:
+            m = re.search(p, stem, re.IGNORECASE)
+            if m:
+                return int(m.group(1))
+        return ''
+
+    # ------------------------------------------------------------------
+    # Pipeline
+    # ------------------------------------------------------------------
+    def run(self, items: List[Dict], username: str = None, channel_id: str = None,
+            private: bool = True) -> Dict:
+        """Chạy batch
+
+        Returns:
+            dict {published: [...], failed: [{file, error}], skipped, sheet_rows}
+        """
+        self.username = username
+        self.channel_id = channel_id
+        self.private = private
+
+        to_upload, to_publish, skipped, failed = [], [], 0, []
+        for item in items:
+            try:
+                entry = self._prepare_entry(item)
+            except FileNotFoundError as e:
+                failed.append({'file': item['file'], 'error': str(e)})
+                self._log(f"  ❌ {e}")
+                continue
+            if entry['stage'] == 'published':
+                skipped += 1
+            elif entry['stage'] in ('uploaded', 'created'):
+                to_publish.append(item)
+            else:
+                to_upload.append(item)
+
+        self._log(
+            f"🚀 Batch: {len(items)} file, {len(to_upload)} cần upload, "
+            f"{len(to_publish)} cần publish, {skipped} đã xong"
+        )
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix="upload") as up_pool, \
+                ThreadPoolExecutor(max_workers=self.publish_workers, thread_name_prefix="publish") as pub_pool:
+            publish_futures = {pub_pool.submit(self._publish_stage, it): it for it in to_publish}
+            upload_futures = {up_pool.submit(self._upload_stage, it): it for it in to_upload}
+
+            # File nào upload xong thì đưa sang publish ngay, không chờ cả batch
+            for future in as_completed(upload_futures):
+                item = upload_futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(self._mark_failed(item, e))
+                    continue
+                publish_futures[pub_pool.submit(self._publish_stage, item)] = item
+
+            for future in as_completed(publish_futures):
+                item = publish_futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(self._mark_failed(item, e))
+
+        sheet_rows = self._write_sheet(items)
+        published = [
+            self.journal.get(it['file']) for it in items
+            if self.journal.get(it['file']).get('stage') == 'published'
+        ]
+        self._log(
+            f"✅ Batch xong trong {time.monotonic() - started:.0f}s: {len(published)} video, "
+            f"{len(failed)} lỗi, ghi {sheet_rows} dòng vào sheet"
+        )
+        return {'published': published, 'failed': failed, 'skipped': skipped,
+                'sheet_rows': sheet_rows}
+
+    def _prepare_entry(self, item: Dict) -> Dict:
+        """Đồng bộ journal với file hiện tại (file đổi nội dung → làm lại từ đầu)
+
+        Upload lỗi giữa chừng vẫn giữ resume_state để lần sau upload tiếp; state
+        chỉ bị bỏ khi server từ chối session (4xx) hoặc session hết hạn
+        (xử lý trong ChunkedUploader / upload_video_file).
+        """
+        path = item['file']
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File không tồn tại: {path}")
+        size = os.path.getsize(path)
+        mtime = int(os.path.getmtime(path))
+        entry = self.journal.get(path)
+        changed = entry.get('size') != size or entry.get('mtime') != mtime
+        if changed:
+            entry = {'stage': 'pending', 'size': size, 'mtime': mtime, 'resume_state': {}}
+        elif entry.get('stage') == 'failed' and not entry.get('file_url'):
+            entry['stage'] = 'pending'
+        elif entry.get('stage') == 'failed':
+            # Upload đã xong, lỗi ở bước publish → publish lại
+            entry['stage'] = 'created' if entry.get('video_id') else 'uploaded'
+        entry.update({
+            'film_name': item['film_name'],
+            'episode': item['episode'],
+            'title': item['title'],
+        })
+        self.journal.update(path, **entry)
+        return entry
+
+    def _upload_stage(self, item: Dict):
+        path = item['file']
+        entry = self.journal.get(path)
+        resume_state = entry.get('resume_state') or {}
+        name = os.path.basename(path)
+
+        # File trùng nội dung với video đã upload → bỏ qua upload, chỉ lấy info
+        existing = self.api.find_uploaded_video(path)
+        if existing:
+            self.journal.update(path, stage='created', video_id=existing.get('id'),
+                                duplicate=True, resume_state={})
+            self._log(f"♻️ {name} đã được upload trước đó ({existing.get('id')}), bỏ qua")
+            return
+
+        self._log(f"📤 Upload {name}...")
+
+        def on_progress(info):
+            # Lưu vị trí đã upload để lần chạy sau upload tiếp
+            self.journal.update(path, force_save=False, resume_state=dict(resume_state),
+                                progress=round(info['percent'], 1))
+
+        try:
+            result = self.api.upload_video_file(path, username=self.username,
+                                                resume_state=resume_state, on_progress=on_progress)
+        except Exception:
+            # Lưu vị trí cuối cùng (hoặc state rỗng nếu session bị từ chối) cho lần chạy sau
+            self.journal.update(path, resume_state=dict(resume_state))
+            raise
+        file_url = result.get('url')
+        if not file_url:
+            raise Exception("Không lấy được video URL sau khi upload")
+        self.journal.update(path, stage='uploaded', file_url=file_url, resume_state={},
+                            progress=100.0)
+        self._log(f"  ✅ Upload xong {name}")
+
+    def _publish_stage(self, item: Dict):
+        path = item['file']
+        entry = self.journal.get(path)
+        video_id = entry.get('video_id')
+        if entry.get('stage') == 'uploaded' or not video_id:
+            video = self.api.create_video(
+                video_url=entry['file_url'],
+                title=item['title'],
+                description=item.get('description', ""),
+                username=self.username,
+                channel_id=self.channel_id,
+                private=self.private,
+            )
+            video_id = video.get('id')
+            if not video_id:
+                raise Exception("Không tạo được video")
+            self.journal.update(path, stage='created', video_id=video_id)
+
+        info = self.api.get_video_info(video_id)
+        video = {
+            'video_id': video_id,
+            'title': info.get('title') or item['title'],
+            'url': info.get('url'),
+            'embed_url': info.get('embed_url'),
+            'thumbnail_url': info.get('thumbnail_url'),
+            'private': info.get('private'),
+        }
+        if self.api.upload_index:
+            self.api.upload_index.record(self.api.upload_index.fingerprint_file(path), video, path)
+        self.journal.update(path, stage='published', error=None, video=video)
+        self._log(f"  🎬 {item['title']} → {video_id}")
+
+    def _mark_failed(self, item: Dict, error: Exception) -> Dict:
+        self.journal.update(item['file'], stage='failed', error=str(error))
+        self._log(f"  ❌ {os.path.basename(item['file'])}: {error}")
+        return {'file': item['file'], 'error': str(error)}
+
+    def _write_sheet(self, items: List[Dict]) -> int:
+        """Ghi các video đã publish (chưa ghi) vào sheet bằng 1 request"""
+        if not self.sheet_manager:
+            return 0
+        pending = []
+        for item in items:
+            entry = self.journal.get(item['file'])
+            if entry.get('stage') == 'published' and not entry.get('sheet_written'):
+                pending.append((item, entry))
+        if not pending:
+            return 0
+        records = [
+            {'film_name': item['film_name'], 'episode_number': item['episode'],
+             'video_data': entry['video']}
+            for item, entry in pending
+        ]
+        try:
+            stats = self.sheet_manager.upsert_video_records(records)
+        except Exception as e:
+            # Giữ sheet_written=False để lần chạy sau ghi lại
+            self._log(f"⚠️ Lỗi khi ghi sheet: {e}")
+            return 0
+        for item, _ in pending:
+            self.journal.update(item['file'], force_save=False, sheet_written=True)
+        self.journal.save()
+        return stats['appended'] + stats['updated']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload cả bộ phim lên Dailymotion")
+    parser.add_argument("source", help="Thư mục chứa file video hoặc manifest JSON")
+    parser.add_argument("--film", help="Tên bộ phim (mặc định: tên thư mục / manifest)")
+    parser.add_argument("--config", default="config.json", help="File cấu hình của app")
+    parser.add_argument("--journal", default="upload_journal.json")
+    parser.add_argument("--index", default="upload_index.json",
+                        help="Chỉ mục nội dung file đã upload (bỏ qua file trùng)")
+    parser.add_argument("--workers", type=int, default=3, help="Số file upload đồng thời")
+    parser.add_argument("--publish-workers", type=int, default=2)
+    parser.add_argument("--username", help="Username/Partner ID")
+    parser.add_argument("--channel", help="Channel ID")
+    parser.add_argument("--public", action="store_true", help="Publish ở chế độ public")
+    parser.add_argument("--max-bandwidth", type=float, help="Giới hạn upload (MB/s)")
+    parser.add_argument("--no-sheet", action="store_true", help="Không ghi Google Sheet")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        cfg = json.load(f)
+
+    api = DailymotionAPI(
+        cfg.get("api_key", ""), cfg.get("api_secret", ""), log_callback=print,
+        pool_size=max(10, args.workers + args.publish_workers),
+        token_cache_path="tokens/dailymotion_token.json",
+        upload_bandwidth=args.max_bandwidth * 1048576 if args.max_bandwidth else None,
+        upload_index=UploadIndex(args.index),
+    )
+
+    sheet_manager = None
+    if not args.no_sheet and cfg.get("google_credentials_path") and cfg.get("sheet_id"):
+        from google_sheet import GoogleSheetManager
+        sheet_manager = GoogleSheetManager(credentials_path=cfg["google_credentials_path"],
+                                           log_callback=print)
+        sheet_manager.authenticate()
+        sheet_manager.open_by_id(cfg["sheet_id"], cfg.get("sheet_name") or None)
+
+    uploader = BatchUploader(api, journal_path=args.journal, sheet_manager=sheet_manager,
+                             upload_workers=args.workers, publish_workers=args.publish_workers,
+                             log_callback=print)
+    items = BatchUploader.load_items(args.source, film_name=args.film)
+    result = uploader.run(items, username=args.username, channel_id=args.channel,
+                          private=not args.public)
+    api.upload_index.close()
+    api.close()
+    return 1 if result['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark build_export() (export_sheet_to_json.py) trên dữ liệu giả lập
+
+Sinh N dòng giống Sheet4 (nhiều phim, tập trùng, dòng banner, link Facebook,
+tập FULL, ...) rồi đo thời gian chuyển đổi ở nhiều kích thước. Thời gian /
+dòng gần như không đổi khi N tăng = chạy tuyến tính.
+
+Đo thêm kích thước search_index (bản thu gọn, xem build_search_index()) với
+tên phim giống thật (tiếng Việt, phiên âm dài, chữ Hán): vượt
+--max-search-bytes byte / phim thì thoát với mã lỗi 1.
+
+    python benchmark_export.py
+    python benchmark_export.py --sizes 1000 10000 50000 --repeat 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List
+
+from export_sheet_to_json import build_export, build_search_index
+
+HEADERS = ['Tên Bộ Phim', 'Số Tập', 'Tiêu Đề Phim', 'Link Dailymotion', 'Embed URL',
+           'Ngày Upload', 'Tên Phim Việt', 'Tóm tắt phim', 'TOP', 'Poster URL', 'Năm',
+           'Thể loại', 'Quốc gia', 'Xem PC', 'Banner', 'Shopee Link']
+# Từ để ghép tên phim giống thật: tiếng Việt, phiên âm dài, chữ Hán
+VIET_WORDS = ['Thần', 'Võ', 'Đại', 'Đạo', 'Kiếm', 'Tiên', 'Nghịch', 'Thiên', 'Tà', 'Đế',
+              'Vạn', 'Giới', 'Độc', 'Tôn', 'Truyền', 'Thuyết', 'Phong', 'Vân', 'Huyết', 'Long']
+LONG_WORDS = ['Doupocangqiong', 'Wanjiexianzong', 'Xianwudizun', 'Shenmuchronicles', 'Tunshixingkong']
+HAN_CHARS = '斗破苍穹万界仙踪武神主宰完美世界吞噬星空遮天凡人修仙传'
+
+
+def film_name(film: int) -> Dict[str, str]:
+    """Tên phim giả lập (cố định theo số phim) cho cột Tên Bộ Phim / Tên Phim Việt"""
+    rnd = random.Random(film)
+    viet = ' '.join(rnd.choice(VIET_WORDS) for _ in range(rnd.randint(2, 6)))
+    if film % 3 == 0:
+        name = viet
+    elif film % 3 == 1:
+        name = f"{rnd.choice(LONG_WORDS)} {rnd.choice(['Season', 'Phần'])}"
+    else:
+        name = ''.join(rnd.choice(HAN_CHARS) for _ in range(rnd.randint(2, 6)))
+    return {'name': f"{name} {film}", 'viet': f"{viet} {film}"}
+
+
+def make_rows(n: int, seed: int = 0, episodes_per_film: int = 60) -> List[Dict]:
+    """N dòng giả lập theo cấu trúc get_all_records() của Sheet4"""
+    rnd = random.Random(seed)
+    films = max(1, n // episodes_per_film)
+    rows = []
+    for i in range(n):
+        row = dict.fromkeys(HEADERS, '')
+        if rnd.random() < 0.03:
+            # Dòng banner không gắn phim (có thể trùng URL)
+            row['Banner'] = f"https://cdn.example.com/banner/{rnd.randrange(max(1, n // 20))}.jpg"
+            rows.append(row)
+            continue
+        film = rnd.randrange(films)
+        ep = rnd.randrange(1, episodes_per_film + 1)
+        vid = f"x{i:07x}"
+        names = film_name(film)
+        row['Tên Bộ Phim'] = names['name']
+        row['Số Tập'] = rnd.choice([ep, f"Tập {ep}", 'FULL']) if rnd.random() < 0.02 else rnd.choice([ep, f"Tập {ep}"])
+        row['Tiêu Đề Phim'] = f"Tập {ep} - {names['name']}"
+        if rnd.random() < 0.05:
+            row['Link Dailymotion'] = f"https://www.facebook.com/reel/{i}"
+        elif rnd.random() < 0.9:
+            row['Link Dailymotion'] = f"https://www.dailymotion.com/video/{vid}"
+        if rnd.random() < 0.8:
+            row['Embed URL'] = f"https://www.dailymotion.com/embed/video/{vid}"
+        if rnd.random() < 0.7:
+            row['Ngày Upload'] = f"2025-01-{1 + i % 28:02d} 10:00:00"
+        if rnd.random() < 0.1:
+            row['Tên Phim Việt'] = names['viet']
+            row['Tóm tắt phim'] = f"Tóm tắt phim {film} " * 5
+            row['Poster URL'] = f"https://cdn.example.com/poster/{film}.jpg"
+            row['Năm'] = 2020 + film % 6
+            row['Thể loại'] = rnd.choice(['Ngôn tình', 'Cổ trang', 'Hành động'])
+            row['Quốc gia'] = 'Trung Quốc'
+        if rnd.random() < 0.05:
+            row['TOP'] = rnd.randrange(1, 50)
+        if rnd.random() < 0.05:
+            row['Xem PC'] = 'TRUE'
+        if rnd.random() < 0.05:
+            row['Banner'] = f"https://cdn.example.com/banner/{rnd.randrange(max(1, n // 20))}.jpg"
+        if rnd.random() < 0.2:
+            row['Shopee Link'] = f"https://s.shopee.vn/{rnd.randrange(1000)}"
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build_export()")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-search-bytes", type=int, default=512,
+                        help="Giới hạn search_index (bản thu gọn) tính theo byte / phim")
+    args = parser.parse_args()
+
+    print(f"{'Dòng':>8} {'Phim':>6} {'Thời gian':>11} {'µs/dòng':>9} {'JSON':>10} {'Tìm kiếm':>10}")
+    too_big = []
+    for n in args.sizes:
+        rows = make_rows(n)
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            output = build_export(rows, updated='benchmark')
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        size = len(json.dumps(output, ensure_ascii=False, indent=2).encode('utf-8'))
+        search = build_search_index(output['movies'])
+        search_size = len(json.dumps(search, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        print(f"{n:>8} {len(output['movies']):>6} {best * 1000:>9.1f}ms "
+              f"{best / n * 1e6:>9.2f} {size / 1024:>8.0f}KB {search_size / 1024:>8.1f}KB")
+        if search_size > args.max_search_bytes * max(1, len(output['movies'])):
+            too_big.append(n)
+
+    if too_big:
+        print(f"❌ search_index vượt {args.max_search_bytes} byte / phim ở {too_big} dòng")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
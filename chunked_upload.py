@@ -0,0 +1,345 @@
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import requests
+
+
+class BandwidthLimiter:
+    """Giới hạn tốc độ upload (bytes/giây), dùng chung được cho nhiều upload song song"""
+
+    def __init__(self, max_bytes_per_sec: float):
+        self.rate = float(max_bytes_per_sec)
+        self._next_free = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        """Chờ (nếu cần) để gửi thêm nbytes mà không vượt quá rate"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + nbytes / self.rate
+            # Cho phép burst tối đa ~1 giây để không ngủ quá nhiều lần nhỏ
+            wait = start - now - 1.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _FileSliceReader:
+    """File-like đọc 1 đoạn [start, start+length) của file theo block nhỏ
+
+    Có __len__ nên requests gửi kèm Content-Length (không dùng chunked encoding)
+    và không bao giờ đọc cả file vào bộ nhớ. Mỗi block đọc ra được báo tiến
+    trình + đi qua bandwidth limiter.
+    """
+
+    def __init__(self, f, start: int, length: int, on_read: Callable[[int], None],
+                 prefix: bytes = b"", suffix: bytes = b""):
+        self._f = f
+        self._start = start
+        self._length = length
+        self._on_read = on_read
+        self._prefix = prefix
+        self._suffix = suffix
+        self._pos = 0  # vị trí trong phần file
+        self._f.seek(start)
+
+    def __len__(self):
+        return len(self._prefix) + self._length + len(self._suffix)
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefix:
+            data, self._prefix = self._prefix, b""
+            return data
+        remaining = self._length - self._pos
+        if remaining > 0:
+            if size is None or size < 0 or size > remaining:
+                size = remaining
+            data = self._f.read(size)
+            if not data:
+                raise IOError("File bị thay đổi trong lúc upload")
+            self._pos += len(data)
+            self._on_read(len(data))
+            return data
+        data, self._suffix = self._suffix, b""
+        return data
+
+
+class ChunkedUploader:
+    """Upload file video lên upload server của Dailymotion theo từng chunk
+
+    - Đọc file theo chunk cố định (stream từ đĩa, không load cả file vào RAM)
+    - Mỗi chunk gửi kèm Content-Range + Session-ID (giao thức resumable của
+      upload server); server trả 201 + các range đã nhận cho tới chunk cuối
+    - Lỗi mạng / 5xx / 429: chờ backoff rồi gửi tiếp từ byte cuối cùng server
+      đã xác nhận, không gửi lại từ đầu
+    - Server không hỗ trợ chunk → fallback multipart/form-data (vẫn stream)
+    - Báo tiến trình theo byte + tốc độ, giới hạn băng thông tùy chọn
+    """
+
+    DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+    # Status cho thấy upload server không hỗ trợ upload theo chunk
+    UNSUPPORTED_STATUSES = (400, 404, 405, 411, 415, 501)
+    # Upload URL chỉ dùng được trong thời gian giới hạn: quá hạn thì không resume nữa
+    SESSION_TTL = 24 * 3600
+
+    def __init__(self, session: requests.Session, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_bandwidth: float = None, bandwidth_limiter: BandwidthLimiter = None,
+                 max_retries: int = 5, backoff: Callable[[int], float] = None,
+                 timeout=(30, 120), log_callback=None,
+                 progress_callback: Callable[[str], None] = None,
+                 on_progress: Callable[[Dict], None] = None,
+                 progress_interval: float = 1.0):
+        """
+        Args:
+            session: Session HTTP (dùng chung connection pool với API client)
+            chunk_size: Kích thước mỗi chunk (byte)
+            max_bandwidth: Giới hạn tốc độ upload (byte/giây), None = không giới hạn
+            bandwidth_limiter: Limiter dùng chung nhiều upload (ưu tiên hơn max_bandwidth)
+            max_retries: Số lần thử lại liên tiếp tối đa khi không có tiến triển
+            backoff: Hàm attempt -> số giây chờ trước khi thử lại
+            timeout: Timeout (connect, read) cho mỗi chunk
+            log_callback: Callback log
+            progress_callback: Nhận chuỗi mô tả tiến trình (như upload_and_publish)
+            on_progress: Nhận dict {bytes_sent, total_bytes, percent, speed, eta}
+            progress_interval: Khoảng thời gian tối thiểu (giây) giữa 2 lần báo tiến trình
+        """
+        self.session = session
+        self.chunk_size = max(256 * 1024, int(chunk_size))
+        self.bandwidth = bandwidth_limiter or (
+            BandwidthLimiter(max_bandwidth) if max_bandwidth else None
+        )
+        self.max_retries = max_retries
+        self.backoff = backoff or (lambda attempt: min(60.0, 2.0 ** attempt))
+        self.timeout = timeout
+        self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._reset_progress(0, 0)
+
+    # ------------------------------------------------------------------
+    # Tiến trình
+    # ------------------------------------------------------------------
+    def _reset_progress(self, total: int, acked: int):
+        self.total_bytes = total
+        self.bytes_sent = acked
+        self.started_at = time.monotonic()
+        self._start_bytes = acked
+        self._last_report = 0.0
+
+    def _on_read(self, nbytes: int):
+        if self.bandwidth:
+            self.bandwidth.consume(nbytes)
+        self.bytes_sent += nbytes
+        self._report()
+
+    def _rewind(self, offset: int):
+        """Quay lại byte đã được server xác nhận (phần đang gửi dở bị bỏ)"""
+        self.bytes_sent = offset
+
+    def get_progress(self) -> Dict:
+        elapsed = max(1e-6, time.monotonic() - self.started_at)
+        speed = max(0, self.bytes_sent - self._start_bytes) / elapsed
+        remaining = max(0, self.total_bytes - self.bytes_sent)
+        return {
+            'bytes_sent': self.bytes_sent,
+            'total_bytes': self.total_bytes,
+            'percent': 100.0 * self.bytes_sent / self.total_bytes if self.total_bytes else 100.0,
+            'speed': speed,  # byte/giây
+            'eta': remaining / speed if speed > 0 else None,
+        }
+
+    def _report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        info = self.get_progress()
+        if self.on_progress:
+            self.on_progress(info)
+        if self.progress_callback:
+            eta = f", còn ~{int(info['eta'])}s" if info['eta'] is not None else ""
+            self.progress_callback(
+                f"📤 {info['percent']:.1f}% ({info['bytes_sent'] / 1048576:.1f}/"
+                f"{info['total_bytes'] / 1048576:.1f} MB) - "
+                f"{info['speed'] / 1048576:.2f} MB/s{eta}"
+            )
+
+    def _log(self, msg: str):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    # ------------------------------------------------------------------
+    # Upload
+    # ------------------------------------------------------------------
+    def upload(self, file_path: str, upload_url: str, state: Dict = None) -> Dict:
+        """Upload file, trả về JSON của upload server (có 'url')
+
+        Args:
+            file_path: File video
+            upload_url: URL lấy từ /file/upload (đã có /-1)
+            state: Dict trạng thái resumable (upload_url, session_id, offset, size,
+                mtime, started_at) - được cập nhật sau mỗi chunk. Lưu dict này lại
+                (vd: journal) và truyền vào lần sau để upload tiếp file đang dở.
+                Server từ chối session (4xx) thì dict bị xóa rỗng.
+        """
+        size = os.path.getsize(file_path)
+        mtime = int(os.path.getmtime(file_path))
+        if state is None:
+            state = {}
+        # Chỉ resume nếu cùng file (size + mtime) và cùng upload URL
+        if (state.get('upload_url') != upload_url or state.get('size') != size
+                or state.get('mtime') != mtime or not state.get('session_id')):
+            state.clear()
+            state.update({
+                'upload_url': upload_url,
+                'session_id': uuid.uuid4().hex,
+                'offset': 0,
+                'size': size,
+                'mtime': mtime,
+                'started_at': time.time(),
+            })
+        elif state.get('offset'):
+            self._log(f"↩️ Upload tiếp từ byte {state['offset']}/{size}")
+
+        self._reset_progress(size, state['offset'])
+        result = self._upload_chunks(file_path, state)
+        if result is None:
+            self._log("⚠️ Upload server không hỗ trợ upload theo chunk, chuyển sang multipart (stream)")
+            state.clear()
+            self._reset_progress(size, 0)
+            result = self._upload_multipart(file_path, upload_url)
+        self.bytes_sent = size
+        self._report(force=True)
+        return result
+
+    def _upload_chunks(self, file_path: str, state: Dict) -> Optional[Dict]:
+        """Gửi lần lượt các chunk; trả về None nếu server không hỗ trợ chunk"""
+        size = state['size']
+        filename = os.path.basename(file_path)
+        failures = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                start = state['offset']
+                end = min(size, start + self.chunk_size) - 1
+                is_last = end >= size - 1
+                headers = {
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Disposition': f'attachment; filename="{filename}"',
+                    'Content-Range': f'bytes {start}-{end}/{size}',
+                    'X-Content-Range': f'bytes {start}-{end}/{size}',
+                    'Session-ID': state['session_id'],
+                    'accept': 'application/json',
+                }
+                body = _FileSliceReader(f, start, end - start + 1, self._on_read)
+                try:
+                    response = self.session.request('POST', state['upload_url'], data=body,
+                                                    headers=headers, timeout=self.timeout)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    failures = self._retry_or_raise(failures, f"{type(e).__name__}", start)
+                    continue
+
+                status = response.status_code
+                if status == 201:
+                    # Server trả các range đã nhận, vd "0-8388607/1500000000"
+                    acked = self._acked_offset(response.text)
+                    if acked is None:
+                        acked = end + 1
+                    if acked <= start:
+                        # Server không nhận thêm byte nào của chunk → tính là 1 lần lỗi
+                        failures = self._retry_or_raise(
+                            failures, f"HTTP 201 không tiến (range {response.text[:50]!r})", start)
+                        continue
+                    failures = 0
+                    state['offset'] = min(acked, size)
+                    self._rewind(state['offset'])
+                    continue
+                if status == 200:
+                    if not is_last and start == 0:
+                        # Server coi chunk đầu là cả file → không hỗ trợ chunk
+                        return None
+                    state['offset'] = size
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise Exception(f"Upload server trả response không hợp lệ: {response.text[:200]}")
+                if status in self.UNSUPPORTED_STATUSES and start == 0:
+                    return None
+                if status == 429 or status >= 500:
+                    failures = self._retry_or_raise(failures, f"HTTP {status}", start)
+                    continue
+                if status >= 400:
+                    # Session không còn dùng được (hết hạn / bị từ chối) → lần sau upload lại từ đầu
+                    state.clear()
+                response.raise_for_status()
+                raise Exception(f"Upload server trả status không mong đợi: {status}")
+
+    def _upload_multipart(self, file_path: str, upload_url: str) -> Dict:
+        """Upload multipart/form-data (1 request) nhưng stream từ đĩa + báo tiến trình"""
+        size = os.path.getsize(file_path)
+        filename = os.path.basename(file_path)
+        failures = 0
+        while True:
+            boundary = uuid.uuid4().hex
+            prefix = (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                f'Content-Type: video/mp4\r\n\r\n'
+            ).encode('utf-8')
+            suffix = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+            headers = {
+                'Content-Type': f'multipart/form-data; boundary={boundary}',
+                'accept': 'application/json',
+            }
+            try:
+                with open(file_path, 'rb') as f:
+                    body = _FileSliceReader(f, 0, size, self._on_read, prefix, suffix)
+                    response = self.session.request('POST', upload_url, data=body, headers=headers,
+                                                    timeout=(self.timeout[0], 300))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                failures = self._retry_or_raise(failures, type(e).__name__, 0)
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                failures = self._retry_or_raise(failures, f"HTTP {response.status_code}", 0)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    @classmethod
+    def session_expired(cls, state: Dict) -> bool:
+        """State resumable đã quá SESSION_TTL (state cũ không có started_at: coi như còn hạn)"""
+        started_at = (state or {}).get('started_at')
+        return bool(started_at) and time.time() - started_at > cls.SESSION_TTL
+
+    def _retry_or_raise(self, failures: int, reason: str, offset: int) -> int:
+        if failures >= self.max_retries:
+            raise Exception(
+                f"Lỗi khi upload file sau {failures + 1} lần thử ({reason}), "
+                f"đã gửi được {offset}/{self.total_bytes} byte"
+            )
+        delay = self.backoff(failures + 1)
+        self._log(
+            f"⚠️ {reason} khi upload, thử lại lần {failures + 1}/{self.max_retries} "
+            f"từ byte {offset} sau {delay:.1f}s..."
+        )
+        self._rewind(offset)
+        time.sleep(delay)
+        return failures + 1
+
+    @classmethod
+    def _acked_offset(cls, text: str) -> Optional[int]:
+        """Byte đầu tiên chưa được xác nhận (range liên tục tính từ 0)"""
+        ranges = sorted(re.findall(r'(\d+)-(\d+)/\d+', text or ''), key=lambda r: int(r[0]))
+        if not ranges:
+            return None
+        offset = 0
+        for a, b in ranges:
+            a, b = int(a), int(b)
+            if a > offset:
+                break
+            offset = max(offset, b + 1)
+        return offset
@@ -1,34 +1,454 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import os
 import re
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import contextlib
+import hashlib
 import json
+import random
+import threading
+
+from chunked_upload import BandwidthLimiter, ChunkedUploader
+from response_cache import ResponseCache
+from upload_index import UploadIndex
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path: str, timeout: float = 60.0, stale_after: float = 120.0):
+    """Khóa liên process bằng lock file (O_EXCL), chạy được trên cả Windows
+
+    Lock file cũ hơn stale_after giây (process giữ lock đã chết) sẽ bị xóa.
+    """
+    lock_dir = os.path.dirname(lock_path)
+    if lock_dir:
+        os.makedirs(lock_dir, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_after:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Không lấy được lock: {lock_path}")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+class RateLimiter:
+    """Token bucket thread-safe, tự điều chỉnh tốc độ theo 429 (AIMD)
+
+    - Mỗi request lấy 1 token; token hồi lại theo `rate` token/giây, tối đa `burst`
+    - Gặp 429: giảm một nửa rate và tạm dừng mọi thread tới hết Retry-After
+    - Request thành công: tăng dần rate trở lại, không vượt quá max_rate
+    """
+
+    def __init__(self, rate: float = 8.0, burst: float = None,
+                 min_rate: float = 0.5, max_rate: float = None):
+        self.rate = rate
+        self.max_rate = max_rate or rate
+        self.min_rate = min_rate
+        self.burst = burst or max(1.0, rate * 2)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Chờ tới khi có token, trả về số giây đã phải chờ"""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self) -> float:
+        """Lấy 1 token nếu có (trả về 0), ngược lại trả về số giây cần chờ
+
+        Không chặn thread: client asyncio tự chờ bằng asyncio.sleep.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def on_throttled(self, retry_after: float = None):
+        """Gọi khi server trả 429: giảm rate, chặn tới hết Retry-After"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def on_success(self):
+        """Gọi khi request thành công: tăng rate dần (additive increase)"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
 
 
 class DailymotionAPI:
-    def __init__(self, api_key: str, api_secret: str, log_callback=None):
+    # Field mặc định khi đọc thông tin chi tiết một video
+    VIDEO_FIELDS = "id,title,description,embed_url,url,thumbnail_url,private,created_time"
+    # Field mặc định khi liệt kê video của một kênh
+    USER_VIDEO_FIELDS = "id,title,url,thumbnail_url,created_time,private"
+    # Field mặc định khi đọc thông tin playlist
+    PLAYLIST_FIELDS = "id,name,description,embed_url,url,thumbnail_url,private,videos_total"
+    # Method được phép retry khi gặp 5xx / lỗi kết nối
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, api_key: str, api_secret: str, log_callback=None,
+                 session: requests.Session = None, pool_size: int = 10,
+                 timeout=(10, 60), rate_limit: float = 8.0, max_retries: int = 4,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 token_cache_path: str = None, cache: ResponseCache = None,
+                 upload_bandwidth: float = None, upload_index: UploadIndex = None):
+        """
+        Args:
+            api_key: Dailymotion API Key
+            api_secret: Dailymotion API Secret
+            log_callback: Callback để log vào GUI
+            session: Session/transport tùy chỉnh (vd: mock trong test). Mặc định tạo
+                requests.Session dùng chung với connection pool + keep-alive
+            pool_size: Số connection tối đa giữ sẵn cho mỗi host
+            timeout: Timeout mặc định (connect, read) cho mọi request
+            rate_limit: Số request/giây tối đa (None = không giới hạn). Tự giảm khi gặp 429
+            max_retries: Số lần retry tối đa khi gặp 429 / 5xx / lỗi kết nối
+            backoff_base: Thời gian chờ cơ sở (giây) cho exponential backoff
+            backoff_max: Thời gian chờ tối đa (giây) giữa 2 lần retry
+            token_cache_path: File JSON lưu access token (theo API key) để dùng lại
+                giữa các lần chạy / process. None = chỉ giữ trong bộ nhớ
+            cache: ResponseCache cho video/playlist metadata (None = không cache)
+            upload_bandwidth: Tổng tốc độ upload tối đa (byte/giây) cho mọi upload
+                của client này (None = không giới hạn)
+            upload_index: Chỉ mục nội dung file đã upload; file trùng nội dung sẽ
+                dùng lại video đã có thay vì upload lại (None = không kiểm tra)
+        """
         self.api_key = api_key
         self.api_secret = api_secret
         self.access_token = None
         self.token_expires_at = 0
+        self.token_cache_path = token_cache_path
+        self.cache = cache
+        self.upload_index = upload_index
+        self._token_lock = threading.Lock()
         self.base_url = "https://api.dailymotion.com"  # Cho OAuth token
         # Thử cả Partner API và Public API endpoints
         self.partner_api_url = "https://partner.api.dailymotion.com/rest"  # Cho Partner API (Private Key)
         self.public_api_url = "https://api.dailymotion.com"  # Cho Public API (Public Key)
         self.upload_base_url = "https://upload-XXX.dailymotion.com"
         self.log_callback = log_callback  # Callback để log vào GUI
-        
+        self.timeout = timeout
+        # Một session dùng chung cho mọi endpoint: tái sử dụng kết nối TCP+TLS
+        # thay vì bắt tay lại cho từng request. Connection pool của urllib3
+        # thread-safe nên có thể gọi song song từ nhiều thread.
+        self.session = session or self._create_session(pool_size)
+        # Rate limiter + retry policy dùng chung cho mọi thread
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.max_retries = max_retries
+        self.upload_bandwidth_limiter = BandwidthLimiter(upload_bandwidth) if upload_bandwidth else None
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,      # Số request HTTP thực sự gửi đi
+            'throttled': 0,     # Số response 429
+            'retried': 0,       # Số lần retry
+            'wait_seconds': 0.0,  # Tổng thời gian chờ (rate limit + backoff)
+        }
+
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """Tạo requests.Session với connection pool và keep-alive"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def _request(self, method: str, url: str, retry: bool = None, throttle: bool = True,
+                 **kwargs) -> requests.Response:
+        """Gửi request qua session dùng chung (timeout mặc định, rate limit, retry)
+
+        Args:
+            method: HTTP method
+            url: URL
+            retry: None = tự động (429 retry mọi method; 5xx/lỗi kết nối chỉ retry
+                method idempotent), True = luôn retry, False = không retry
+            throttle: Đi qua rate limiter hay không
+            **kwargs: Tham số truyền cho session.request
+
+        Returns:
+            Response cuối cùng (caller tự raise_for_status như trước)
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        method = method.upper()
+        retry_errors = retry if retry is not None else method in self.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if throttle and self.rate_limiter:
+                waited = self.rate_limiter.acquire()
+                if waited:
+                    self._count('wait_seconds', waited)
+            self._count('requests')
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not retry_errors or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                decision = self._retry_decision(response, attempt, retry, retry_errors, throttle)
+                if decision is None:
+                    return response
+                delay, reason = decision
+
+            attempt += 1
+            self._note_retry(method, url, reason, attempt, delay)
+            time.sleep(delay)
+
+    def _retry_decision(self, response, attempt: int, retry: Optional[bool],
+                        retry_errors: bool, throttle: bool):
+        """Xét response (requests hoặc httpx): None = trả về luôn,
+        (delay, reason) = chờ delay giây rồi gửi lại"""
+        status = response.status_code
+        if status == 429:
+            retry_after = self._parse_retry_after(response)
+            self._count('throttled')
+            if throttle and self.rate_limiter:
+                self.rate_limiter.on_throttled(retry_after)
+            # 429: server chưa xử lý request nên retry được cả POST
+            if retry is False or attempt >= self.max_retries:
+                return None
+            delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+            return delay, "HTTP 429"
+        if status >= 500 and retry_errors and attempt < self.max_retries:
+            retry_after = self._parse_retry_after(response)
+            delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+            return delay, f"HTTP {status}"
+        if throttle and self.rate_limiter and status < 400:
+            self.rate_limiter.on_success()
+        return None
+
+    def _note_retry(self, method: str, url: str, reason: str, attempt: int, delay: float):
+        self._count('retried')
+        self._count('wait_seconds', delay)
+        if self.log_callback:
+            self.log_callback(
+                f"⚠️ {reason} ({method} {url.split('?')[0]}), "
+                f"thử lại lần {attempt}/{self.max_retries} sau {delay:.1f}s..."
+            )
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff có jitter (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _parse_retry_after(self, response) -> Optional[float]:
+        """Đọc header Retry-After (số giây hoặc HTTP date)"""
+        value = (getattr(response, 'headers', None) or {}).get('Retry-After')
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_max, max(0.0, seconds))
+
+    def _count(self, key: str, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def get_stats(self) -> Dict:
+        """Thống kê request: số request, số lần bị 429, số lần retry, thời gian chờ"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['current_rate'] = self.rate_limiter.rate if self.rate_limiter else None
+        if self.cache:
+            stats['cache'] = dict(self.cache.stats)
+        return stats
+
+    def _get_json(self, url: str, params: Dict = None, endpoint: str = None):
+        """GET JSON, đi qua response cache nếu có (endpoint = loại TTL)
+
+        Raises:
+            requests.exceptions.RequestException: như response.raise_for_status()
+        """
+        if not self.cache or not endpoint:
+            return self._send_get(url, params).json()
+
+        key = ResponseCache.make_key(url, params)
+        data = self.cache.get_fresh(key)
+        if data is not None:
+            return data
+
+        def fetch():
+            entry = self.cache.get(key)
+            extra_headers = {}
+            if entry and entry.get('etag'):
+                extra_headers['If-None-Match'] = entry['etag']
+            response = self._send_get(url, params, extra_headers)
+            if response.status_code == 304 and entry:
+                # Server xác nhận dữ liệu không đổi → gia hạn TTL
+                return self.cache.touch(key, entry, endpoint)
+            result = response.json()
+            self.cache.set(key, result, endpoint, response.headers.get('ETag'))
+            return result
+
+        return self.cache.coalesce(key, fetch)
+
+    def _send_get(self, url: str, params: Dict = None, extra_headers: Dict = None) -> requests.Response:
+        token = self.get_access_token()
+        headers = {
+            "Authorization": f"Bearer {token}"
+        }
+        if extra_headers:
+            headers.update(extra_headers)
+        response = self._request('GET', url, headers=headers, params=params)
+        response.raise_for_status()
+        return response
+
+    def invalidate_cache(self, url: str):
+        """Xóa cache của một resource (vd: .../playlist/x123) và các sub-resource"""
+        if self.cache:
+            self.cache.invalidate(url + '?')
+            self.cache.invalidate(url + '/')
+
+    def close(self):
+        """Đóng session và giải phóng các kết nối trong pool"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     def get_access_token(self) -> str:
         """Lấy access token với scope manage_videos
         
         Hỗ trợ cả Private API Key (client_credentials) và Public API Key (cần OAuth)
+        
+        - Nhiều thread gọi cùng lúc khi token sắp hết hạn: chỉ 1 thread refresh
+        - Nếu bật token_cache_path: dùng lại token đã lưu trên đĩa (chung giữa
+          các process), file được khóa trong lúc refresh
         """
         # Kiểm tra nếu token còn hợp lệ (còn ít nhất 5 phút)
-        current_time = time.time()
-        if self.access_token and self.token_expires_at > current_time + 300:
+        if self._token_is_valid():
             return self.access_token
         
+        with self._token_lock:
+            # Thread khác có thể vừa refresh xong trong lúc chờ lock
+            if self._token_is_valid():
+                return self.access_token
+            if not self.token_cache_path:
+                return self._fetch_access_token()
+            with _file_lock(self.token_cache_path + ".lock"):
+                # Process khác có thể vừa refresh và ghi vào cache
+                if self._load_cached_token():
+                    return self.access_token
+                token = self._fetch_access_token()
+                self._store_cached_token()
+                return token
+    
+    def _token_is_valid(self) -> bool:
+        return bool(self.access_token) and self.token_expires_at > time.time() + 300
+    
+    def _token_cache_key(self) -> str:
+        # Không lưu API key dạng rõ trong file cache
+        return hashlib.sha256(self.api_key.encode('utf-8')).hexdigest()
+    
+    def _read_token_cache(self) -> Dict:
+        try:
+            with open(self.token_cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    def _load_cached_token(self) -> bool:
+        """Nạp token từ cache trên đĩa nếu còn hợp lệ"""
+        entry = self._read_token_cache().get(self._token_cache_key())
+        if not entry or entry.get('expires_at', 0) <= time.time() + 300:
+            return False
+        self.access_token = entry.get('access_token')
+        self.token_expires_at = entry['expires_at']
+        self.granted_scopes = entry.get('scope', '')
+        if self.log_callback:
+            self.log_callback("[DEBUG] Dùng access token từ cache trên đĩa")
+        return bool(self.access_token)
+    
+    def _store_cached_token(self):
+        """Ghi token hiện tại vào cache (ghi file tạm rồi replace)"""
+        data = self._read_token_cache()
+        key = self._token_cache_key()
+        if self.access_token:
+            data[key] = {
+                'access_token': self.access_token,
+                'expires_at': self.token_expires_at,
+                'scope': getattr(self, 'granted_scopes', ''),
+            }
+        else:
+            data.pop(key, None)
+        cache_dir = os.path.dirname(self.token_cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.token_cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            try:
+                os.chmod(tmp_path, 0o600)
+            except OSError:
+                pass
+            os.replace(tmp_path, self.token_cache_path)
+        except OSError as e:
+            if self.log_callback:
+                self.log_callback(f"⚠️ Không thể lưu token cache: {e}")
+    
+    def invalidate_token(self):
+        """Bỏ token hiện tại (cả trong cache trên đĩa) để lần gọi sau lấy token mới"""
+        with self._token_lock:
+            self.access_token = None
+            self.token_expires_at = 0
+            if self.token_cache_path:
+                with _file_lock(self.token_cache_path + ".lock"):
+                    self._store_cached_token()
+    
+    def _fetch_access_token(self) -> str:
+        """Gọi /oauth/token (client_credentials) để lấy token mới"""
+        current_time = time.time()
+        
         # Lấy token mới - Thử client_credentials trước (cho Private API Key)
         # Thử request với nhiều scopes để có đủ quyền cho upload
         url = f"{self.base_url}/oauth/token"
@@ -46,7 +466,7 @@ class DailymotionAPI:
             }
             
             try:
-                response = requests.post(url, data=data)
+                response = self._request('POST', url, data=data)
                 response.raise_for_status()
                 token_data = response.json()
                 
@@ -56,75 +476,84 @@ class DailymotionAPI:
                     self.log_callback(f"[DEBUG] Token request scope: {scope}")
                     self.log_callback(f"[DEBUG] Token response status: {response.status_code}")
                 
-                self.access_token = token_data.get('access_token')
-                
-                if not self.access_token:
-                    error_msg = "Không lấy được access_token từ response"
-                    if self.log_callback:
-                        self.log_callback(f"❌ {error_msg}")
-                        self.log_callback(f"📋 Token response: {json.dumps(token_data, indent=2, ensure_ascii=False)[:500]}")
-                    raise Exception(error_msg)
-                
-                # Lưu lại danh sách quyền (scopes) thực tế được cấp
-                # Kiểm tra nhiều cách để lấy scope
-                scope_value = token_data.get('scope') or token_data.get('scopes') or token_data.get('granted_scopes') or ''
-                if isinstance(scope_value, list):
-                    scope_value = ' '.join(scope_value)
-                if isinstance(scope_value, dict):
-                    scope_value = ' '.join(scope_value.keys()) if scope_value else ''
-                if not scope_value or scope_value == '':
-                    scope_value = 'Không có quyền nào'
-                    # Log cảnh báo ngay lập tức
-                    if self.log_callback:
-                        self.log_callback(f"⚠️ CẢNH BÁO: Token response không có scope field!")
-                        self.log_callback(f"⚠️ Có thể API Key chưa được cấp quyền trong Dailymotion Organization")
-                        # Log full response để debug
-                        try:
-                            full_response = json.dumps(token_data, indent=2, ensure_ascii=False)
-                            # Chỉ log 500 ký tự đầu để không quá dài
-                            if len(full_response) > 500:
-                                full_response = full_response[:500] + "..."
-                            self.log_callback(f"📋 Token response: {full_response}")
-                        except Exception as e:
-                            self.log_callback(f"📋 Token response: {str(token_data)[:500]}")
-                            self.log_callback(f"📋 Error logging response: {str(e)}")
-                
-                self.granted_scopes = scope_value
-                
-                # LUÔN log scope để debug - đảm bảo được gọi NGAY LẬP TỨC
-                log_msg = f"[DEBUG] Token Scopes được cấp: {self.granted_scopes}"
-                if self.log_callback:
-                    try:
-                        self.log_callback(log_msg)
-                    except Exception as e:
-                        print(f"Error in log_callback: {e}")
-                        print(log_msg)
-                else:
-                    print(log_msg)
-                
-                expires_in = token_data.get('expires_in', 3600)
-                self.token_expires_at = current_time + expires_in
-                return self.access_token
+                return self._apply_token_response(token_data, current_time)
             except requests.exceptions.HTTPError as e:
                 last_error = e
                 last_response = response
                 # Nếu scope đầu tiên lỗi, thử scope tiếp theo
                 if scope == scopes_to_try[-1]:  # Đã thử hết các scope
-                    # Nếu lỗi 400, có thể là Public API Key cần OAuth flow
-                    if last_response.status_code == 400:
-                        error_data = last_response.json() if last_response.content else {}
-                        error_msg = error_data.get('error_description', '')
-                        if 'authorization_code' in error_msg.lower() or 'redirect_uri' in error_msg.lower():
-                            raise Exception(
-                                "Public API Key cần OAuth flow. "
-                                "Vui lòng sử dụng Private API Key hoặc implement OAuth flow."
-                            )
-                    raise Exception(f"Lỗi khi lấy access token: {str(last_error)}")
+                    self._raise_token_error(last_response, last_error)
                 # Tiếp tục thử scope tiếp theo
                 continue
             except requests.exceptions.RequestException as e:
                 raise Exception(f"Lỗi khi lấy access token: {str(e)}")
     
+    def _apply_token_response(self, token_data: Dict, requested_at: float) -> str:
+        """Lưu access token + scope + hạn dùng từ response của /oauth/token"""
+        self.access_token = token_data.get('access_token')
+        
+        if not self.access_token:
+            error_msg = "Không lấy được access_token từ response"
+            if self.log_callback:
+                self.log_callback(f"❌ {error_msg}")
+                self.log_callback(f"📋 Token response: {json.dumps(token_data, indent=2, ensure_ascii=False)[:500]}")
+            raise Exception(error_msg)
+        
+        # Lưu lại danh sách quyền (scopes) thực tế được cấp
+        # Kiểm tra nhiều cách để lấy scope
+        scope_value = token_data.get('scope') or token_data.get('scopes') or token_data.get('granted_scopes') or ''
+        if isinstance(scope_value, list):
+            scope_value = ' '.join(scope_value)
+        if isinstance(scope_value, dict):
+            scope_value = ' '.join(scope_value.keys()) if scope_value else ''
+        if not scope_value or scope_value == '':
+            scope_value = 'Không có quyền nào'
+            # Log cảnh báo ngay lập tức
+            if self.log_callback:
+                self.log_callback(f"⚠️ CẢNH BÁO: Token response không có scope field!")
+                self.log_callback(f"⚠️ Có thể API Key chưa được cấp quyền trong Dailymotion Organization")
+                # Log full response để debug
+                try:
+                    full_response = json.dumps(token_data, indent=2, ensure_ascii=False)
+                    # Chỉ log 500 ký tự đầu để không quá dài
+                    if len(full_response) > 500:
+                        full_response = full_response[:500] + "..."
+                    self.log_callback(f"📋 Token response: {full_response}")
+                except Exception as e:
+                    self.log_callback(f"📋 Token response: {str(token_data)[:500]}")
+                    self.log_callback(f"📋 Error logging response: {str(e)}")
+        
+        self.granted_scopes = scope_value
+        
+        # LUÔN log scope để debug - đảm bảo được gọi NGAY LẬP TỨC
+        log_msg = f"[DEBUG] Token Scopes được cấp: {self.granted_scopes}"
+        if self.log_callback:
+            try:
+                self.log_callback(log_msg)
+            except Exception as e:
+                print(f"Error in log_callback: {e}")
+                print(log_msg)
+        else:
+            print(log_msg)
+        
+        expires_in = token_data.get('expires_in', 3600)
+        self.token_expires_at = requested_at + expires_in
+        return self.access_token
+
+    @staticmethod
+    def _raise_token_error(response, error):
+        """Raise lỗi lấy token (response requests hoặc httpx)"""
+        # Nếu lỗi 400, có thể là Public API Key cần OAuth flow
+        if response.status_code == 400:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get('error_description', '')
+            if 'authorization_code' in error_msg.lower() or 'redirect_uri' in error_msg.lower():
+                raise Exception(
+                    "Public API Key cần OAuth flow. "
+                    "Vui lòng sử dụng Private API Key hoặc implement OAuth flow."
+                )
+        raise Exception(f"Lỗi khi lấy access token: {str(error)}")
+
     def get_user_id(self) -> str:
         """Lấy user ID từ token (Thử nhiều cách để tương thích Private Key)"""
         token = self.get_access_token()
@@ -134,7 +563,7 @@ class DailymotionAPI:
             url = f"{self.base_url}/me"
             params = {'fields': 'id,username'}
             headers = {"Authorization": f"Bearer {token}"}
-            response = requests.get(url, headers=headers, params=params)
+            response = self._request('GET', url, headers=headers, params=params)
             if response.status_code == 200:
                 user_data = response.json()
                 return user_data.get('id') or user_data.get('username', '')
@@ -171,7 +600,7 @@ class DailymotionAPI:
         last_response = None
         for url in urls_to_try:
             try:
-                response = requests.get(url, headers=headers)
+                response = self._request('GET', url, headers=headers)
                 response.raise_for_status()
                 return response.json()
             except requests.exceptions.HTTPError as e:
@@ -186,8 +615,7 @@ class DailymotionAPI:
                 if url == urls_to_try[-1]:
                     # Nếu lỗi 401, invalidate token để lấy token mới ở lần gọi tiếp theo
                     if response.status_code == 401:
-                        self.access_token = None
-                        self.token_expires_at = 0
+                        self.invalidate_token()
                     
                     # Thêm thông tin chi tiết về lỗi
                     error_detail = ""
@@ -224,18 +652,42 @@ class DailymotionAPI:
         if last_error:
             raise Exception(f"Lỗi khi lấy upload URL: {str(last_error)}")
     
-    def upload_video_file(self, file_path: str, progress_callback=None, username: str = None) -> Dict:
+    def upload_video_file(self, file_path: str, progress_callback=None, username: str = None,
+                          chunk_size: int = ChunkedUploader.DEFAULT_CHUNK_SIZE,
+                          max_bandwidth: float = None, on_progress=None,
+                          resume_state: Dict = None) -> Dict:
         """Upload video file lên Dailymotion
         
         Theo tài liệu: URL upload cần thêm /-1 vào cuối
         Format: https://{upload_server}.dailymotion.com/{path}/-1
+
+        File được stream từ đĩa theo chunk (ChunkedUploader): lỗi mạng giữa
+        chừng chỉ gửi lại từ byte cuối server đã nhận, không upload lại từ đầu.
+
+        Args:
+            file_path: Đường dẫn file video
+            progress_callback: Nhận chuỗi tiến trình (%, MB, tốc độ, thời gian còn lại)
+            username: Username/Partner ID
+            chunk_size: Kích thước mỗi chunk (byte)
+            max_bandwidth: Giới hạn tốc độ upload (byte/giây), None = không giới hạn
+                (mặc định dùng self.upload_bandwidth_limiter nếu có)
+            on_progress: Nhận dict {bytes_sent, total_bytes, percent, speed, eta}
+            resume_state: Dict trạng thái resumable; truyền lại dict đã lưu để
+                upload tiếp file đang dở (dùng lại upload URL cũ). Dict bị xóa rỗng
+                khi session hết hạn hoặc bị server từ chối
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File không tồn tại: {file_path}")
         
-        # Lấy upload URL (truyền username nếu có)
-        upload_info = self.get_upload_url(username=username)
-        upload_url = upload_info.get('upload_url')
+        if resume_state and ChunkedUploader.session_expired(resume_state):
+            if self.log_callback:
+                self.log_callback("⚠️ Upload session cũ đã hết hạn, upload lại từ đầu")
+            resume_state.clear()
+        upload_url = (resume_state or {}).get('upload_url')
+        if not upload_url:
+            # Lấy upload URL (truyền username nếu có)
+            upload_info = self.get_upload_url(username=username)
+            upload_url = upload_info.get('upload_url')
         
         if not upload_url:
             raise Exception("Không lấy được upload URL")
@@ -244,40 +696,28 @@ class DailymotionAPI:
         if not upload_url.endswith('/-1'):
             upload_url = upload_url.rstrip('/') + '/-1'
         
-        # Upload file với headers đúng format và retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with open(file_path, 'rb') as f:
-                    files = {'file': (os.path.basename(file_path), f, 'video/mp4')}
-                    headers = {
-                        "accept": "application/json"
-                    }
-                    # requests sẽ tự động set content-type: multipart/form-data khi dùng files=
-                    
-                    # Upload với progress tracking nếu có callback
-                    # Tăng timeout cho upload file lớn
-                    response = requests.post(
-                        upload_url, 
-                        files=files, 
-                        headers=headers, 
-                        stream=True,
-                        timeout=(30, 300)  # Connect timeout: 30s, Read timeout: 5 phút
-                    )
-                    response.raise_for_status()
-                    
-                    result = response.json()
-                    return result
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                if attempt < max_retries - 1:
-                    if self.log_callback:
-                        self.log_callback(f"⚠️ Lỗi connection/timeout, thử lại lần {attempt + 2}/{max_retries}...")
-                    time.sleep(2)  # Đợi 2 giây trước khi retry
-                    continue
-                else:
-                    raise Exception(f"Lỗi khi upload file sau {max_retries} lần thử: {str(e)}")
-            except requests.exceptions.RequestException as e:
-                raise Exception(f"Lỗi khi upload file: {str(e)}")
+        uploader = ChunkedUploader(
+            self.session,
+            chunk_size=chunk_size,
+            max_bandwidth=max_bandwidth,
+            bandwidth_limiter=None if max_bandwidth else self.upload_bandwidth_limiter,
+            max_retries=self.max_retries,
+            backoff=self._backoff_delay,
+            log_callback=self.log_callback,
+            progress_callback=progress_callback,
+            on_progress=on_progress,
+        )
+        try:
+            result = uploader.upload(file_path, upload_url, state=resume_state)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Lỗi khi upload file: {str(e)}")
+        if self.log_callback:
+            progress = uploader.get_progress()
+            self.log_callback(
+                f"✅ Upload xong {progress['total_bytes'] / 1048576:.1f} MB, "
+                f"trung bình {progress['speed'] / 1048576:.2f} MB/s"
+            )
+        return result
     
     def create_video(self, video_url: str, title: str, description: str, 
                      channel_id: str = None, username: str = None, private: bool = True, 
@@ -316,25 +756,16 @@ class DailymotionAPI:
             "Content-Type": "application/x-www-form-urlencoded"
         }
         
-        # Theo tài liệu Dailymotion: url, title, channel, published, private, is_created_for_kids là bắt buộc
-        data = {
-            'url': video_url,
-            'title': title,
-            'description': description,
-            'published': 'true',
-            'private': 'true' if private else 'false',
-            'is_created_for_kids': 'true' if is_created_for_kids else 'false',
-            'channel': 'entertainment'  # Category bắt buộc
-        }
-        
-        # Loại bỏ description nếu rỗng (không bắt buộc)
-        if not description:
-            data.pop('description', None)
+        data = self._create_video_data(video_url, title, description, private, is_created_for_kids)
         
         try:
-            response = requests.post(url, headers=headers, data=data)
+            response = self._request('POST', url, headers=headers, data=data)
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            # Bỏ cache cũ (nếu có) của video vừa tạo
+            if result.get('id'):
+                self.invalidate_cache(f"{self.base_url}/video/{result['id']}")
+            return result
         except requests.exceptions.HTTPError as e:
             # Hiển thị lỗi chi tiết hơn
             error_detail = ""
@@ -355,6 +786,26 @@ class DailymotionAPI:
         except requests.exceptions.RequestException as e:
             raise Exception(f"Lỗi khi tạo video: {str(e)}")
     
+    @staticmethod
+    def _create_video_data(video_url: str, title: str, description: str,
+                           private: bool, is_created_for_kids: bool) -> Dict:
+        """Form data cho request tạo video"""
+        # Theo tài liệu Dailymotion: url, title, channel, published, private, is_created_for_kids là bắt buộc
+        data = {
+            'url': video_url,
+            'title': title,
+            'description': description,
+            'published': 'true',
+            'private': 'true' if private else 'false',
+            'is_created_for_kids': 'true' if is_created_for_kids else 'false',
+            'channel': 'entertainment'  # Category bắt buộc
+        }
+        
+        # Loại bỏ description nếu rỗng (không bắt buộc)
+        if not description:
+            data.pop('description', None)
+        return data
+
     def extract_video_id(self, video_url_or_id: str) -> str:
         """Extract video ID từ URL hoặc trả về ID nếu đã là ID
         
@@ -408,23 +859,87 @@ class DailymotionAPI:
         if video_id.startswith('http'):
             video_id = self.extract_video_id(video_id)
         
-        token = self.get_access_token()
         # Dùng public API cho thao tác đọc thông tin video
         url = f"{self.base_url}/video/{video_id}"
         params = {
-            'fields': 'id,title,description,embed_url,url,thumbnail_url,private,created_time'
-        }
-        headers = {
-            "Authorization": f"Bearer {token}"
+            'fields': self.VIDEO_FIELDS
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, params, endpoint='video')
         except requests.exceptions.RequestException as e:
             raise Exception(f"Lỗi khi lấy thông tin video: {str(e)}")
-    
+
+    def get_videos_info(self, video_ids: List[str], chunk_size: int = 100) -> Dict:
+        """Lấy thông tin nhiều video cùng lúc (batch)
+
+        Dùng filter ids= của endpoint /videos: mỗi request lấy tối đa
+        chunk_size video thay vì 1 request cho mỗi video.
+
+        Args:
+            video_ids: Danh sách Video ID hoặc URL (chuẩn hóa bằng extract_video_id)
+            chunk_size: Số ID mỗi request (tối đa 100 theo giới hạn limit của API)
+
+        Returns:
+            Dict {'videos': {video_id: info}, 'missing': [video_id, ...]}
+            với cùng các field như get_video_info
+        """
+        normalized = self._normalize_video_ids(video_ids)
+
+        videos: Dict[str, Dict] = {}
+        if not normalized:
+            return {'videos': videos, 'missing': []}
+
+        # Dùng cache của get_video_info trước, chỉ gọi API cho ID chưa có
+        to_fetch = []
+        for vid in normalized:
+            cached = None
+            if self.cache:
+                cached = self.cache.get_fresh(self._video_cache_key(vid))
+            if cached is not None:
+                videos[vid] = cached
+            else:
+                to_fetch.append(vid)
+
+        url = f"{self.base_url}/videos"
+        chunk_size = max(1, min(chunk_size, 100))
+
+        for start in range(0, len(to_fetch), chunk_size):
+            token = self.get_access_token()
+            headers = {
+                "Authorization": f"Bearer {token}"
+            }
+            chunk = to_fetch[start:start + chunk_size]
+            params = {
+                'ids': ','.join(chunk),
+                'fields': self.VIDEO_FIELDS,
+                'limit': len(chunk)
+            }
+            try:
+                response = self._request('GET', url, headers=headers, params=params)
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                raise Exception(f"Lỗi khi lấy thông tin nhiều video: {str(e)}")
+
+            for info in data.get('list', []):
+                if info.get('id'):
+                    videos[info['id']] = info
+                    if self.cache:
+                        self.cache.set(self._video_cache_key(info['id']), info, 'video')
+
+        missing = [vid for vid in normalized if vid not in videos]
+        if self.log_callback:
+            self.log_callback(
+                f"[DEBUG] get_videos_info: {len(videos)}/{len(normalized)} video, "
+                f"thiếu {len(missing)}"
+            )
+        return {'videos': videos, 'missing': missing}
+
+    def _video_cache_key(self, video_id: str) -> str:
+        """Key cache giống hệt key mà get_video_info dùng"""
+        return ResponseCache.make_key(f"{self.base_url}/video/{video_id}", {'fields': self.VIDEO_FIELDS})
+
     def create_playlist(self, username: str = None, channel_id: str = None, 
                        title: str = "", description: str = "", 
                        video_ids: List[str] = None) -> Dict:
@@ -471,21 +986,29 @@ class DailymotionAPI:
         }
         
         try:
-            response = requests.post(url, headers=headers, data=data)
+            response = self._request('POST', url, headers=headers, data=data)
             response.raise_for_status()
             playlist_data = response.json()
             playlist_id = playlist_data.get('id')
+            if playlist_id:
+                self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
             
-            # Thêm videos vào playlist
+            # Đặt toàn bộ danh sách video bằng 1 request (thay vì POST từng video)
             if playlist_id and video_ids:
-                self.add_videos_to_playlist(playlist_id, video_ids, username=username, channel_id=channel_id)
+                report = self.replace_playlist_videos(playlist_id, video_ids)
+                playlist_data['videos_report'] = report
+                if report['failed'] and self.log_callback:
+                    self.log_callback(
+                        f"⚠️ {len(report['failed'])} video chưa vào playlist: {report['failed']}"
+                    )
                 
                 # Lấy thông tin đầy đủ của playlist sau khi thêm videos
                 try:
                     full_info = self.get_playlist_info(playlist_id)
                     playlist_data.update(full_info)
                 except Exception as e:
-                    print(f"Cảnh báo: Không thể lấy thông tin đầy đủ playlist: {str(e)}")
+                    if self.log_callback:
+                        self.log_callback(f"⚠️ Không thể lấy thông tin đầy đủ playlist: {str(e)}")
             
             return playlist_data
         except requests.exceptions.RequestException as e:
@@ -493,13 +1016,19 @@ class DailymotionAPI:
     
     def add_videos_to_playlist(self, playlist_id: str, video_ids: List[str], 
                                username: str = None, channel_id: str = None):
-        """Thêm videos vào playlist
+        """Thêm videos vào playlist (từng video một)
         
         Args:
             playlist_id: ID của playlist
             video_ids: Danh sách video IDs
             username: Username/Partner ID (ưu tiên)
             channel_id: Channel ID (backup)
+        
+        Returns:
+            Dict {video_id: 'ok' | 'lỗi: ...'}
+        
+        Ghi chú:
+            - Thêm nhiều video: dùng replace_playlist_videos / sync_playlist (1 request)
         """
         token = self.get_access_token()
         
@@ -524,13 +1053,275 @@ class DailymotionAPI:
         }
         
         # Thêm từng video
+        results: Dict[str, str] = {}
         for video_id in video_ids:
             data = {'video': video_id}
             try:
-                response = requests.post(url, headers=headers, data=data)
+                response = self._request('POST', url, headers=headers, data=data)
                 response.raise_for_status()
+                results[video_id] = 'ok'
             except requests.exceptions.RequestException as e:
-                print(f"Cảnh báo: Không thể thêm video {video_id} vào playlist: {str(e)}")
+                results[video_id] = f"lỗi: {e}"
+                if self.log_callback:
+                    self.log_callback(f"⚠️ Không thể thêm video {video_id} vào playlist: {str(e)}")
+        
+        # Playlist đã thay đổi → bỏ cache thông tin + danh sách video
+        self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
+        return results
+    
+    def replace_playlist_videos(self, playlist_id: str, video_ids: List[str],
+                                chunk_size: int = 100, verify: bool = True) -> Dict:
+        """Đặt toàn bộ danh sách video (có thứ tự) của playlist theo chunk
+
+        Dùng endpoint "Replace multiple videos in a playlist" của Partner API:
+        POST /rest/playlist/{id}/videos?ids=a,b,c (thay thế mọi video đang có).
+        Partner API không có endpoint thêm nhiều video cùng lúc, nên danh sách
+        dài hơn chunk_size được gửi thành nhiều request replace, mỗi request
+        thêm chunk_size ID mới vào phần đầu đã gửi (xem _replace_plan()).
+        Request lỗi thì dừng luôn: ID của request đó báo lỗi, phần sau 'chưa gửi'.
+        Danh sách rỗng → liệt kê video đang có rồi xóa theo chunk
+        (DELETE /rest/playlist/{id}/videos?ids=..., xem _clear_playlist()).
+
+        Args:
+            playlist_id: Playlist ID hoặc URL
+            video_ids: Danh sách video ID/URL theo thứ tự mong muốn
+            chunk_size: Số ID mới tối đa trong 1 request
+            verify: Đọc lại playlist sau khi ghi để xác nhận từng video
+
+        Returns:
+            Dict {'playlist_id', 'requests',
+                  'results': {video_id: 'ok' | 'lỗi: ...' | 'thiếu' | 'chưa gửi'},
+                  'failed': [video_id, ...]}
+
+        Raises:
+            Exception: Không xóa được video khỏi playlist (danh sách rỗng)
+        """
+        if playlist_id.startswith('http'):
+            playlist_id = self.extract_playlist_id(playlist_id)
+        ids = self._normalize_video_ids(video_ids)
+        token = self.get_access_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        results: Dict[str, str] = {}
+
+        if not ids:
+            requests_made = self._clear_playlist(playlist_id, headers, chunk_size)
+            return self._playlist_report(playlist_id, requests_made, results)
+
+        steps = self._replace_plan(ids, chunk_size)
+        requests_made = 0
+        for index, step in enumerate(steps):
+            requests_made += 1
+            status = self._playlist_ids_call('POST', playlist_id, step['ids'], headers)
+            if status != 'ok':
+                # Không biết playlist đang ở trạng thái nào → không gửi tiếp
+                self._mark_replace_failed(results, steps, index, status)
+                break
+            results.update(dict.fromkeys(step['new'], 'ok'))
+
+        self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
+        if verify and 'ok' in results.values():
+            requests_made += self._verify_playlist_videos(playlist_id, results)
+        return self._playlist_report(playlist_id, requests_made, results)
+
+    def _clear_playlist(self, playlist_id: str, headers: Dict, chunk_size: int) -> int:
+        """Xóa mọi video của playlist: liệt kê rồi DELETE ?ids= theo chunk
+
+        Returns:
+            Số request đã dùng (kể cả các trang liệt kê)
+
+        Raises:
+            Exception: Request xóa lỗi
+        """
+        self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
+        try:
+            current = [v.get('id') for v in self.iter_playlist_videos(playlist_id, fields='id')]
+            requests_made = max(1, -(-len(current) // 100))
+            for chunk in self._chunks(current, chunk_size):
+                requests_made += 1
+                status = self._playlist_ids_call('DELETE', playlist_id, chunk, headers)
+                if status != 'ok':
+                    raise Exception(f"Lỗi khi xóa video khỏi playlist: {status}")
+        finally:
+            self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
+        return requests_made
+
+    def sync_playlist(self, playlist_id: str, video_ids: List[str],
+                      chunk_size: int = 100, verify: bool = True) -> Dict:
+        """Đồng bộ playlist theo danh sách tập (có thứ tự), chỉ gửi phần khác biệt
+
+        - Không đổi gì → không gửi request ghi nào
+        - Chỉ thêm tập mới vào cuối → thêm từng video mới
+        - Chỉ bớt video (giữ thứ tự) → xóa video thừa theo chunk (DELETE ?ids=)
+        - Còn lại (đổi thứ tự, vừa thêm vừa bớt...) → replace cả danh sách
+        - Thêm/bớt được nhưng tốn nhiều request ghi hơn replace → replace
+          (bằng nhau thì giữ cách thêm/bớt)
+
+        Returns:
+            Như replace_playlist_videos, thêm 'mode' ('noop' | 'append' | 'remove'
+            | 'replace'), 'added' và 'removed'
+        """
+        if playlist_id.startswith('http'):
+            playlist_id = self.extract_playlist_id(playlist_id)
+        desired = self._normalize_video_ids(video_ids)
+        # Luôn đọc trạng thái mới nhất từ server
+        self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
+        current = [v.get('id') for v in self.iter_playlist_videos(playlist_id, fields='id')]
+        requests_made = max(1, -(-len(current) // 100))
+
+        plan = self._sync_plan(current, desired, chunk_size)
+        mode, added, removed = plan['mode'], plan['added'], plan['removed']
+
+        if mode == 'replace':
+            report = self.replace_playlist_videos(playlist_id, desired, chunk_size, verify)
+            report['requests'] += requests_made
+        else:
+            token = self.get_access_token()
+            headers = {"Authorization": f"Bearer {token}"}
+            results = {vid: 'ok' for vid in desired}
+            if mode == 'append':
+                for vid in added:
+                    requests_made += 1
+                    results[vid] = self._playlist_video_call('POST', playlist_id, vid, headers)
+            elif mode == 'remove':
+                for chunk in self._chunks(removed, chunk_size):
+                    requests_made += 1
+                    status = self._playlist_ids_call('DELETE', playlist_id, chunk, headers)
+                    if status != 'ok':
+                        results.update(dict.fromkeys(chunk, status))
+            if mode != 'noop':
+                self.invalidate_cache(f"{self.base_url}/playlist/{playlist_id}")
+                if verify:
+                    requests_made += self._verify_playlist_videos(playlist_id, results)
+            report = self._playlist_report(playlist_id, requests_made, results)
+
+        report.update({'mode': mode, 'added': added, 'removed': removed})
+        if self.log_callback:
+            self.log_callback(
+                f"[DEBUG] sync_playlist {playlist_id}: {mode}, +{len(added)} -{len(removed)}, "
+                f"{report['requests']} request"
+            )
+        return report
+
+    @classmethod
+    def _sync_plan(cls, current: List[str], desired: List[str], chunk_size: int) -> Dict:
+        """Chọn cách đồng bộ playlist (hàm thuần, dùng chung với client async)
+
+        Thêm/bớt chỉ khi không tốn nhiều request ghi hơn replace (xem sync_playlist()).
+
+        Returns:
+            {'mode': 'noop' | 'append' | 'remove' | 'replace', 'added', 'removed'}
+        """
+        desired_set, current_set = set(desired), set(current)
+        added = [vid for vid in desired if vid not in current_set]
+        removed = [vid for vid in current if vid not in desired_set]
+        replace_cost = cls._replace_cost(len(desired), chunk_size)
+
+        if desired == current:
+            mode = 'noop'
+        elif not removed and desired[:len(current)] == current and len(added) <= replace_cost:
+            mode = 'append'
+        elif not added and [v for v in current if v in desired_set] == desired \
+                and len(cls._chunks(removed, chunk_size)) <= replace_cost:
+            mode = 'remove'
+        else:
+            mode = 'replace'
+        return {'mode': mode, 'added': added, 'removed': removed}
+
+    @staticmethod
+    def _chunks(ids: List[str], chunk_size: int) -> List[List[str]]:
+        chunk_size = max(1, chunk_size)
+        return [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+    @classmethod
+    def _replace_plan(cls, ids: List[str], chunk_size: int) -> List[Dict]:
+        """Các request replace cho danh sách ids (hàm thuần, dùng chung với client async)
+
+        Request thứ k gửi cả phần đầu ids đã gửi cộng chunk thứ k (replace thay
+        cả playlist nên phải gửi lại phần đầu, thứ tự luôn đúng và gửi lại an toàn).
+
+        Returns:
+            [{'ids': ID gửi trong request, 'new': ID lần đầu được gửi}, ...]
+        """
+        steps = []
+        sent = 0
+        for chunk in cls._chunks(ids, chunk_size):
+            sent += len(chunk)
+            steps.append({'ids': ids[:sent], 'new': chunk})
+        return steps
+
+    @staticmethod
+    def _mark_replace_failed(results: Dict[str, str], steps: List[Dict], index: int, status: str):
+        """Request thứ index của _replace_plan() lỗi: ID mới của nó báo lỗi,
+        ID của các request sau đánh dấu 'chưa gửi'"""
+        results.update(dict.fromkeys(steps[index]['new'], status))
+        for step in steps[index + 1:]:
+            results.update(dict.fromkeys(step['new'], 'chưa gửi'))
+
+    @staticmethod
+    def _replace_cost(count: int, chunk_size: int) -> int:
+        """Số request ghi của replace_playlist_videos cho danh sách count video"""
+        return max(1, -(-count // max(1, chunk_size)))
+
+    def _playlist_ids_call(self, method: str, playlist_id: str, ids: List[str],
+                           headers: Dict) -> str:
+        """Replace (POST) / xóa (DELETE) nhiều video qua ?ids=, trả về 'ok' hoặc lỗi
+
+        ids không được rỗng: DELETE với ids rỗng xóa mọi video của playlist.
+        """
+        url = f"{self.partner_api_url}/playlist/{playlist_id}/videos"
+        try:
+            response = self._request(method, url, headers=headers, params={'ids': ','.join(ids)})
+            response.raise_for_status()
+            return 'ok'
+        except requests.exceptions.RequestException as e:
+            return f"lỗi: {e}"
+
+    def _playlist_video_call(self, method: str, playlist_id: str, video_id: str,
+                             headers: Dict) -> str:
+        """Thêm (POST) / xóa (DELETE) 1 video của playlist, trả về 'ok' hoặc lỗi"""
+        url = f"{self.partner_api_url}/playlist/{playlist_id}/videos/{video_id}"
+        try:
+            response = self._request(method, url, headers=headers)
+            response.raise_for_status()
+            return 'ok'
+        except requests.exceptions.RequestException as e:
+            return f"lỗi: {e}"
+
+    def _verify_playlist_videos(self, playlist_id: str, results: Dict[str, str]) -> int:
+        """Đánh dấu 'thiếu' cho video báo ok nhưng không có trong playlist.
+        Trả về số request đã dùng."""
+        present = set()
+        pages = 0
+        for items in self._iter_pages(f"{self.base_url}/playlist/{playlist_id}/videos",
+                                      {'fields': 'id'}, f"danh sách video từ playlist {playlist_id}"):
+            pages += 1
+            present.update(v.get('id') for v in items)
+        for vid, status in results.items():
+            if status == 'ok' and vid not in present:
+                results[vid] = 'thiếu'
+        return pages
+
+    @staticmethod
+    def _playlist_report(playlist_id: str, requests_made: int, results: Dict[str, str]) -> Dict:
+        return {
+            'playlist_id': playlist_id,
+            'requests': requests_made,
+            'results': results,
+            'failed': [vid for vid, status in results.items() if status != 'ok'],
+        }
+
+    def _normalize_video_ids(self, video_ids: List[str]) -> List[str]:
+        """Chuẩn hóa ID bằng extract_video_id, bỏ trùng nhưng giữ thứ tự"""
+        normalized: List[str] = []
+        seen = set()
+        for vid in video_ids:
+            if not vid or not str(vid).strip():
+                continue
+            vid = self.extract_video_id(str(vid))
+            if vid not in seen:
+                seen.add(vid)
+                normalized.append(vid)
+        return normalized
     
     def get_playlist_info(self, playlist_id: str) -> Dict:
         """Lấy thông tin playlist bao gồm embed URL và link
@@ -542,20 +1333,14 @@ class DailymotionAPI:
         if playlist_id.startswith('http'):
             playlist_id = self.extract_playlist_id(playlist_id)
         
-        token = self.get_access_token()
         # Dùng PUBLIC API endpoint cho thao tác đọc thông tin playlist
         url = f"{self.base_url}/playlist/{playlist_id}"
         params = {
-            'fields': 'id,name,description,embed_url,url,thumbnail_url,private,videos_total'
-        }
-        headers = {
-            "Authorization": f"Bearer {token}"
+            'fields': self.PLAYLIST_FIELDS
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, params, endpoint='playlist')
         except requests.exceptions.RequestException as e:
             raise Exception(f"Lỗi khi lấy thông tin playlist: {str(e)}")
     
@@ -590,129 +1375,184 @@ class DailymotionAPI:
         
         raise Exception(f"Không thể extract playlist ID từ URL: {playlist_url}")
     
-    def get_playlist_videos(self, playlist_id: str, limit: int = 100) -> List[Dict]:
-        """Lấy danh sách tất cả video trong playlist
-        
+    def _fetch_page(self, url: str, params: Dict, error_label: str,
+                    cache_endpoint: str = None) -> Dict:
+        """Lấy 1 page của endpoint dạng list (trả về dict có 'list', 'has_more', 'page')"""
+        try:
+            data = self._get_json(url, params, endpoint=cache_endpoint)
+        except requests.exceptions.HTTPError as e:
+            error_detail = ""
+            if e.response is not None and e.response.content:
+                try:
+                    error_detail = f" - {e.response.json()}"
+                except ValueError:
+                    error_detail = f" - {e.response.text[:200]}"
+            raise Exception(f"Lỗi khi lấy {error_label}: {str(e)}{error_detail}")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Lỗi khi lấy {error_label}: {str(e)}")
+        # Một số endpoint trả thẳng list thay vì {'list': [...]}
+        if isinstance(data, list):
+            return {'list': data, 'has_more': False}
+        return data
+
+    def _iter_pages(self, url: str, params: Dict, error_label: str,
+                    limit: int = 100, prefetch: bool = False,
+                    cache_endpoint: str = None) -> Iterator[List[Dict]]:
+        """Duyệt lần lượt từng page của endpoint dạng list, theo has_more tới hết
+
+        Args:
+            url: Endpoint list
+            params: Query params (fields, sort, ...) - page/limit sẽ được thêm vào
+            error_label: Mô tả dùng trong thông báo lỗi
+            limit: Số item mỗi page (tối đa 100)
+            prefetch: Lấy trước page N+1 ở thread nền trong lúc caller xử lý page N.
+                Bộ nhớ giữ tối đa 2 page.
+            cache_endpoint: Loại TTL nếu muốn cache từng page (None = không cache)
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def fetch(page_no: int) -> Dict:
+            if self.log_callback:
+                self.log_callback(f"[DEBUG] Đang lấy {error_label}, page {page_no}")
+            return self._fetch_page(url, dict(params, page=page_no, limit=limit), error_label,
+                                    cache_endpoint=cache_endpoint)
+
+        try:
+            page = 1
+            pending = executor.submit(fetch, page) if executor else None
+            while True:
+                data = pending.result() if pending else fetch(page)
+                pending = None
+                items = data.get('list', [])
+                has_more = bool(data.get('has_more', False)) and bool(items)
+                page = data.get('page', page) + 1
+                if has_more and executor:
+                    pending = executor.submit(fetch, page)
+                yield items
+                if not has_more:
+                    break
+        finally:
+            if executor:
+                # Caller dừng giữa chừng: không chờ page đang prefetch
+                executor.shutdown(wait=False)
+
+    def iter_playlist_videos(self, playlist_id: str, fields=None,
+                             prefetch: bool = False) -> Iterator[Dict]:
+        """Duyệt (lazy) toàn bộ video trong playlist, yield từng video khi page về
+
         Args:
             playlist_id: Playlist ID hoặc URL
-            limit: Số lượng video tối đa (mặc định 100)
-        
-        Returns:
-            List các video dict với thông tin đầy đủ
+            fields: Field cần lấy (mặc định VIDEO_FIELDS)
+            prefetch: Lấy trước page tiếp theo ở thread nền
         """
         # Extract playlist ID nếu là URL
         if playlist_id.startswith('http'):
             playlist_id = self.extract_playlist_id(playlist_id)
-        
-        token = self.get_access_token()
         # Dùng PUBLIC API endpoint cho thao tác đọc danh sách video từ playlist
         url = f"{self.base_url}/playlist/{playlist_id}/videos"
+        params = {'fields': self._fields_param(fields, self.VIDEO_FIELDS)}
+        for items in self._iter_pages(url, params, f"danh sách video từ playlist {playlist_id}",
+                                      prefetch=prefetch, cache_endpoint='playlist_videos'):
+            yield from items
+
+    def iter_playlists(self, user_id: str, fields=None,
+                       prefetch: bool = False) -> Iterator[Dict]:
+        """Duyệt (lazy) toàn bộ playlist của một kênh/user
+
+        Args:
+            user_id: Username hoặc user ID
+            fields: Field cần lấy (mặc định PLAYLIST_FIELDS)
+            prefetch: Lấy trước page tiếp theo ở thread nền
+        """
+        url = f"{self.base_url}/user/{user_id}/playlists"
+        params = {'fields': self._fields_param(fields, self.PLAYLIST_FIELDS)}
+        for items in self._iter_pages(url, params, f"danh sách playlist của user {user_id}",
+                                      prefetch=prefetch):
+            yield from items
+
+    def iter_user_videos(self, user_id: str, fields=None, created_after: int = None,
+                         stop_at_id: str = None, prefetch: bool = False) -> Iterator[Dict]:
+        """Duyệt (lazy) video PUBLIC của một kênh/user, mới nhất trước
+
+        Args:
+            user_id: Username hoặc user ID (ví dụ: 'luyeuphim')
+            fields: Field cần lấy (mặc định USER_VIDEO_FIELDS)
+            created_after: Chỉ lấy video tạo sau timestamp này (lọc phía server)
+            stop_at_id: Dừng khi gặp video ID này (đã quét ở lần trước),
+                video này và các video cũ hơn không được yield
+            prefetch: Lấy trước page tiếp theo ở thread nền
+
+        Lưu ý:
+            - List sort=recent nên khi gặp video cũ hơn created_after hoặc gặp
+              stop_at_id thì các page sau chắc chắn đã quét rồi
+        """
+        url = f"{self.base_url}/user/{user_id}/videos"
         params = {
-            'fields': 'id,title,description,embed_url,url,thumbnail_url,private,created_time',
-            'limit': limit
-        }
-        headers = {
-            "Authorization": f"Bearer {token}"
+            "fields": self._fields_param(fields, self.USER_VIDEO_FIELDS),
+            "sort": "recent"  # video mới nhất trước
         }
+        if created_after:
+            params["created_after"] = int(created_after)
+
+        for items in self._iter_pages(url, params, f"danh sách video của user {user_id}",
+                                      prefetch=prefetch):
+            for v in items:
+                created = v.get("created_time")
+                # Tới vùng đã quét (watermark) → dừng phân trang
+                if (stop_at_id and v.get("id") == stop_at_id) or (
+                    created_after and created and int(created) < int(created_after)
+                ):
+                    return
+                yield v
+
+    def get_playlist_videos(self, playlist_id: str, limit: int = None) -> List[Dict]:
+        """Lấy danh sách tất cả video trong playlist
         
-        try:
-            if self.log_callback:
-                self.log_callback(f"[DEBUG] Đang lấy video từ playlist: {playlist_id}")
-                self.log_callback(f"[DEBUG] URL: {url}")
-            
-            response = requests.get(url, headers=headers, params=params)
-            
-            # Log response để debug
-            if self.log_callback:
-                self.log_callback(f"[DEBUG] Response status: {response.status_code}")
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            # Log response data để debug
-            if self.log_callback:
-                self.log_callback(f"[DEBUG] Response data keys: {list(data.keys()) if isinstance(data, dict) else 'list'}")
-            
-            # Trả về list videos
-            if 'list' in data:
-                videos = data['list']
-                if self.log_callback:
-                    self.log_callback(f"[DEBUG] Tìm thấy {len(videos)} video trong playlist")
-                return videos
-            elif isinstance(data, list):
-                if self.log_callback:
-                    self.log_callback(f"[DEBUG] Tìm thấy {len(data)} video trong playlist (direct list)")
-                return data
-            else:
-                if self.log_callback:
-                    self.log_callback(f"[DEBUG] Response không phải list, keys: {list(data.keys()) if isinstance(data, dict) else 'unknown'}")
-                return []
-        except requests.exceptions.HTTPError as e:
-            error_detail = ""
-            if response.content:
-                try:
-                    error_data = response.json()
-                    error_detail = f" - {error_data}"
-                    if self.log_callback:
-                        self.log_callback(f"[DEBUG] Error response: {error_data}")
-                except:
-                    error_detail = f" - {response.text[:200]}"
-            raise Exception(f"Lỗi khi lấy danh sách video từ playlist (HTTP {response.status_code}): {str(e)}{error_detail}")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Lỗi khi lấy danh sách video từ playlist: {str(e)}")
+        Args:
+            playlist_id: Playlist ID hoặc URL
+            limit: Số lượng video tối đa (mặc định None = lấy hết, theo has_more)
+        
+        Returns:
+            List các video dict với thông tin đầy đủ
+        """
+        videos = list(islice(self.iter_playlist_videos(playlist_id), limit))
+        if self.log_callback:
+            self.log_callback(f"[DEBUG] Tìm thấy {len(videos)} video trong playlist")
+        return videos
     
-    def get_user_videos(self, user_id: str, max_videos: int = 1000) -> List[Dict]:
+    def get_user_videos(self, user_id: str, max_videos: int = 1000,
+                        fields=None, created_after: int = None,
+                        stop_at_id: str = None) -> List[Dict]:
         """Lấy danh sách video PUBLIC của một kênh/user.
         
         Args:
             user_id: Username hoặc user ID (ví dụ: 'luyeuphim')
             max_videos: Số video tối đa muốn lấy
+            fields: Danh sách field cần lấy (str "a,b,c" hoặc list).
+                Mặc định: USER_VIDEO_FIELDS. Truyền thêm 'embed_url' để khỏi phải
+                gọi get_video_info cho từng video.
+            created_after: Chỉ lấy video tạo sau timestamp này (lọc phía server)
+            stop_at_id: Dừng phân trang khi gặp video ID này (đã quét ở lần trước)
         
         Lưu ý:
             - Chỉ trả về các video không private (public / unlisted)
             - Sử dụng PUBLIC API endpoint: /user/{id}/videos
+            - Bản lazy: iter_user_videos
         """
-        token = self.get_access_token()
-        url = f"{self.base_url}/user/{user_id}/videos"
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        
-        all_videos: List[Dict] = []
-        page = 1
-        limit = 100
-        
-        while len(all_videos) < max_videos:
-            params = {
-                "fields": "id,title,url,thumbnail_url,created_time,private",
-                "page": page,
-                "limit": limit,
-                "sort": "recent"  # video mới nhất trước
-            }
-            try:
-                if self.log_callback:
-                    self.log_callback(f"[DEBUG] Đang lấy videos của user {user_id}, page {page}")
-                
-                response = requests.get(url, headers=headers, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                videos = data.get("list", [])
-                all_videos.extend(videos)
-                
-                if self.log_callback:
-                    self.log_callback(f"[DEBUG] Page {page}: lấy {len(videos)} video (tổng {len(all_videos)})")
-                
-                # Dừng nếu hết hoặc đạt max_videos
-                has_more = data.get("has_more", False)
-                if not has_more or not videos or len(all_videos) >= max_videos:
-                    break
-                
-                page = data.get("page", page) + 1
-            except requests.exceptions.RequestException as e:
-                raise Exception(f"Lỗi khi lấy danh sách video của user {user_id}: {str(e)}")
-        
-        return all_videos[:max_videos]
+        return list(islice(
+            self.iter_user_videos(user_id, fields=fields, created_after=created_after,
+                                  stop_at_id=stop_at_id),
+            max_videos
+        ))
+
+    @staticmethod
+    def _fields_param(fields, default: str) -> str:
+        """Chuẩn hóa tham số fields (str "a,b,c" hoặc list) thành chuỗi"""
+        if fields is None:
+            return default
+        if not isinstance(fields, str):
+            return ",".join(fields)
+        return fields
     
     def upload_and_publish(self, file_path: str, title: str, description: str,
                           username: str = None, channel_id: str = None, private: bool = True,
@@ -728,6 +1568,21 @@ class DailymotionAPI:
             private: Video ở chế độ private
             progress_callback: Callback để hiển thị tiến trình
         """
+        # Bước 0: File đã upload rồi (cùng nội dung) → dùng lại video cũ
+        existing = self.find_uploaded_video(file_path)
+        if existing:
+            if progress_callback:
+                progress_callback(f"File đã được upload trước đó (video {existing.get('id')}), bỏ qua upload")
+            return {
+                'video_id': existing.get('id'),
+                'title': existing.get('title'),
+                'embed_url': existing.get('embed_url'),
+                'url': existing.get('url'),
+                'thumbnail_url': existing.get('thumbnail_url'),
+                'private': existing.get('private'),
+                'duplicate': True
+            }
+        
         # Bước 1: Upload file
         if progress_callback:
             progress_callback("Đang upload file...")
@@ -758,12 +1613,44 @@ class DailymotionAPI:
             progress_callback("Đang lấy thông tin video...")
         video_info = self.get_video_info(video_id)
         
-        return {
+        result = {
             'video_id': video_id,
             'title': video_info.get('title'),
             'embed_url': video_info.get('embed_url'),
             'url': video_info.get('url'),
             'thumbnail_url': video_info.get('thumbnail_url'),
-            'private': video_info.get('private')
+            'private': video_info.get('private'),
+            'duplicate': False
         }
+        if self.upload_index:
+            self.upload_index.record(self.upload_index.fingerprint_file(file_path), result, file_path)
+        return result
+    
+    def find_uploaded_video(self, file_path: str) -> Optional[Dict]:
+        """Tìm video đã upload từ file có cùng nội dung (theo upload_index)
+        
+        Returns:
+            Thông tin video (VIDEO_FIELDS) nếu video vẫn còn trên Dailymotion,
+            None nếu chưa upload / không bật upload_index. Video đã bị xóa thì
+            fingerprint bị gỡ khỏi chỉ mục.
+        """
+        if not self.upload_index:
+            return None
+        fingerprint = self.upload_index.fingerprint_file(file_path)
+        hit = self.upload_index.lookup(fingerprint)
+        if not hit or not hit.get('video_id'):
+            return None
+        
+        url = f"{self.base_url}/video/{hit['video_id']}"
+        try:
+            return self._get_json(url, {'fields': self.VIDEO_FIELDS}, endpoint='video')
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code in (403, 404, 410):
+                if self.log_callback:
+                    self.log_callback(f"⚠️ Video {hit['video_id']} không còn tồn tại, sẽ upload lại")
+                self.upload_index.forget(fingerprint)
+                return None
+            raise Exception(f"Lỗi khi kiểm tra video đã upload: {str(e)}")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Lỗi khi kiểm tra video đã upload: {str(e)}")
 
@@ -0,0 +1,868 @@
+import asyncio
+import copy
+import threading
+import time
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, List
+
+import httpx
+
+from dailymotion_api import DailymotionAPI
+from response_cache import ResponseCache
+
+
+class AsyncDailymotionAPI:
+    """Client asyncio cho Dailymotion API, cùng bộ method với DailymotionAPI
+
+    Request gửi bằng httpx.AsyncClient ngay trên event loop: hàng chục
+    coroutine (nhiều kênh / nhiều video) cùng chờ mạng trên 1 thread, dùng
+    chung 1 connection pool (keep-alive, tối đa `concurrency` kết nối).
+    asyncio.Semaphore giới hạn số request đang chạy cùng lúc.
+
+    Dùng chung với DailymotionAPI bên dưới: access token, rate limiter +
+    retry/backoff, response cache và thống kê request. Riêng upload file
+    (đọc đĩa + ChunkedUploader) và refresh token khi bật token_cache_path
+    (khóa file liên process) chạy trên thread qua asyncio.to_thread.
+
+    Mỗi client chỉ dùng trên 1 event loop (vd: loop của SyncRunner).
+
+    Ví dụ:
+        async with AsyncDailymotionAPI(key, secret, concurrency=16) as api:
+            infos = await asyncio.gather(*(api.get_video_info(v) for v in ids))
+            async for v in api.iter_user_videos('luyeuphim'):
+                ...
+    """
+
+    def __init__(self, api_key: str = None, api_secret: str = None,
+                 concurrency: int = 16, api: DailymotionAPI = None,
+                 client: httpx.AsyncClient = None, **api_kwargs):
+        """
+        Args:
+            api_key: Dailymotion API Key (bỏ qua nếu truyền api)
+            api_secret: Dailymotion API Secret
+            concurrency: Số request tối đa chạy đồng thời
+            api: DailymotionAPI có sẵn để dùng chung token/cache/rate limit (vd: của GUI)
+            client: httpx.AsyncClient tùy chỉnh (vd: MockTransport trong test).
+                Mặc định tạo client với pool `concurrency` kết nối
+            **api_kwargs: Tham số thêm cho DailymotionAPI (rate_limit, cache, ...)
+        """
+        # Chỉ đóng session / client khi client này tự tạo
+        self._owns_api = api is None
+        self._owns_client = client is None
+        if api is None:
+            api = DailymotionAPI(api_key, api_secret, **api_kwargs)
+        self.api = api
+        self.concurrency = concurrency
+        self._client = client or httpx.AsyncClient(
+            timeout=self._httpx_timeout(api.timeout),
+            limits=httpx.Limits(max_connections=concurrency,
+                                max_keepalive_connections=concurrency),
+            follow_redirects=True,
+        )
+        # Semaphore / lock gắn với event loop nên tạo lười khi gọi lần đầu
+        self._loop = None
+        self._semaphore = None
+        self._token_lock = None
+        # GET đang chạy theo cache key: coroutine gọi trùng key dùng chung kết quả
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _httpx_timeout(timeout) -> httpx.Timeout:
+        """Đổi timeout kiểu requests ((connect, read) hoặc số giây) sang httpx.Timeout
+
+        Không đặt pool timeout: số request chờ kết nối đã bị semaphore giới hạn.
+        """
+        if isinstance(timeout, (tuple, list)):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect, pool=None)
+        return httpx.Timeout(timeout, pool=None)
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._token_lock = asyncio.Lock()
+            self._inflight = {}
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def _request(self, method: str, url: str, retry: bool = None, throttle: bool = True,
+                       **kwargs) -> httpx.Response:
+        """Như DailymotionAPI._request (rate limit, retry 429/5xx/lỗi kết nối)
+        nhưng gửi bằng httpx.AsyncClient và chờ bằng asyncio.sleep"""
+        self._bind_loop()
+        api = self.api
+        method = method.upper()
+        retry_errors = retry if retry is not None else method in api.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if throttle and api.rate_limiter:
+                await self._throttle()
+            api._count('requests')
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, url, **kwargs)
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                if not retry_errors or attempt >= api.max_retries:
+                    raise
+                delay = api._backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                decision = api._retry_decision(response, attempt, retry, retry_errors, throttle)
+                if decision is None:
+                    return response
+                delay, reason = decision
+
+            attempt += 1
+            api._note_retry(method, url, reason, attempt, delay)
+            await asyncio.sleep(delay)
+
+    async def _throttle(self):
+        """Chờ token của rate limiter dùng chung mà không chặn event loop"""
+        waited = 0.0
+        while True:
+            delay = self.api.rate_limiter.try_acquire()
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        if waited:
+            self.api._count('wait_seconds', waited)
+
+    async def _auth_headers(self, **extra) -> Dict[str, str]:
+        token = await self.get_access_token()
+        return dict(extra, Authorization=f"Bearer {token}")
+
+    async def _get_json(self, url: str, params: Dict = None, endpoint: str = None):
+        """GET JSON, đi qua response cache nếu có (endpoint = loại TTL)
+
+        Raises:
+            httpx.HTTPError: lỗi HTTP / kết nối
+        """
+        cache = self.api.cache
+        if not cache or not endpoint:
+            return (await self._send_get(url, params)).json()
+
+        key = ResponseCache.make_key(url, params)
+        data = cache.get_fresh(key)
+        if data is not None:
+            return data
+
+        self._bind_loop()
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Coroutine đang lấy key này bị hủy giữa chừng → tự gửi request
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._revalidate(key, url, params, endpoint)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Không có ai chờ thì asyncio khỏi cảnh báo "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _revalidate(self, key: str, url: str, params: Dict, endpoint: str):
+        cache = self.api.cache
+        entry = cache.get(key)
+        extra_headers = {}
+        if entry and entry.get('etag'):
+            extra_headers['If-None-Match'] = entry['etag']
+        response = await self._send_get(url, params, extra_headers)
+        if response.status_code == 304 and entry:
+            # Server xác nhận dữ liệu không đổi → gia hạn TTL
+            return cache.touch(key, entry, endpoint)
+        result = response.json()
+        cache.set(key, result, endpoint, response.headers.get('ETag'))
+        return result
+
+    async def _send_get(self, url: str, params: Dict = None,
+                        extra_headers: Dict = None) -> httpx.Response:
+        headers = await self._auth_headers(**(extra_headers or {}))
+        response = await self._request('GET', url, headers=headers, params=params)
+        # httpx coi 304 là lỗi khi raise_for_status, requests thì không
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _error_detail(response) -> str:
+        """Nội dung lỗi từ body của response (để đưa vào thông báo lỗi)"""
+        if response is None or not response.content:
+            return ""
+        try:
+            return f" - {response.json()}"
+        except ValueError:
+            return f" - {response.text[:200]}"
+
+    def _user_url(self, username: str, channel_id: str, resource: str, error: str) -> str:
+        """Endpoint Partner API /user/{username hoặc channel_id}/{resource}"""
+        # Ưu tiên dùng username, sau đó channel_id
+        owner = (username or '').strip() or (channel_id or '').strip()
+        if not owner:
+            raise Exception(error)
+        return f"{self.api.partner_api_url}/user/{owner}/{resource}"
+
+    # ------------------------------------------------------------------
+    # Phân trang
+    # ------------------------------------------------------------------
+    async def _fetch_page(self, url: str, params: Dict, error_label: str,
+                          cache_endpoint: str = None) -> Dict:
+        """Lấy 1 page của endpoint dạng list (trả về dict có 'list', 'has_more', 'page')"""
+        try:
+            data = await self._get_json(url, params, endpoint=cache_endpoint)
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"Lỗi khi lấy {error_label}: {str(e)}{self._error_detail(e.response)}")
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi lấy {error_label}: {str(e)}")
+        # Một số endpoint trả thẳng list thay vì {'list': [...]}
+        if isinstance(data, list):
+            return {'list': data, 'has_more': False}
+        return data
+
+    async def _iter_pages(self, url: str, params: Dict, error_label: str,
+                          limit: int = 100, prefetch: bool = True,
+                          cache_endpoint: str = None) -> AsyncIterator[List[Dict]]:
+        """Duyệt lần lượt từng page theo has_more tới hết (xem DailymotionAPI._iter_pages)
+
+        prefetch: Gửi request page N+1 (task trên cùng event loop) trong lúc
+            caller xử lý page N. Bộ nhớ giữ tối đa 2 page.
+        """
+        async def fetch(page_no: int) -> Dict:
+            if self.api.log_callback:
+                self.api.log_callback(f"[DEBUG] Đang lấy {error_label}, page {page_no}")
+            return await self._fetch_page(url, dict(params, page=page_no, limit=limit),
+                                          error_label, cache_endpoint=cache_endpoint)
+
+        page = 1
+        pending = None
+        try:
+            data = await fetch(page)
+            while True:
+                items = data.get('list', [])
+                has_more = bool(data.get('has_more', False)) and bool(items)
+                page = data.get('page', page) + 1
+                if has_more and prefetch:
+                    pending = asyncio.ensure_future(fetch(page))
+                yield items
+                if not has_more:
+                    return
+                if pending:
+                    task, pending = pending, None
+                    data = await task
+                else:
+                    data = await fetch(page)
+        finally:
+            # Caller dừng giữa chừng: hủy page đang prefetch
+            if pending and not pending.cancel() and not pending.cancelled():
+                pending.exception()
+
+    @staticmethod
+    async def _collect(items: AsyncIterator[Dict], limit: int = None) -> List[Dict]:
+        """Gom tối đa limit item của async iterator (None = lấy hết)"""
+        result: List[Dict] = []
+        try:
+            if limit is not None and limit <= 0:
+                return result
+            async for item in items:
+                result.append(item)
+                if limit is not None and len(result) >= limit:
+                    break
+        finally:
+            await items.aclose()
+        return result
+
+    # ------------------------------------------------------------------
+    # Token / user
+    # ------------------------------------------------------------------
+    async def get_access_token(self) -> str:
+        """Như DailymotionAPI.get_access_token: nhiều coroutine cùng gọi khi token
+        sắp hết hạn thì chỉ 1 coroutine refresh"""
+        api = self.api
+        if api._token_is_valid():
+            return api.access_token
+        self._bind_loop()
+        async with self._token_lock:
+            if api._token_is_valid():
+                return api.access_token
+            if api.token_cache_path:
+                # Cache trên đĩa cần khóa file liên process (blocking) → chạy trên thread
+                return await asyncio.to_thread(api.get_access_token)
+            return await self._fetch_access_token()
+
+    async def _fetch_access_token(self) -> str:
+        """Gọi /oauth/token (client_credentials) để lấy token mới"""
+        api = self.api
+        requested_at = time.time()
+        url = f"{api.base_url}/oauth/token"
+        data = {
+            'grant_type': 'client_credentials',
+            'client_id': api.api_key,
+            'client_secret': api.api_secret,
+            'scope': 'manage_videos'
+        }
+        try:
+            response = await self._request('POST', url, data=data)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            api._raise_token_error(e.response, e)
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi lấy access token: {str(e)}")
+        return api._apply_token_response(response.json(), requested_at)
+
+    async def invalidate_token(self):
+        """Bỏ token hiện tại để lần gọi sau lấy token mới"""
+        if self.api.token_cache_path:
+            await asyncio.to_thread(self.api.invalidate_token)
+        else:
+            self.api.invalidate_token()
+
+    async def get_user_id(self) -> str:
+        try:
+            headers = await self._auth_headers()
+            response = await self._request('GET', f"{self.api.base_url}/me", headers=headers,
+                                           params={'fields': 'id,username'})
+            if response.status_code == 200:
+                user_data = response.json()
+                return user_data.get('id') or user_data.get('username', '')
+        except Exception:
+            pass
+        return None
+
+    # ------------------------------------------------------------------
+    # Upload / video
+    # ------------------------------------------------------------------
+    async def get_upload_url(self, username: str = None) -> Dict[str, str]:
+        url = f"{self.api.partner_api_url}/file/upload"
+        headers = await self._auth_headers(accept="application/json")
+        try:
+            response = await self._request('GET', url, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                # Token không có quyền / đã bị thu hồi → lần gọi sau lấy token mới
+                await self.invalidate_token()
+            raise Exception(f"Lỗi khi lấy upload URL: {str(e)}{self._error_detail(e.response)}")
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi lấy upload URL: {str(e)}")
+
+    async def upload_video_file(self, file_path: str, progress_callback=None,
+                                username: str = None, **upload_kwargs) -> Dict:
+        """Upload file bằng ChunkedUploader của DailymotionAPI trên 1 thread riêng
+        (đọc đĩa + giới hạn băng thông là blocking)
+
+        upload_kwargs: chunk_size, max_bandwidth, on_progress, resume_state
+        """
+        return await asyncio.to_thread(self.api.upload_video_file, file_path,
+                                       progress_callback, username=username, **upload_kwargs)
+
+    async def create_video(self, video_url: str, title: str, description: str,
+                           channel_id: str = None, username: str = None, private: bool = True,
+                           is_created_for_kids: bool = False) -> Dict:
+        url = self._user_url(username, channel_id, 'videos',
+                             "Cần cung cấp username hoặc channel_id. "
+                             "Token client_credentials không hỗ trợ /me/videos.")
+        headers = await self._auth_headers(**{"Content-Type": "application/x-www-form-urlencoded"})
+        data = DailymotionAPI._create_video_data(video_url, title, description, private,
+                                                 is_created_for_kids)
+        try:
+            response = await self._request('POST', url, headers=headers, data=data)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"Lỗi khi tạo video: {str(e)}{self._error_detail(e.response)} (URL: {url})")
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi tạo video: {str(e)}")
+        result = response.json()
+        # Bỏ cache cũ (nếu có) của video vừa tạo
+        if result.get('id'):
+            self.api.invalidate_cache(f"{self.api.base_url}/video/{result['id']}")
+        return result
+
+    async def find_uploaded_video(self, file_path: str) -> Dict:
+        """Như DailymotionAPI.find_uploaded_video (hash file chạy trên thread)"""
+        index = self.api.upload_index
+        if not index:
+            return None
+        fingerprint = await asyncio.to_thread(index.fingerprint_file, file_path)
+        hit = index.lookup(fingerprint)
+        if not hit or not hit.get('video_id'):
+            return None
+
+        url = f"{self.api.base_url}/video/{hit['video_id']}"
+        try:
+            return await self._get_json(url, {'fields': self.api.VIDEO_FIELDS}, endpoint='video')
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (403, 404, 410):
+                if self.api.log_callback:
+                    self.api.log_callback(f"⚠️ Video {hit['video_id']} không còn tồn tại, sẽ upload lại")
+                index.forget(fingerprint)
+                return None
+            raise Exception(f"Lỗi khi kiểm tra video đã upload: {str(e)}")
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi kiểm tra video đã upload: {str(e)}")
+
+    async def upload_and_publish(self, file_path: str, title: str, description: str,
+                                 username: str = None, channel_id: str = None,
+                                 private: bool = True, progress_callback=None) -> Dict:
+        """Upload video và publish trong một bước (xem DailymotionAPI.upload_and_publish)"""
+        existing = await self.find_uploaded_video(file_path)
+        if existing:
+            if progress_callback:
+                progress_callback(f"File đã được upload trước đó (video {existing.get('id')}), bỏ qua upload")
+            return {
+                'video_id': existing.get('id'),
+                'title': existing.get('title'),
+                'embed_url': existing.get('embed_url'),
+                'url': existing.get('url'),
+                'thumbnail_url': existing.get('thumbnail_url'),
+                'private': existing.get('private'),
+                'duplicate': True
+            }
+
+        if progress_callback:
+            progress_callback("Đang upload file...")
+        upload_result = await self.upload_video_file(file_path, progress_callback, username=username)
+        video_url = upload_result.get('url')
+        if not video_url:
+            raise Exception("Không lấy được video URL sau khi upload")
+
+        if progress_callback:
+            progress_callback("Đang tạo video...")
+        video_data = await self.create_video(video_url=video_url, title=title,
+                                             description=description, username=username,
+                                             channel_id=channel_id, private=private)
+        video_id = video_data.get('id')
+        if not video_id:
+            raise Exception("Không tạo được video")
+
+        if progress_callback:
+            progress_callback("Đang lấy thông tin video...")
+        video_info = await self.get_video_info(video_id)
+
+        result = {
+            'video_id': video_id,
+            'title': video_info.get('title'),
+            'embed_url': video_info.get('embed_url'),
+            'url': video_info.get('url'),
+            'thumbnail_url': video_info.get('thumbnail_url'),
+            'private': video_info.get('private'),
+            'duplicate': False
+        }
+        index = self.api.upload_index
+        if index:
+            fingerprint = await asyncio.to_thread(index.fingerprint_file, file_path)
+            index.record(fingerprint, result, file_path)
+        return result
+
+    async def get_video_info(self, video_id: str) -> Dict:
+        if video_id.startswith('http'):
+            video_id = self.api.extract_video_id(video_id)
+        url = f"{self.api.base_url}/video/{video_id}"
+        try:
+            return await self._get_json(url, {'fields': self.api.VIDEO_FIELDS}, endpoint='video')
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi lấy thông tin video: {str(e)}")
+
+    async def get_videos_info(self, video_ids: List[str], chunk_size: int = 100) -> Dict:
+        """Như DailymotionAPI.get_videos_info nhưng các chunk gửi song song"""
+        api = self.api
+        normalized = api._normalize_video_ids(video_ids)
+
+        # Dùng cache của get_video_info trước, chỉ gọi API cho ID chưa có
+        videos: Dict[str, Dict] = {}
+        to_fetch = []
+        for vid in normalized:
+            cached = api.cache.get_fresh(api._video_cache_key(vid)) if api.cache else None
+            if cached is not None:
+                videos[vid] = cached
+            else:
+                to_fetch.append(vid)
+
+        chunk_size = max(1, min(chunk_size, 100))
+        pages = await asyncio.gather(*(
+            self._fetch_videos_chunk(to_fetch[i:i + chunk_size])
+            for i in range(0, len(to_fetch), chunk_size)
+        ))
+        for items in pages:
+            for info in items:
+                if info.get('id'):
+                    videos[info['id']] = info
+                    if api.cache:
+                        api.cache.set(api._video_cache_key(info['id']), info, 'video')
+
+        missing = [vid for vid in normalized if vid not in videos]
+        if api.log_callback and normalized:
+            api.log_callback(
+                f"[DEBUG] get_videos_info: {len(videos)}/{len(normalized)} video, "
+                f"thiếu {len(missing)}"
+            )
+        return {'videos': videos, 'missing': missing}
+
+    async def _fetch_videos_chunk(self, chunk: List[str]) -> List[Dict]:
+        params = {
+            'ids': ','.join(chunk),
+            'fields': self.api.VIDEO_FIELDS,
+            'limit': len(chunk)
+        }
+        try:
+            response = await self._request('GET', f"{self.api.base_url}/videos",
+                                           headers=await self._auth_headers(), params=params)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi lấy thông tin nhiều video: {str(e)}")
+        return response.json().get('list', [])
+
+    # ------------------------------------------------------------------
+    # Playlist
+    # ------------------------------------------------------------------
+    async def create_playlist(self, username: str = None, channel_id: str = None,
+                              title: str = "", description: str = "",
+                              video_ids: List[str] = None) -> Dict:
+        api = self.api
+        url = self._user_url(username, channel_id, 'playlists',
+                             "Cần cung cấp username hoặc channel_id để tạo playlist. "
+                             "Token client_credentials không hỗ trợ /me/playlists.")
+        headers = await self._auth_headers(**{"Content-Type": "application/x-www-form-urlencoded"})
+        data = {
+            'name': title,
+            'description': description,
+            'published': 'true',
+            'private': 'true'
+        }
+        try:
+            response = await self._request('POST', url, headers=headers, data=data)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi tạo playlist: {str(e)}")
+        playlist_data = response.json()
+        playlist_id = playlist_data.get('id')
+        if playlist_id:
+            api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+
+        # Đặt toàn bộ danh sách video bằng 1 request (thay vì POST từng video)
+        if playlist_id and video_ids:
+            report = await self.replace_playlist_videos(playlist_id, video_ids)
+            playlist_data['videos_report'] = report
+            if report['failed'] and api.log_callback:
+                api.log_callback(f"⚠️ {len(report['failed'])} video chưa vào playlist: {report['failed']}")
+            try:
+                playlist_data.update(await self.get_playlist_info(playlist_id))
+            except Exception as e:
+                if api.log_callback:
+                    api.log_callback(f"⚠️ Không thể lấy thông tin đầy đủ playlist: {str(e)}")
+        return playlist_data
+
+    async def add_videos_to_playlist(self, playlist_id: str, video_ids: List[str],
+                                     username: str = None, channel_id: str = None):
+        """Thêm từng video (tuần tự để giữ thứ tự), trả về {video_id: 'ok' | 'lỗi: ...'}"""
+        api = self.api
+        url = self._user_url(username, channel_id, f"playlists/{playlist_id}/videos",
+                             "Cần cung cấp username hoặc channel_id để thêm video vào playlist. "
+                             "Token client_credentials không hỗ trợ /me/playlists.")
+        headers = await self._auth_headers(**{"Content-Type": "application/x-www-form-urlencoded"})
+        results: Dict[str, str] = {}
+        for video_id in video_ids:
+            try:
+                response = await self._request('POST', url, headers=headers, data={'video': video_id})
+                response.raise_for_status()
+                results[video_id] = 'ok'
+            except httpx.HTTPError as e:
+                results[video_id] = f"lỗi: {e}"
+                if api.log_callback:
+                    api.log_callback(f"⚠️ Không thể thêm video {video_id} vào playlist: {str(e)}")
+        api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+        return results
+
+    async def replace_playlist_videos(self, playlist_id: str, video_ids: List[str],
+                                      chunk_size: int = 100, verify: bool = True) -> Dict:
+        """Như DailymotionAPI.replace_playlist_videos (cùng _replace_plan())"""
+        api = self.api
+        if playlist_id.startswith('http'):
+            playlist_id = api.extract_playlist_id(playlist_id)
+        ids = api._normalize_video_ids(video_ids)
+        headers = await self._auth_headers()
+        results: Dict[str, str] = {}
+
+        if not ids:
+            requests_made = await self._clear_playlist(playlist_id, headers, chunk_size)
+            return api._playlist_report(playlist_id, requests_made, results)
+
+        steps = api._replace_plan(ids, chunk_size)
+        requests_made = 0
+        for index, step in enumerate(steps):
+            requests_made += 1
+            status = await self._playlist_ids_call('POST', playlist_id, step['ids'], headers)
+            if status != 'ok':
+                # Không biết playlist đang ở trạng thái nào → không gửi tiếp
+                api._mark_replace_failed(results, steps, index, status)
+                break
+            results.update(dict.fromkeys(step['new'], 'ok'))
+
+        api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+        if verify and 'ok' in results.values():
+            requests_made += await self._verify_playlist_videos(playlist_id, results)
+        return api._playlist_report(playlist_id, requests_made, results)
+
+    async def _clear_playlist(self, playlist_id: str, headers: Dict, chunk_size: int) -> int:
+        """Như DailymotionAPI._clear_playlist"""
+        api = self.api
+        api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+        try:
+            current = [v.get('id') for v in await self._collect(
+                self.iter_playlist_videos(playlist_id, fields='id'))]
+            requests_made = max(1, -(-len(current) // 100))
+            for chunk in api._chunks(current, chunk_size):
+                requests_made += 1
+                status = await self._playlist_ids_call('DELETE', playlist_id, chunk, headers)
+                if status != 'ok':
+                    raise Exception(f"Lỗi khi xóa video khỏi playlist: {status}")
+        finally:
+            api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+        return requests_made
+
+    async def sync_playlist(self, playlist_id: str, video_ids: List[str],
+                            chunk_size: int = 100, verify: bool = True) -> Dict:
+        """Như DailymotionAPI.sync_playlist: chỉ gửi phần khác biệt khi rẻ hơn replace"""
+        api = self.api
+        if playlist_id.startswith('http'):
+            playlist_id = api.extract_playlist_id(playlist_id)
+        desired = api._normalize_video_ids(video_ids)
+        # Luôn đọc trạng thái mới nhất từ server
+        api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+        current = [v.get('id') for v in await self._collect(
+            self.iter_playlist_videos(playlist_id, fields='id'))]
+        requests_made = max(1, -(-len(current) // 100))
+
+        plan = api._sync_plan(current, desired, chunk_size)
+        mode, added, removed = plan['mode'], plan['added'], plan['removed']
+
+        if mode == 'replace':
+            report = await self.replace_playlist_videos(playlist_id, desired, chunk_size, verify)
+            report['requests'] += requests_made
+        else:
+            headers = await self._auth_headers()
+            results = {vid: 'ok' for vid in desired}
+            if mode == 'append':
+                for vid in added:
+                    requests_made += 1
+                    results[vid] = await self._playlist_video_call('POST', playlist_id, vid, headers)
+            elif mode == 'remove':
+                for chunk in api._chunks(removed, chunk_size):
+                    requests_made += 1
+                    status = await self._playlist_ids_call('DELETE', playlist_id, chunk, headers)
+                    if status != 'ok':
+                        results.update(dict.fromkeys(chunk, status))
+            if mode != 'noop':
+                api.invalidate_cache(f"{api.base_url}/playlist/{playlist_id}")
+                if verify:
+                    requests_made += await self._verify_playlist_videos(playlist_id, results)
+            report = api._playlist_report(playlist_id, requests_made, results)
+
+        report.update({'mode': mode, 'added': added, 'removed': removed})
+        if api.log_callback:
+            api.log_callback(
+                f"[DEBUG] sync_playlist {playlist_id}: {mode}, +{len(added)} -{len(removed)}, "
+                f"{report['requests']} request"
+            )
+        return report
+
+    async def _playlist_video_call(self, method: str, playlist_id: str, video_id: str,
+                                   headers: Dict) -> str:
+        """Thêm (POST) / xóa (DELETE) 1 video của playlist, trả về 'ok' hoặc lỗi"""
+        url = f"{self.api.partner_api_url}/playlist/{playlist_id}/videos/{video_id}"
+        try:
+            response = await self._request(method, url, headers=headers)
+            response.raise_for_status()
+            return 'ok'
+        except httpx.HTTPError as e:
+            return f"lỗi: {e}"
+
+    async def _playlist_ids_call(self, method: str, playlist_id: str, ids: List[str],
+                                 headers: Dict) -> str:
+        """Như DailymotionAPI._playlist_ids_call (ids không được rỗng)"""
+        url = f"{self.api.partner_api_url}/playlist/{playlist_id}/videos"
+        try:
+            response = await self._request(method, url, headers=headers,
+                                           params={'ids': ','.join(ids)})
+            response.raise_for_status()
+            return 'ok'
+        except httpx.HTTPError as e:
+            return f"lỗi: {e}"
+
+    async def _verify_playlist_videos(self, playlist_id: str, results: Dict[str, str]) -> int:
+        """Đánh dấu 'thiếu' cho video báo ok nhưng không có trong playlist.
+        Trả về số request đã dùng."""
+        present = set()
+        pages = 0
+        async for items in self._iter_pages(
+                f"{self.api.base_url}/playlist/{playlist_id}/videos", {'fields': 'id'},
+                f"danh sách video từ playlist {playlist_id}", prefetch=False):
+            pages += 1
+            present.update(v.get('id') for v in items)
+        for vid, status in results.items():
+            if status == 'ok' and vid not in present:
+                results[vid] = 'thiếu'
+        return pages
+
+    async def get_playlist_info(self, playlist_id: str) -> Dict:
+        if playlist_id.startswith('http'):
+            playlist_id = self.api.extract_playlist_id(playlist_id)
+        url = f"{self.api.base_url}/playlist/{playlist_id}"
+        try:
+            return await self._get_json(url, {'fields': self.api.PLAYLIST_FIELDS},
+                                        endpoint='playlist')
+        except httpx.HTTPError as e:
+            raise Exception(f"Lỗi khi lấy thông tin playlist: {str(e)}")
+
+    async def get_playlist_videos(self, playlist_id: str, limit: int = None) -> List[Dict]:
+        videos = await self._collect(self.iter_playlist_videos(playlist_id), limit)
+        if self.api.log_callback:
+            self.api.log_callback(f"[DEBUG] Tìm thấy {len(videos)} video trong playlist")
+        return videos
+
+    async def iter_playlist_videos(self, playlist_id: str, fields=None) -> AsyncIterator[Dict]:
+        """Duyệt (lazy) video trong playlist: `async for v in api.iter_playlist_videos(...)`"""
+        api = self.api
+        if playlist_id.startswith('http'):
+            playlist_id = api.extract_playlist_id(playlist_id)
+        pages = self._iter_pages(f"{api.base_url}/playlist/{playlist_id}/videos",
+                                 {'fields': api._fields_param(fields, api.VIDEO_FIELDS)},
+                                 f"danh sách video từ playlist {playlist_id}",
+                                 cache_endpoint='playlist_videos')
+        try:
+            async for items in pages:
+                for item in items:
+                    yield item
+        finally:
+            await pages.aclose()
+
+    async def iter_playlists(self, user_id: str, fields=None) -> AsyncIterator[Dict]:
+        api = self.api
+        pages = self._iter_pages(f"{api.base_url}/user/{user_id}/playlists",
+                                 {'fields': api._fields_param(fields, api.PLAYLIST_FIELDS)},
+                                 f"danh sách playlist của user {user_id}")
+        try:
+            async for items in pages:
+                for item in items:
+                    yield item
+        finally:
+            await pages.aclose()
+
+    # ------------------------------------------------------------------
+    # Kênh / user
+    # ------------------------------------------------------------------
+    async def iter_user_videos(self, user_id: str, fields=None, created_after: int = None,
+                               stop_at_id: str = None) -> AsyncIterator[Dict]:
+        """Duyệt (lazy) video PUBLIC của kênh, mới nhất trước (xem DailymotionAPI)"""
+        api = self.api
+        params = {
+            "fields": api._fields_param(fields, api.USER_VIDEO_FIELDS),
+            "sort": "recent"  # video mới nhất trước
+        }
+        if created_after:
+            params["created_after"] = int(created_after)
+        pages = self._iter_pages(f"{api.base_url}/user/{user_id}/videos", params,
+                                 f"danh sách video của user {user_id}")
+        try:
+            async for items in pages:
+                for v in items:
+                    created = v.get("created_time")
+                    # Tới vùng đã quét (watermark) → dừng phân trang
+                    if (stop_at_id and v.get("id") == stop_at_id) or (
+                        created_after and created and int(created) < int(created_after)
+                    ):
+                        return
+                    yield v
+        finally:
+            await pages.aclose()
+
+    async def get_user_videos(self, user_id: str, max_videos: int = 1000,
+                              fields=None, created_after: int = None,
+                              stop_at_id: str = None) -> List[Dict]:
+        return await self._collect(
+            self.iter_user_videos(user_id, fields=fields, created_after=created_after,
+                                  stop_at_id=stop_at_id),
+            max_videos
+        )
+
+    async def get_channels_videos(self, user_ids: List[str], max_videos: int = 1000,
+                                  **kwargs) -> Dict[str, List[Dict]]:
+        """Lấy video của nhiều kênh song song → {user_id: [video, ...]}"""
+        results = await asyncio.gather(*(
+            self.get_user_videos(uid, max_videos, **kwargs) for uid in user_ids
+        ))
+        return dict(zip(user_ids, results))
+
+    # ------------------------------------------------------------------
+    # Tiện ích
+    # ------------------------------------------------------------------
+    def extract_video_id(self, video_url_or_id: str) -> str:
+        return self.api.extract_video_id(video_url_or_id)
+
+    def extract_playlist_id(self, playlist_url: str) -> str:
+        return self.api.extract_playlist_id(playlist_url)
+
+    def get_stats(self) -> Dict:
+        return self.api.get_stats()
+
+    async def aclose(self):
+        """Đóng connection pool (và session nếu client này tự tạo DailymotionAPI)"""
+        if self._owns_client:
+            await self._client.aclose()
+        if self._owns_api:
+            self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+class SyncRunner:
+    """Chạy coroutine từ code đồng bộ (vd: Tk thread) trên 1 event loop nền
+
+    - run(coro): chạy và chờ kết quả (blocking)
+    - submit(coro): trả về concurrent.futures.Future, không chặn caller
+      (GUI có thể poll future.done() bằng root.after)
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever,
+                                        name="dm-async-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -5,377 +5,690 @@ Script export Google Sheet → JSON
 Chạy tự động mỗi 5-10 phút qua GitHub Actions
 """
 
-import gspread
-from google.oauth2.service_account import Credentials
+import argparse
+import gzip
+import hashlib
 import json
 import os
 import sys
 import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import brotli  # Tùy chọn: pip install brotli (không có thì bỏ qua bản .br)
+except ImportError:
+    brotli = None
 
 # Config
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets.readonly',
+    # Đọc modifiedTime/version của file (kiểm tra sheet có đổi không)
+    'https://www.googleapis.com/auth/drive.metadata.readonly',
+]
 SHEET_ID = "1KxEhDNIH7AdgSBSL05s4jQnPghLOo2MI8wvgBxTXv7w"
 SHEET_NAME = "Sheet4"
 CREDENTIALS_FILE = "drive_client_secret.json"
 OUTPUT_FILE = "movies.json"
+# Trạng thái lần export trước (Drive version, hash dữ liệu) để bỏ qua khi sheet không đổi
+STATE_FILE = "export_state.json"
+# Output chia nhỏ (--shards): danh mục nhẹ cho trang chủ + 1 file / phim
+CATALOG_FILE = "catalog.json"
+SHARD_DIR = "movies"
+# Chỉ mục tìm kiếm không dấu (--search-index)
+SEARCH_INDEX_FILE = "search_index.json"
+SEARCH_PREFIX_MAX = 10
+# Chữ Hán / Kana / Hangul: cả tên là 1 từ liền (không có dấu cách)
+CJK_CHARS = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]')
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
 
-def export_sheet_to_json():
-    """Export Sheet → JSON format cho web"""
-    try:
-        # Authenticate
-        if not os.path.exists(CREDENTIALS_FILE):
-            print(f"❌ Không tìm thấy file: {CREDENTIALS_FILE}")
-            sys.exit(1)
+def _noop(*args, **kwargs):
+    pass
+
+
+def poster_columns(headers) -> List[str]:
+    """Các cột poster: mọi header chứa chữ "Poster" (Poster, Poster URL, ...), theo thứ tự cột"""
+    return [k for k in headers if k and 'Poster' in str(k)]
+
+
+def _row_poster(row: Dict, columns: List[str]) -> str:
+    """Poster đầu tiên khác rỗng của 1 dòng"""
+    poster_value = ''
+    for k in columns:
+        poster_value = (row.get(k) or '').strip()
+        if poster_value:
+            break
+    return poster_value
+
+
+def build_export(rows: List[Dict], updated: str = None, headers=None, log=None) -> Dict:
+    """Chuyển các dòng sheet (get_all_records) → dữ liệu movies.json
+    
+    Hàm thuần (không đọc sheet, không ghi file), chạy O(số dòng):
+    - Header poster được xác định 1 lần (từ headers hoặc key của dòng đầu)
+    - Banner tra theo URL, tập tra theo số tập (dict) thay vì duyệt list
+    
+    Args:
+        rows: List dict {header: giá trị}
+        updated: Giá trị trường 'updated' (mặc định: thời điểm hiện tại)
+        headers: Header của sheet (mặc định: key của dòng đầu tiên)
+        log: Hàm nhận log debug (mặc định: không log)
+    
+    Returns:
+        dict {movies, banners, updated}
+    """
+    log = log or _noop
+    if headers is None:
+        headers = list(rows[0].keys()) if rows else []
+    poster_cols = poster_columns(headers)
+    
+    # Gom theo Tên Bộ Phim (A)
+    movies = {}
+    banners = []
+    banner_index = {}    # url → vị trí trong banners
+    episode_index = {}   # tên phim → {số tập: vị trí trong episodes}
+    
+    ep1_count = 0
+    for row in rows:
+        film_name = row.get('Tên Bộ Phim', '').strip()
+        if not film_name:
+            # Có thể là dòng banner (chỉ có cột O - Banner)
+            banner = row.get('Banner', '').strip()
+            if banner and banner.startswith('http'):
+                # Kiểm tra xem banner này đã có chưa (tránh trùng)
+                if banner not in banner_index:
+                    # Banner không gắn với phim nào (movieId = null)
+                    banner_index[banner] = len(banners)
+                    banners.append({
+                        'url': banner,
+                        'movieId': None
+                    })
+            continue
         
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key(SHEET_ID).worksheet(SHEET_NAME)
+        ep = row.get('Số Tập')
+        if ep is None or ep == '':
+            continue
         
-        # Lấy tất cả records
-        rows = sheet.get_all_records()
+        # Parse số tập: có thể là "1", "2", "Tập 1", "Tập 2", "FULL", v.v.
+        ep_str = str(ep).strip().upper()
         
-        # Gom theo Tên Bộ Phim (A)
-        movies = {}
-        banners = []
+        # Kiểm tra nếu là "FULL"
+        if ep_str == 'FULL' or ep_str == 'FULL TẬP' or ep_str == 'FULL TAP':
+            ep_num = 'FULL'  # Dùng string "FULL" làm identifier
+        else:
+            # Tìm số trong chuỗi
+            ep_match = re.search(r'(\d+)', ep_str)
+            if not ep_match:
+                continue  # Không có số và không phải FULL → skip
+            try:
+                ep_num = int(ep_match.group(1))
+            except:
+                continue  # Parse lỗi → skip
         
-        print(f"📊 Tổng số rows trong Sheet: {len(rows)}")
-        ep1_count = 0
-        for row in rows:
-            film_name = row.get('Tên Bộ Phim', '').strip()
-            if not film_name:
-                # Có thể là dòng banner (chỉ có cột O - Banner)
-                banner = row.get('Banner', '').strip()
-                if banner and banner.startswith('http'):
-                    # Kiểm tra xem banner này đã có chưa (tránh trùng)
-                    banner_exists = False
-                    for b in banners:
-                        if isinstance(b, dict) and b.get('url') == banner:
-                            banner_exists = True
-                            break
-                        elif isinstance(b, str) and b == banner:
-                            banner_exists = True
-                            break
-                    
-                    if not banner_exists:
-                        # Banner không gắn với phim nào (movieId = null)
-                        banners.append({
-                            'url': banner,
-                            'movieId': None
-                        })
-                continue
-            
-            ep = row.get('Số Tập')
-            if ep is None or ep == '':
-                continue
-            
-            # Parse số tập: có thể là "1", "2", "Tập 1", "Tập 2", "FULL", v.v.
-            ep_str = str(ep).strip().upper()
-            
-            # Kiểm tra nếu là "FULL"
-            if ep_str == 'FULL' or ep_str == 'FULL TẬP' or ep_str == 'FULL TAP':
-                ep_num = 'FULL'  # Dùng string "FULL" làm identifier
-            else:
-                # Tìm số trong chuỗi
-                ep_match = re.search(r'(\d+)', ep_str)
-                if not ep_match:
-                    continue  # Không có số và không phải FULL → skip
-                try:
-                    ep_num = int(ep_match.group(1))
-                except:
-                    continue  # Parse lỗi → skip
-            
-            # Lấy embedUrl và videoUrl (có thể là string hoặc None)
-            embed_url_raw = row.get('Embed URL')
-            video_url_raw = row.get('Link Dailymotion')
-            
-            # Convert sang string và strip
-            embed_url = str(embed_url_raw).strip() if embed_url_raw else ''
-            video_url = str(video_url_raw).strip() if video_url_raw else ''
-            
-            # QUAN TRỌNG: Nếu Link Dailymotion là link Facebook/reel → đặt vào videoUrl
-            # Nếu Embed URL là link Facebook/reel → cũng đặt vào videoUrl
-            if video_url and ('facebook.com' in video_url.lower() or 'fb.com' in video_url.lower() or '/reel/' in video_url.lower()):
-                # Link Dailymotion là Facebook → dùng làm videoUrl, embedUrl để rỗng
-                if not embed_url or embed_url == video_url:
-                    embed_url = ''  # Không có embed URL cho Facebook link
-            elif embed_url and ('facebook.com' in embed_url.lower() or 'fb.com' in embed_url.lower() or '/reel/' in embed_url.lower()):
-                # Embed URL là Facebook → chuyển sang videoUrl
-                video_url = embed_url
+        # Lấy embedUrl và videoUrl (có thể là string hoặc None)
+        embed_url_raw = row.get('Embed URL')
+        video_url_raw = row.get('Link Dailymotion')
+        
+        # Convert sang string và strip
+        embed_url = str(embed_url_raw).strip() if embed_url_raw else ''
+        video_url = str(video_url_raw).strip() if video_url_raw else ''
+        
+        # QUAN TRỌNG: Nếu Link Dailymotion là link Facebook/reel → đặt vào videoUrl
+        # Nếu Embed URL là link Facebook/reel → cũng đặt vào videoUrl
+        if video_url and ('facebook.com' in video_url.lower() or 'fb.com' in video_url.lower() or '/reel/' in video_url.lower()):
+            # Link Dailymotion là Facebook → dùng làm videoUrl, embedUrl để rỗng
+            if not embed_url or embed_url == video_url:
                 embed_url = ''  # Không có embed URL cho Facebook link
-                if ep_num == 1:
-                    print(f"      🔄 Chuyển embedUrl (Facebook) sang videoUrl: {video_url[:60]}...")
-            
-            # Nếu không có Embed URL và cũng không có Link Dailymotion → skip
-            if not embed_url and not video_url:
-                print(f"  ⏭️  Bỏ qua {film_name} - Tập {ep_num}: không có embedUrl và videoUrl")
-                continue
-            
-            # Debug: log tập 1 - CHI TIẾT HƠN
+        elif embed_url and ('facebook.com' in embed_url.lower() or 'fb.com' in embed_url.lower() or '/reel/' in embed_url.lower()):
+            # Embed URL là Facebook → chuyển sang videoUrl
+            video_url = embed_url
+            embed_url = ''  # Không có embed URL cho Facebook link
             if ep_num == 1:
-                ep1_count += 1
-                embed_preview = embed_url[:80] + "..." if len(embed_url) > 80 else embed_url
-                video_preview = video_url[:80] + "..." if len(video_url) > 80 else video_url
-                print(f"  ✅ Tập 1 #{ep1_count}: {film_name}")
-                print(f"      embedUrl: {embed_preview if embed_url else '(RỖNG)'}")
-                print(f"      videoUrl: {video_preview if video_url else '(RỖNG)'}")
-                print(f"      → Sẽ export: {'CÓ' if (embed_url or video_url) else 'KHÔNG'}")
-            
-            # Khởi tạo phim nếu chưa có
-            if film_name not in movies:
-                # Poster có thể nằm ở cột có tiêu đề chứa chữ \"Poster\" (Poster, Poster URL, ...)
-                poster_value = ''
-                for k, v in row.items():
-                    if k and 'Poster' in str(k):
-                        poster_value = (v or '').strip()
-                        if poster_value:
-                            break
-
-                movies[film_name] = {
-                    'name': film_name,
-                    'vietName': row.get('Tên Phim Việt', '').strip() or film_name,
-                    'summary': row.get('Tóm tắt phim', '').strip(),  # Cột H
-                    'top': row.get('TOP'),
-                    'poster': poster_value,
-                    'year': row.get('Năm', ''),
-                    'genre': row.get('Thể loại', '').strip(),
-                    'country': row.get('Quốc gia', '').strip(),
-                    'allowPC': False,
-                    'episodes': []
-                }
-            
-            # Cập nhật metadata từ hàng đầu tiên có đủ thông tin
-            if row.get('Tên Phim Việt', '').strip():
-                movies[film_name]['vietName'] = row.get('Tên Phim Việt', '').strip()
-            if row.get('Tóm tắt phim', '').strip() and not movies[film_name]['summary']:
-                movies[film_name]['summary'] = row.get('Tóm tắt phim', '').strip()
-            # TOP (cột I) - luôn lưu dạng số để tránh lỗi so sánh str/int
-            raw_top = row.get('TOP')
-            if raw_top is not None and str(raw_top).strip() != "":
-                # Chuyển TOP mới về int nếu có thể
+                log(f"      🔄 Chuyển embedUrl (Facebook) sang videoUrl: {video_url[:60]}...")
+        
+        # Nếu không có Embed URL và cũng không có Link Dailymotion → skip
+        if not embed_url and not video_url:
+            log(f"  ⏭️  Bỏ qua {film_name} - Tập {ep_num}: không có embedUrl và videoUrl")
+            continue
+        
+        # Debug: log tập 1 - CHI TIẾT HƠN
+        if ep_num == 1:
+            ep1_count += 1
+            embed_preview = embed_url[:80] + "..." if len(embed_url) > 80 else embed_url
+            video_preview = video_url[:80] + "..." if len(video_url) > 80 else video_url
+            log(f"  ✅ Tập 1 #{ep1_count}: {film_name}")
+            log(f"      embedUrl: {embed_preview if embed_url else '(RỖNG)'}")
+            log(f"      videoUrl: {video_preview if video_url else '(RỖNG)'}")
+            log(f"      → Sẽ export: {'CÓ' if (embed_url or video_url) else 'KHÔNG'}")
+        
+        # Poster của dòng này (cột có tiêu đề chứa chữ "Poster")
+        poster_raw = _row_poster(row, poster_cols)
+        
+        # Khởi tạo phim nếu chưa có
+        if film_name not in movies:
+            movies[film_name] = {
+                'name': film_name,
+                'vietName': row.get('Tên Phim Việt', '').strip() or film_name,
+                'summary': row.get('Tóm tắt phim', '').strip(),  # Cột H
+                'top': row.get('TOP'),
+                'poster': poster_raw,
+                'year': row.get('Năm', ''),
+                'genre': row.get('Thể loại', '').strip(),
+                'country': row.get('Quốc gia', '').strip(),
+                'allowPC': False,
+                'episodes': []
+            }
+            episode_index[film_name] = {}
+        movie = movies[film_name]
+        
+        # Cập nhật metadata từ hàng đầu tiên có đủ thông tin
+        if row.get('Tên Phim Việt', '').strip():
+            movie['vietName'] = row.get('Tên Phim Việt', '').strip()
+        if row.get('Tóm tắt phim', '').strip() and not movie['summary']:
+            movie['summary'] = row.get('Tóm tắt phim', '').strip()
+        # TOP (cột I) - luôn lưu dạng số để tránh lỗi so sánh str/int
+        raw_top = row.get('TOP')
+        if raw_top is not None and str(raw_top).strip() != "":
+            # Chuyển TOP mới về int nếu có thể
+            new_top = None
+            try:
+                # Trường hợp là số (int/float) hoặc chuỗi số
+                new_top = int(raw_top) if isinstance(raw_top, int) else int(str(raw_top).strip())
+            except Exception:
+                # Nếu parse không được thì bỏ qua TOP này
                 new_top = None
-                try:
-                    # Trường hợp là số (int/float) hoặc chuỗi số
-                    new_top = int(raw_top) if isinstance(raw_top, int) else int(str(raw_top).strip())
-                except Exception:
-                    # Nếu parse không được thì bỏ qua TOP này
-                    new_top = None
-
-                if new_top is not None:
-                    current_top = movies[film_name]['top']
-                    # Convert current_top sang int nếu có
-                    if current_top is None or str(current_top).strip() == "":
-                        movies[film_name]['top'] = new_top
-                    else:
-                        try:
-                            current_top_int = int(current_top) if not isinstance(current_top, int) else current_top
-                        except Exception:
-                            # Nếu current_top đang bị kiểu linh tinh (str không convert được)
-                            current_top_int = new_top
-                        # Lưu TOP nhỏ nhất (ưu tiên TOP 1, 2, 3...)
-                        if current_top_int is None or new_top < current_top_int:
-                            movies[film_name]['top'] = new_top
-            # Poster (cột J) - chấp nhận mọi header chứa chữ \"Poster\"
-            # Lấy poster từ BẤT KỲ hàng nào có poster (không chỉ hàng đầu tiên)
-            poster_raw = ''
-            for k, v in row.items():
-                if k and 'Poster' in str(k):
-                    poster_raw = (v or '').strip()
-                    if poster_raw:
-                        break
-            # Update poster nếu có (ưu tiên poster mới nếu chưa có, hoặc nếu poster hiện tại rỗng)
-            if poster_raw:
-                if not movies[film_name]['poster'] or movies[film_name]['poster'].strip() == '':
-                    movies[film_name]['poster'] = poster_raw
-                    if ep_num == 1:
-                        print(f"      📷 Poster: {poster_raw[:60]}...")
-            if row.get('Năm', ''):
-                movies[film_name]['year'] = row.get('Năm', '')
-            if row.get('Thể loại', '').strip():
-                movies[film_name]['genre'] = row.get('Thể loại', '').strip()
-            if row.get('Quốc gia', '').strip():
-                movies[film_name]['country'] = row.get('Quốc gia', '').strip()
-            
-            # Xem PC (cột N)
-            allow_pc = row.get('Xem PC', '')
-            if allow_pc == True or allow_pc == 1 or str(allow_pc).upper() == 'TRUE' or str(allow_pc) == '1':
-                movies[film_name]['allowPC'] = True
-            
-            # Banner (cột O) - gắn với phim cụ thể
-            banner = row.get('Banner', '').strip()
-            if banner and banner.startswith('http'):
-                # Tìm banner đã tồn tại (cùng URL)
-                existing_banner = None
-                for i, b in enumerate(banners):
-                    if isinstance(b, dict) and b.get('url') == banner:
-                        existing_banner = i
-                        break
-                    elif isinstance(b, str) and b == banner:
-                        existing_banner = i
-                        break
-                
-                if existing_banner is not None:
-                    # Banner đã tồn tại → update movieId nếu chưa có
-                    if isinstance(banners[existing_banner], dict):
-                        if not banners[existing_banner].get('movieId') and film_name:
-                            banners[existing_banner]['movieId'] = film_name
-                    elif isinstance(banners[existing_banner], str):
-                        # Convert string thành dict và gắn movieId
-                        banners[existing_banner] = {
-                            'url': banner,
-                            'movieId': film_name if film_name else None
-                        }
+
+            if new_top is not None:
+                current_top = movie['top']
+                # Convert current_top sang int nếu có
+                if current_top is None or str(current_top).strip() == "":
+                    movie['top'] = new_top
                 else:
-                    # Banner mới → thêm vào
-                    banners.append({
-                        'url': banner,
-                        'movieId': film_name  # Gắn banner với phim này
-                    })
+                    try:
+                        current_top_int = int(current_top) if not isinstance(current_top, int) else current_top
+                    except Exception:
+                        # Nếu current_top đang bị kiểu linh tinh (str không convert được)
+                        current_top_int = new_top
+                    # Lưu TOP nhỏ nhất (ưu tiên TOP 1, 2, 3...)
+                    if current_top_int is None or new_top < current_top_int:
+                        movie['top'] = new_top
+        # Poster (cột J) - lấy poster từ BẤT KỲ hàng nào có poster (không chỉ hàng đầu tiên)
+        # Update poster nếu có (ưu tiên poster mới nếu chưa có, hoặc nếu poster hiện tại rỗng)
+        if poster_raw:
+            if not movie['poster'] or movie['poster'].strip() == '':
+                movie['poster'] = poster_raw
+                if ep_num == 1:
+                    log(f"      📷 Poster: {poster_raw[:60]}...")
+        if row.get('Năm', ''):
+            movie['year'] = row.get('Năm', '')
+        if row.get('Thể loại', '').strip():
+            movie['genre'] = row.get('Thể loại', '').strip()
+        if row.get('Quốc gia', '').strip():
+            movie['country'] = row.get('Quốc gia', '').strip()
+        
+        # Xem PC (cột N)
+        allow_pc = row.get('Xem PC', '')
+        if allow_pc == True or allow_pc == 1 or str(allow_pc).upper() == 'TRUE' or str(allow_pc) == '1':
+            movie['allowPC'] = True
+        
+        # Banner (cột O) - gắn với phim cụ thể
+        banner = row.get('Banner', '').strip()
+        if banner and banner.startswith('http'):
+            existing_banner = banner_index.get(banner)
+            if existing_banner is not None:
+                # Banner đã tồn tại → update movieId nếu chưa có
+                if not banners[existing_banner].get('movieId') and film_name:
+                    banners[existing_banner]['movieId'] = film_name
+            else:
+                # Banner mới → thêm vào, gắn với phim này
+                banner_index[banner] = len(banners)
+                banners.append({
+                    'url': banner,
+                    'movieId': film_name
+                })
+        
+        # Cột P: Link Shopee cho từng tập
+        shopee_link = row.get('Shopee Link', '').strip()
+        # Tập 1 luôn không có Shopee
+        if ep_num == 1:
+            shopee_link = None
+        
+        current_episode_data = {
+            'ep': ep_num,
+            'embedUrl': embed_url,
+            'videoUrl': video_url,
+            'uploadDate': str(row.get('Ngày Upload', '')).strip() if row.get('Ngày Upload') else '',
+            'shopeeLink': shopee_link if shopee_link else None
+        }
+        
+        # Tập đã có (trùng số tập) → giữ lại bản tốt hơn, thay đúng vị trí trong list
+        episodes = movie['episodes']
+        positions = episode_index[film_name]
+        pos = positions.get(ep_num)
+        if pos is not None:
+            existing_ep = episodes[pos]
             
-            # Cột P: Link Shopee cho từng tập
-            shopee_link = row.get('Shopee Link', '').strip()
-            # Tập 1 luôn không có Shopee
+            # Đặc biệt cho tập 1: ưu tiên episode có videoUrl (link fanpage)
             if ep_num == 1:
-                shopee_link = None
-            
-            # Kiểm tra xem episode này đã tồn tại chưa (tránh duplicate) - DÙNG DICTIONARY ĐỂ TRÁNH DUPLICATE
-            # Tạo key unique cho episode: ep_num
-            if 'episodes_dict' not in movies[film_name]:
-                movies[film_name]['episodes_dict'] = {}  # Dict để check duplicate nhanh hơn
-            
-            ep_key = ep_num
-            current_episode_data = {
-                'ep': ep_num,
-                'embedUrl': embed_url,
-                'videoUrl': video_url,
-                'uploadDate': str(row.get('Ngày Upload', '')).strip() if row.get('Ngày Upload') else '',
-                'shopeeLink': shopee_link if shopee_link else None
-            }
-            
-            if ep_key in movies[film_name]['episodes_dict']:
-                # Episode đã tồn tại → so sánh và giữ lại episode tốt hơn
-                existing_ep = movies[film_name]['episodes_dict'][ep_key]
+                existing_has_video = bool(existing_ep.get('videoUrl'))
+                current_has_video = bool(video_url)
+                existing_has_embed = bool(existing_ep.get('embedUrl'))
+                current_has_embed = bool(embed_url)
                 
-                # Đặc biệt cho tập 1: ưu tiên episode có videoUrl (link fanpage)
-                if ep_num == 1:
-                    existing_has_video = bool(existing_ep.get('videoUrl'))
-                    current_has_video = bool(video_url)
-                    existing_has_embed = bool(existing_ep.get('embedUrl'))
-                    current_has_embed = bool(embed_url)
-                    
-                    # Ưu tiên: videoUrl > embedUrl (vì tập 1 thường dùng link fanpage)
-                    if current_has_video and not existing_has_video:
-                        # Tập 1 mới có videoUrl → thay thế hoàn toàn
-                        print(f"  🔄 Thay thế tập 1: {film_name} (có videoUrl mới: {video_url[:50]}...)")
-                        movies[film_name]['episodes_dict'][ep_key] = current_episode_data
-                        # Tìm và thay thế trong list
-                        for i, ep in enumerate(movies[film_name]['episodes']):
-                            if ep['ep'] == ep_num:
-                                movies[film_name]['episodes'][i] = current_episode_data
-                                break
-                    elif existing_has_video and not current_has_video:
-                        # Existing có videoUrl, current không có → giữ existing, chỉ merge embedUrl nếu có
-                        if current_has_embed and not existing_has_embed:
-                            existing_ep['embedUrl'] = embed_url
-                            print(f"  ➕ Merge embedUrl vào tập 1: {film_name}")
-                    else:
-                        # Cả 2 đều có hoặc đều không có videoUrl → merge tất cả field
-                        if embed_url and not existing_ep.get('embedUrl'):
-                            existing_ep['embedUrl'] = embed_url
-                        if video_url and not existing_ep.get('videoUrl'):
-                            existing_ep['videoUrl'] = video_url
-                        if current_episode_data.get('uploadDate') and not existing_ep.get('uploadDate'):
-                            existing_ep['uploadDate'] = current_episode_data['uploadDate']
+                # Ưu tiên: videoUrl > embedUrl (vì tập 1 thường dùng link fanpage)
+                if current_has_video and not existing_has_video:
+                    # Tập 1 mới có videoUrl → thay thế hoàn toàn
+                    log(f"  🔄 Thay thế tập 1: {film_name} (có videoUrl mới: {video_url[:50]}...)")
+                    episodes[pos] = current_episode_data
+                elif existing_has_video and not current_has_video:
+                    # Existing có videoUrl, current không có → giữ existing, chỉ merge embedUrl nếu có
+                    if current_has_embed and not existing_has_embed:
+                        existing_ep['embedUrl'] = embed_url
+                        log(f"  ➕ Merge embedUrl vào tập 1: {film_name}")
                 else:
-                    # Tập 2+: đếm số field có giá trị
-                    existing_count = sum([
-                        1 if existing_ep.get('embedUrl') else 0,
-                        1 if existing_ep.get('videoUrl') else 0,
-                        1 if existing_ep.get('uploadDate') else 0
-                    ])
-                    current_count = sum([
-                        1 if current_episode_data.get('embedUrl') else 0,
-                        1 if current_episode_data.get('videoUrl') else 0,
-                        1 if current_episode_data.get('uploadDate') else 0
-                    ])
-                    
-                    # Ưu tiên episode có nhiều thông tin hơn
-                    if current_count > existing_count:
-                        # Episode mới tốt hơn → thay thế
-                        movies[film_name]['episodes_dict'][ep_key] = current_episode_data
-                        # Tìm và thay thế trong list
-                        for i, ep in enumerate(movies[film_name]['episodes']):
-                            if ep['ep'] == ep_num:
-                                movies[film_name]['episodes'][i] = current_episode_data
-                                break
-                    elif current_count == existing_count:
-                        # Bằng nhau → merge: lấy giá trị từ episode nào có
-                        if embed_url and not existing_ep.get('embedUrl'):
-                            existing_ep['embedUrl'] = embed_url
-                        if video_url and not existing_ep.get('videoUrl'):
-                            existing_ep['videoUrl'] = video_url
-                        if current_episode_data.get('uploadDate') and not existing_ep.get('uploadDate'):
-                            existing_ep['uploadDate'] = current_episode_data['uploadDate']
-                        if shopee_link and not existing_ep.get('shopeeLink'):
-                            existing_ep['shopeeLink'] = shopee_link if shopee_link else None
+                    # Cả 2 đều có hoặc đều không có videoUrl → merge tất cả field
+                    if embed_url and not existing_ep.get('embedUrl'):
+                        existing_ep['embedUrl'] = embed_url
+                    if video_url and not existing_ep.get('videoUrl'):
+                        existing_ep['videoUrl'] = video_url
+                    if current_episode_data.get('uploadDate') and not existing_ep.get('uploadDate'):
+                        existing_ep['uploadDate'] = current_episode_data['uploadDate']
             else:
-                # Episode mới → thêm vào dict và list
-                if ep_num == 1:
-                    print(f"  ➕ Thêm tập 1 mới: {film_name} - videoUrl={bool(video_url)}, embedUrl={bool(embed_url)}")
-                movies[film_name]['episodes_dict'][ep_key] = current_episode_data
-                movies[film_name]['episodes'].append(current_episode_data)
+                # Tập 2+: đếm số field có giá trị
+                existing_count = sum([
+                    1 if existing_ep.get('embedUrl') else 0,
+                    1 if existing_ep.get('videoUrl') else 0,
+                    1 if existing_ep.get('uploadDate') else 0
+                ])
+                current_count = sum([
+                    1 if current_episode_data.get('embedUrl') else 0,
+                    1 if current_episode_data.get('videoUrl') else 0,
+                    1 if current_episode_data.get('uploadDate') else 0
+                ])
+                
+                # Ưu tiên episode có nhiều thông tin hơn
+                if current_count > existing_count:
+                    # Episode mới tốt hơn → thay thế
+                    episodes[pos] = current_episode_data
+                elif current_count == existing_count:
+                    # Bằng nhau → merge: lấy giá trị từ episode nào có
+                    if embed_url and not existing_ep.get('embedUrl'):
+                        existing_ep['embedUrl'] = embed_url
+                    if video_url and not existing_ep.get('videoUrl'):
+                        existing_ep['videoUrl'] = video_url
+                    if current_episode_data.get('uploadDate') and not existing_ep.get('uploadDate'):
+                        existing_ep['uploadDate'] = current_episode_data['uploadDate']
+                    if shopee_link and not existing_ep.get('shopeeLink'):
+                        existing_ep['shopeeLink'] = shopee_link if shopee_link else None
+        else:
+            # Episode mới → thêm vào list, ghi nhận vị trí
+            if ep_num == 1:
+                log(f"  ➕ Thêm tập 1 mới: {film_name} - videoUrl={bool(video_url)}, embedUrl={bool(embed_url)}")
+            positions[ep_num] = len(episodes)
+            episodes.append(current_episode_data)
+    
+    # Sort episodes cho mỗi phim (đã loại bỏ duplicate bằng dict ở trên)
+    for film_name, film in movies.items():
+        # Sort theo số tập (FULL sẽ ở cuối)
+        # Xử lý: int < "FULL" (FULL luôn ở cuối)
+        film['episodes'].sort(key=lambda x: (x['ep'] == 'FULL', x['ep'] if isinstance(x['ep'], int) else 999))
         
-        # Sort episodes cho mỗi phim (đã loại bỏ duplicate bằng dict ở trên)
-        for film_name, film in movies.items():
-            # Xóa episodes_dict (không cần nữa)
-            if 'episodes_dict' in film:
-                del film['episodes_dict']
-            
-            # Sort theo số tập (FULL sẽ ở cuối)
-            # Xử lý: int < "FULL" (FULL luôn ở cuối)
-            film['episodes'].sort(key=lambda x: (x['ep'] == 'FULL', x['ep'] if isinstance(x['ep'], int) else 999))
-            
-            # Debug: kiểm tra tập 1 sau khi sort
-            ep1_list = [ep for ep in film['episodes'] if ep.get('ep') == 1]
-            if ep1_list:
-                ep1 = ep1_list[0]
-                print(f"  ✅ Sau khi sort - {film_name}: Tập 1 có videoUrl={bool(ep1.get('videoUrl'))}, embedUrl={bool(ep1.get('embedUrl'))}")
+        # Debug: kiểm tra tập 1 sau khi sort
+        ep1 = next((ep for ep in film['episodes'] if ep.get('ep') == 1), None)
+        if ep1:
+            log(f"  ✅ Sau khi sort - {film_name}: Tập 1 có videoUrl={bool(ep1.get('videoUrl'))}, embedUrl={bool(ep1.get('embedUrl'))}")
+        else:
+            log(f"  ⚠️  Sau khi sort - {film_name}: KHÔNG CÓ TẬP 1!")
+        
+        # Kế thừa shopeeLink: nếu tập không có link riêng thì dùng link của tập trước
+        last_shopee_link = None
+        for ep in film['episodes']:
+            ep_num = ep.get('ep')
+            if ep_num == 1:
+                # Tập 1 luôn không có Shopee
+                ep['shopeeLink'] = None
+                last_shopee_link = None
+            elif ep_num == 'FULL':
+                # FULL: nếu không có Shopee link riêng → kế thừa từ tập trước
+                if not ep.get('shopeeLink') and last_shopee_link:
+                    ep['shopeeLink'] = last_shopee_link
+                elif ep.get('shopeeLink'):
+                    last_shopee_link = ep['shopeeLink']
             else:
-                print(f"  ⚠️  Sau khi sort - {film_name}: KHÔNG CÓ TẬP 1!")
-            
-            # Kế thừa shopeeLink: nếu tập không có link riêng thì dùng link của tập trước
-            last_shopee_link = None
-            for ep in film['episodes']:
-                ep_num = ep.get('ep')
-                if ep_num == 1:
-                    # Tập 1 luôn không có Shopee
-                    ep['shopeeLink'] = None
-                    last_shopee_link = None
-                elif ep_num == 'FULL':
-                    # FULL: nếu không có Shopee link riêng → kế thừa từ tập trước
-                    if not ep.get('shopeeLink') and last_shopee_link:
-                        ep['shopeeLink'] = last_shopee_link
-                    elif ep.get('shopeeLink'):
-                        last_shopee_link = ep['shopeeLink']
-                else:
-                    # Từ tập 2 trở đi
-                    if ep['shopeeLink']:
-                        # Tập này có link riêng → dùng và lưu lại
-                        last_shopee_link = ep['shopeeLink']
-                    elif last_shopee_link:
-                        # Tập này không có link → kế thừa từ tập trước
-                        ep['shopeeLink'] = last_shopee_link
-                    # Nếu không có cả link riêng và link kế thừa → để null (sẽ dùng mặc định trong JS)
+                # Từ tập 2 trở đi
+                if ep['shopeeLink']:
+                    # Tập này có link riêng → dùng và lưu lại
+                    last_shopee_link = ep['shopeeLink']
+                elif last_shopee_link:
+                    # Tập này không có link → kế thừa từ tập trước
+                    ep['shopeeLink'] = last_shopee_link
+                # Nếu không có cả link riêng và link kế thừa → để null (sẽ dùng mặc định trong JS)
+    
+    # Convert to array và sort theo TOP
+    movies_list = list(movies.values())
+    movies_list.sort(key=lambda x: (x['top'] is None, x['top'] or 999))
+    
+    return {
+        'movies': movies_list,
+        'banners': banners,
+        'updated': updated if updated is not None else datetime.now().isoformat()
+    }
+
+
+def write_json(output: Dict, path: str = OUTPUT_FILE):
+    """Ghi movies.json (định dạng giữ nguyên như trước: indent=2, giữ Unicode)"""
+    _write_bytes(path, _json_text(output).encode('utf-8'))
+
+
+def compact_variants(path: str) -> List[str]:
+    """Tên các bản thu gọn của 1 file JSON: x.json → x.min.json, .gz, .br"""
+    min_path = path[:-len('.json')] + '.min.json' if path.endswith('.json') else path + '.min'
+    variants = [min_path, min_path + '.gz']
+    if brotli is not None:
+        variants.append(min_path + '.br')
+    return variants
+
+
+def write_compact(data: Dict, path: str) -> Dict[str, int]:
+    """Ghi bản JSON thu gọn (không indent, separators gọn) + bản nén sẵn .gz/.br
+    
+    Host tĩnh / CDN chọn bản nhỏ nhất theo Accept-Encoding. Nén tất định
+    (gzip mtime=0) nên dữ liệu không đổi thì file không đổi. Mỗi file ghi
+    nguyên tử (file tạm + replace).
+    
+    Returns:
+        {đường dẫn: số byte}
+    """
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    blobs = [raw, gzip.compress(raw, compresslevel=9, mtime=0)]
+    if brotli is not None:
+        blobs.append(brotli.compress(raw, quality=11))
+    sizes = {}
+    for variant, blob in zip(compact_variants(path), blobs):
+        _write_bytes(variant, blob)
+        sizes[variant] = len(blob)
+    return sizes
+
+
+def _log_sizes(path: str, sizes: Dict[str, int]):
+    parts = [f"{path} {os.path.getsize(path) / 1024:.1f} KB"]
+    parts += [f"{variant} {size / 1024:.1f} KB" for variant, size in sizes.items()]
+    print("📦 " + " | ".join(parts))
+
+
+def strip_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt: 'Võ Thần Đại Đạo' → 'Vo Than Dai Dao'"""
+    text = unicodedata.normalize('NFD', str(text))
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return text.replace('đ', 'd').replace('Đ', 'D')
+
+
+def slugify(text: str) -> str:
+    """Tên file an toàn (ASCII, chữ thường, nối bằng "-")"""
+    slug = re.sub(r'[^a-z0-9]+', '-', strip_diacritics(text).lower()).strip('-')
+    return slug[:60].rstrip('-')
+
+
+def _json_text(data) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def build_shards(output: Dict, shard_dir: str = SHARD_DIR):
+    """Chia output của build_export() thành danh mục + 1 file / phim (hàm thuần)
+    
+    - Danh mục: chỉ các trường trang chủ và ô tìm kiếm cần (name, vietName,
+      poster, top, số tập) + đường dẫn file chi tiết, kèm banners/updated
+    - File phim: toàn bộ dữ liệu phim (gồm episodes), tên có hash nội dung
+      (<slug>.<hash>.json) nên cache được lâu, phim đổi thì tên file đổi
+    
+    Returns:
+        (catalog, {đường dẫn file: nội dung JSON})
+    """
+    files = {}
+    entries = []
+    for movie in output['movies']:
+        text = _json_text(movie)
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:10]
+        # Tên phim gốc thường là chữ Hán → ưu tiên slug từ tên Việt
+        slug = slugify(movie.get('vietName') or '') or slugify(movie['name']) or 'phim'
+        path = f"{shard_dir}/{slug}.{digest}.json"
+        files[path] = text
+        entries.append({
+            'name': movie['name'],
+            'vietName': movie['vietName'],
+            'poster': movie['poster'],
+            'top': movie['top'],
+            'episodes': len(movie['episodes']),
+            'file': path,
+        })
+    catalog = {
+        'movies': entries,
+        'banners': output['banners'],
+        'updated': output['updated'],
+    }
+    return catalog, files
+
+
+def write_shards(output: Dict, catalog_path: str = CATALOG_FILE,
+                 shard_dir: str = SHARD_DIR) -> Dict:
+    """Ghi catalog.json + movies/<slug>.<hash>.json, xóa file phim cũ không còn dùng
+    
+    Returns:
+        dict {catalog: số byte catalog, written: số file phim ghi mới,
+        kept: số file không đổi, removed: số file cũ đã xóa}
+    """
+    catalog, files = build_shards(output, shard_dir)
+    os.makedirs(shard_dir, exist_ok=True)
+    stats = {'written': 0, 'kept': 0, 'removed': 0}
+    for path, text in files.items():
+        # Tên file theo hash nội dung: đã có file → nội dung giống hệt
+        if os.path.exists(path):
+            stats['kept'] += 1
+            continue
+        _write_text(path, text)
+        stats['written'] += 1
+    # Ghi catalog sau khi ghi file phim: không bao giờ trỏ tới file chưa ghi xong
+    catalog_text = _json_text(catalog)
+    _write_text(catalog_path, catalog_text)
+    stats['catalog'] = len(catalog_text.encode('utf-8'))
+    stats['compact'] = write_compact(catalog, catalog_path)
+    # Xóa file phim cũ sau cùng, khi mọi bản catalog đã trỏ sang file mới
+    referenced = {os.path.basename(p) for p in files}
+    for name in os.listdir(shard_dir):
+        if name.endswith('.json') and name not in referenced:
+            os.remove(os.path.join(shard_dir, name))
+            stats['removed'] += 1
+    return stats
+
+
+def normalize_search(text: str) -> str:
+    """Chuỗi tìm kiếm: bỏ dấu, chữ thường, chỉ giữ chữ/số (cả chữ Hán), cách nhau 1 dấu cách"""
+    return ' '.join(re.findall(r'[^\W_]+', strip_diacritics(text).lower()))
+
+
+def build_search_index(movies: List[Dict]) -> Dict:
+    """Chỉ mục tìm kiếm không dấu cho danh sách phim (hàm thuần)
+    
+    Phim được trỏ tới bằng vị trí trong movies (cùng thứ tự movies.json /
+    catalog.json), không chứa dữ liệu phim. Gồm:
+    - prefixes: tiền tố 1..prefixMax ký tự của mỗi từ trong "name vietName"
+      → [phim] (gõ tới đâu tìm tới đó). Từ có chữ Hán/Kana/Hangul: tiền tố
+      của mọi hậu tố, tức tìm được từ bất kỳ vị trí nào trong tên
+    - trigrams: 3 ký tự liên tiếp của các từ dài hơn prefixMax → [phim]
+      (tìm giữa từ dài, từ dài hơn prefixMax)
+    Tra cứu mỗi từ w của normalize_search(truy vấn): w <= prefixMax ký tự →
+    prefixes[w] hợp với giao trigrams của w (w giữa 1 từ dài); w dài hơn →
+    giao trigrams của w. Kết quả giữa các từ: giao các danh sách.
+    """
+    prefixes: Dict[str, set] = {}
+    trigrams: Dict[str, set] = {}
+    for i, movie in enumerate(movies):
+        names = [movie.get('name') or '']
+        if movie.get('vietName') and movie['vietName'] != movie.get('name'):
+            names.append(movie['vietName'])
+        for token in set(normalize_search(' '.join(names)).split()):
+            starts = range(len(token)) if CJK_CHARS.search(token) else [0]
+            for start in starts:
+                for end in range(start + 1, min(len(token), start + SEARCH_PREFIX_MAX) + 1):
+                    prefixes.setdefault(token[start:end], set()).add(i)
+            if len(token) > SEARCH_PREFIX_MAX:
+                for j in range(len(token) - 2):
+                    trigrams.setdefault(token[j:j + 3], set()).add(i)
+    
+    def postings(index: Dict[str, set]) -> Dict[str, List[int]]:
+        return {key: sorted(ids) for key, ids in sorted(index.items())}
+    
+    return {
+        'count': len(movies),
+        'prefixMax': SEARCH_PREFIX_MAX,
+        'prefixes': postings(prefixes),
+        'trigrams': postings(trigrams),
+    }
+
+
+def _write_text(path: str, text: str):
+    _write_bytes(path, text.encode('utf-8'))
+
+
+def _write_bytes(path: str, data: bytes):
+    """Ghi file tạm rồi replace (người đọc không bao giờ thấy file ghi dở)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_state(path: str = STATE_FILE) -> Dict:
+    """Đọc trạng thái lần export trước ({} nếu chưa có / file hỏng)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: Dict, path: str = STATE_FILE):
+    """Ghi trạng thái export (ghi file tạm rồi replace để không hỏng file)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def exporter_hash() -> str:
+    """Hash mã nguồn script: đổi cách export (sửa code) thì phải export lại"""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def rows_hash(rows: List[Dict]) -> str:
+    """Hash dữ liệu thô của sheet"""
+    raw = json.dumps(rows, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def drive_revision(client, spreadsheet_id: str) -> Optional[Dict]:
+    """{modifiedTime, version} của spreadsheet qua Drive API (1 request, không tốn
+    quota Sheets), None nếu không đọc được (thiếu quyền Drive, lỗi mạng)"""
+    try:
+        # gspread 6 dùng client.http_client, gspread 5 dùng client.request
+        http = getattr(client, 'http_client', client)
+        response = http.request(
+            'get', f"{DRIVE_FILES_URL}/{spreadsheet_id}",
+            params={'fields': 'modifiedTime,version', 'supportsAllDrives': True},
+        )
+        data = response.json()
+        return {'modifiedTime': data.get('modifiedTime'), 'version': str(data.get('version'))}
+    except Exception:
+        return None
+
+
+def _expected_outputs(shards: bool = False, search_index: bool = False) -> List[str]:
+    """Các file export phải có (thiếu file nào thì không được bỏ qua)"""
+    outputs = [OUTPUT_FILE] + compact_variants(OUTPUT_FILE)
+    if search_index:
+        outputs += [SEARCH_INDEX_FILE] + compact_variants(SEARCH_INDEX_FILE)
+    if shards:
+        outputs += [CATALOG_FILE] + compact_variants(CATALOG_FILE)
+        try:
+            with open(CATALOG_FILE, 'r', encoding='utf-8') as f:
+                outputs.extend(m['file'] for m in json.load(f)['movies'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    return outputs
+
+
+def _report_changed(changed: bool):
+    """Báo kết quả cho bước sau của GitHub Actions (steps.<id>.outputs.changed)"""
+    github_output = os.environ.get('GITHUB_OUTPUT')
+    if github_output:
+        with open(github_output, 'a', encoding='utf-8') as f:
+            f.write(f"changed={'true' if changed else 'false'}\n")
+
+
+def export_sheet_to_json(force: bool = False, shards: bool = False,
+                         search_index: bool = False) -> bool:
+    """Export Sheet → JSON format cho web
+    
+    Bỏ qua (không tải dữ liệu, không ghi file) nếu sheet không đổi so với lần
+    export trước (STATE_FILE):
+    1. Drive version của spreadsheet không đổi → dừng ngay, chưa đọc sheet
+    2. Không đọc được version hoặc version đổi → tải dữ liệu, hash trùng lần
+       trước (vd: chỉ sửa tab khác) → không ghi file
+    Sửa script hoặc thiếu file output luôn export lại. force=True: luôn export.
+    shards=True: ghi thêm catalog.json + movies/<slug>.<hash>.json (xem build_shards())
+    search_index=True: ghi thêm search_index.json (xem build_search_index())
+    
+    Returns:
+        True nếu đã export, False nếu bỏ qua vì sheet không đổi
+    """
+    try:
+        # Import ở đây để build_export() dùng được mà không cần gspread
+        import gspread
+        from google.oauth2.service_account import Credentials
         
-        # Convert to array và sort theo TOP
-        movies_list = list(movies.values())
-        movies_list.sort(key=lambda x: (x['top'] is None, x['top'] or 999))
+        # Authenticate
+        if not os.path.exists(CREDENTIALS_FILE):
+            print(f"❌ Không tìm thấy file: {CREDENTIALS_FILE}")
+            sys.exit(1)
         
-        # Output JSON
-        output = {
-            'movies': movies_list,
-            'banners': banners,
-            'updated': __import__('datetime').datetime.now().isoformat()
-        }
+        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+        client = gspread.authorize(creds)
+        
+        # Kiểm tra rẻ trước: sheet có bị sửa từ lần export trước không
+        state = load_state(STATE_FILE)
+        current = {'sheet': f"{SHEET_ID}/{SHEET_NAME}", 'exporter': exporter_hash(),
+                   'shards': shards, 'search_index': search_index}
+        can_skip = (not force
+                    and all(state.get(k) == v for k, v in current.items())
+                    and all(os.path.exists(p) for p in _expected_outputs(shards, search_index)))
+        revision = drive_revision(client, SHEET_ID)
+        if can_skip and revision and revision['version'] == state.get('version'):
+            print(f"⏭️  Sheet không đổi (version {revision['version']}, "
+                  f"sửa lúc {revision['modifiedTime']}) → bỏ qua export")
+            _report_changed(False)
+            return False
+        
+        sheet = client.open_by_key(SHEET_ID).worksheet(SHEET_NAME)
+        
+        # Lấy tất cả records
+        rows = sheet.get_all_records()
+        current['rows_hash'] = rows_hash(rows)
+        if revision:
+            current.update(revision)
+        if can_skip and current['rows_hash'] == state.get('rows_hash'):
+            # Dữ liệu Sheet4 giữ nguyên: chỉ ghi nhận version mới để lần sau dừng sớm
+            if revision and revision['version'] != state.get('version'):
+                save_state(current, STATE_FILE)
+            print(f"⏭️  Dữ liệu {SHEET_NAME} không đổi ({len(rows)} rows) → bỏ qua export")
+            _report_changed(False)
+            return False
+        
+        print(f"📊 Tổng số rows trong Sheet: {len(rows)}")
+        output = build_export(rows, log=print)
+        movies_list = output['movies']
+        banners = output['banners']
         
         # Debug: đếm số tập 1 trong JSON output
         total_ep1 = 0
@@ -385,8 +698,23 @@ def export_sheet_to_json():
                 print(f"  📺 {m['name']}: có {ep1_count} tập 1")
                 total_ep1 += ep1_count
         
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        write_json(output, OUTPUT_FILE)
+        _log_sizes(OUTPUT_FILE, write_compact(output, OUTPUT_FILE))
+        if shards:
+            shard_stats = write_shards(output)
+            print(f"🗂️  {CATALOG_FILE}: {len(movies_list)} phim, {shard_stats['catalog'] / 1024:.1f} KB; "
+                  f"{SHARD_DIR}/: ghi {shard_stats['written']}, giữ {shard_stats['kept']}, "
+                  f"xóa {shard_stats['removed']} file")
+            _log_sizes(CATALOG_FILE, shard_stats['compact'])
+        if search_index:
+            search = build_search_index(movies_list)
+            write_json(search, SEARCH_INDEX_FILE)
+            print(f"🔎 {SEARCH_INDEX_FILE}: {len(search['prefixes'])} tiền tố, "
+                  f"{len(search['trigrams'])} trigram")
+            _log_sizes(SEARCH_INDEX_FILE, write_compact(search, SEARCH_INDEX_FILE))
+        
+        save_state(current, STATE_FILE)
+        _report_changed(True)
         
         print(f"✅ Exported {len(movies_list)} movies, {len(banners)} banners to {OUTPUT_FILE}")
         print(f"📺 Tổng số tập 1 trong JSON: {total_ep1}")
@@ -401,5 +729,12 @@ def export_sheet_to_json():
         sys.exit(1)
 
 if __name__ == "__main__":
-    export_sheet_to_json()
-
+    parser = argparse.ArgumentParser(description="Export Google Sheet → movies.json")
+    parser.add_argument("--force", action="store_true",
+                        help="Export lại kể cả khi sheet không đổi")
+    parser.add_argument("--shards", action="store_true",
+                        help=f"Ghi thêm {CATALOG_FILE} + {SHARD_DIR}/<phim>.<hash>.json")
+    parser.add_argument("--search-index", action="store_true",
+                        help=f"Ghi thêm chỉ mục tìm kiếm không dấu {SEARCH_INDEX_FILE}")
+    args = parser.parse_args()
+    export_sheet_to_json(force=args.force, shards=args.shards, search_index=args.search_index)
@@ -3,13 +3,171 @@ from google.oauth2.service_account import Credentials as ServiceAccountCredentia
 from google.oauth2.credentials import Credentials as OAuthCredentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from concurrent.futures import Future
 from typing import List, Dict, Optional
+import collections
+import contextlib
+import functools
 import os
 import json
+import queue
+import random
+import re
+import threading
+import time
+
+# Lấy video ID từ link / embed URL Dailymotion
+_VIDEO_ID_PATTERNS = [
+    re.compile(r'dailymotion\.com/(?:embed/)?video/([a-zA-Z0-9]+)'),
+    re.compile(r'dai\.ly/([a-zA-Z0-9]+)'),
+    re.compile(r'[?&]video=([a-zA-Z0-9]+)'),
+]
+
+
+def canonical_video_id(value) -> Optional[str]:
+    """Video ID chuẩn (x...) từ link / embed URL Dailymotion, None nếu không phải link video"""
+    if not isinstance(value, str) or 'http' not in value:
+        return None
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(value)
+        if match:
+            video_id = match.group(1)
+            return video_id if video_id.startswith('x') else 'x' + video_id
+    return None
+
+
+def _col_letter(col: int) -> str:
+    """1 → A, 27 → AA"""
+    letters = ''
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+
+
+class SheetsQuota:
+    """Đếm request Sheets API theo cửa sổ 60 giây, chờ trước khi chạm giới hạn
+
+    Sheets API giới hạn số request đọc / ghi mỗi phút (mặc định 60/phút/user).
+    Thay vì để Google trả 429 rồi mới backoff, mỗi request lấy 1 lượt trong
+    cửa sổ trượt; hết lượt thì chờ tới khi request cũ nhất ra khỏi cửa sổ.
+    operation() gom số lượt đã dùng của 1 thao tác cấp cao (mở sheet, quét,
+    ghi lô, ...) để log chi phí quota.
+    """
+
+    def __init__(self, reads_per_minute: int = 60, writes_per_minute: int = 60,
+                 window: float = 60.0):
+        self.limits = {'read': reads_per_minute, 'write': writes_per_minute}
+        self.window = window
+        self._calls = {'read': collections.deque(), 'write': collections.deque()}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'read': 0, 'write': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    def acquire(self, kind: str) -> float:
+        """Lấy 1 lượt 'read' hoặc 'write', trả về số giây đã phải chờ"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                calls = self._calls[kind]
+                while calls and now - calls[0] >= self.window:
+                    calls.popleft()
+                if len(calls) < self.limits[kind]:
+                    calls.append(now)
+                    self.stats[kind] += 1
+                    if waited:
+                        self.stats['throttled'] += 1
+                        self.stats['wait_seconds'] += waited
+                    break
+                delay = calls[0] + self.window - now
+            time.sleep(delay)
+            waited += delay
+        for counter in getattr(self._local, 'operations', []):
+            counter[kind] += 1
+            counter['wait'] += waited
+        return waited
+
+    def usage(self) -> Dict:
+        """Số lượt read/write đã dùng trong cửa sổ hiện tại"""
+        with self._lock:
+            now = time.monotonic()
+            return {kind: sum(1 for t in calls if now - t < self.window)
+                    for kind, calls in self._calls.items()}
+
+    def near_limit(self, ratio: float = 0.8) -> bool:
+        """Cửa sổ hiện tại đã dùng >= ratio giới hạn read hoặc write"""
+        usage = self.usage()
+        return any(usage[kind] >= self.limits[kind] * ratio for kind in usage)
+
+    @contextlib.contextmanager
+    def operation(self):
+        """Đếm lượt quota của các request trong khối with (theo thread)
+
+        Thao tác lồng nhau: lượt được cộng cho cả thao tác ngoài.
+        """
+        counter = {'read': 0, 'write': 0, 'wait': 0.0}
+        stack = self._local.__dict__.setdefault('operations', [])
+        stack.append(counter)
+        try:
+            yield counter
+        finally:
+            stack.pop()
+
+    def is_outermost(self) -> bool:
+        return not getattr(self._local, 'operations', None)
+
+    def wrap(self, request):
+        """Bọc hàm request(method, url, ...) của gspread client
+
+        Chỉ tính request tới Sheets API (Drive API có quota riêng).
+        GET = đọc, còn lại (POST/PUT/DELETE) = ghi.
+        """
+        @functools.wraps(request)
+        def quota_request(method, endpoint, *args, **kwargs):
+            if 'sheets.googleapis.com' in str(endpoint):
+                self.acquire('read' if str(method).lower() == 'get' else 'write')
+            return request(method, endpoint, *args, **kwargs)
+        return quota_request
+
+
+def _quota_operation(name: str):
+    """Decorator: log số lượt quota Sheets mà 1 method cấp cao đã dùng
+    (chỉ khi phải chờ quota hoặc gần chạm giới hạn, xem _log_quota())"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            outermost = self.quota.is_outermost()
+            with self.quota.operation() as cost:
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    if outermost and (cost['read'] or cost['write']):
+                        self._log_quota(name, cost)
+        return wrapper
+    return decorator
 
 
 class GoogleSheetManager:
-    def __init__(self, credentials_path: str = None, sheet_name: str = "Dailymotion Videos", token_path: str = None):
+    # Tên header (và các biến thể) của cột link / embed
+    LINK_HEADERS = ('Link Dailymotion', 'Link Dailymotio', 'Link')
+    EMBED_HEADERS = ('Embed URL',)
+    # Dòng quét kênh ghi link ở cột C, embed ở cột D (lệch 1 cột so với header)
+    CHANNEL_LINK_COL = 3
+    # Cột giữ nguyên giá trị cũ khi upsert (F: Ngày Upload của lần ghi đầu)
+    UPSERT_KEEP_COLS = (5,)
+    # Version Drive đổi sau khi chính manager này ghi: chấp nhận nhích lên tối đa
+    # SNAPSHOT_MAX_DRIFT / request ghi nếu SNAPSHOT_CHECK_ROWS dòng cuối vẫn khớp
+    SNAPSHOT_MAX_DRIFT = 3
+    SNAPSHOT_CHECK_ROWS = 5
+    # Không đọc được version Drive: vẫn tải lại toàn bộ sau mỗi khoảng này (giây)
+    SNAPSHOT_RELOAD_SECONDS = 120.0
+
+    def __init__(self, credentials_path: str = None, sheet_name: str = "Dailymotion Videos", token_path: str = None,
+                 use_snapshot: bool = False, quota: SheetsQuota = None, log_callback=None):
         """
         Khởi tạo Google Sheet Manager
         
@@ -17,6 +175,10 @@ class GoogleSheetManager:
             credentials_path: Đường dẫn đến file credentials JSON (OAuth hoặc Service Account)
             sheet_name: Tên sheet để lưu dữ liệu
             token_path: Đường dẫn đến file token.json (cho OAuth, mặc định: tokens/token.json)
+            use_snapshot: Giữ bản sao worksheet trong bộ nhớ giữa các lần đọc
+                (xem get_rows()), chỉ tải lại khi sheet bị sửa từ nơi khác
+            quota: SheetsQuota dùng chung (mặc định tạo mới 60 read + 60 write/phút)
+            log_callback: Hàm nhận log (chi phí quota khi phải chờ / gần giới hạn)
         """
         self.credentials_path = credentials_path
         self.sheet_name = sheet_name
@@ -27,6 +189,41 @@ class GoogleSheetManager:
             "https://www.googleapis.com/auth/spreadsheets",
             "https://www.googleapis.com/auth/drive"
         ]
+        # Buffer ghi theo lô (xem buffered()): [(row, label, upsert), ...]
+        self._buffer: List = []
+        self._buffer_lock = threading.RLock()
+        self._buffer_depth = 0
+        self._buffer_since = None
+        self._buffer_report = None
+        self._buffer_timer: Optional[threading.Timer] = None
+        self.buffer_max_rows = 50
+        self.buffer_max_delay = 10.0
+        self.max_write_retries = 3
+        # Luồng ghi nền (write-behind, xem enqueue())
+        self._write_queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._writer_wake = threading.Event()
+        self._writer_stop = False
+        self._writer_pending = 0          # dòng đã enqueue nhưng chưa ghi xong
+        self._writer_times = collections.deque()  # thời điểm enqueue các dòng chưa ghi (FIFO)
+        self._writer_idle = threading.Condition(self._writer_lock)
+        self.writer_max_rows = 100
+        self.writer_max_delay = 2.0
+        self.writer_stats = {'written': 0, 'failed': 0, 'batches': 0, 'retries': 0,
+                             'last_batch_seconds': 0.0}
+        # Quota Sheets API (gắn vào client khi authenticate())
+        self.quota = quota or SheetsQuota()
+        self.log_callback = log_callback
+        # Spreadsheet đã mở trong phiên (id → gspread.Spreadsheet) và worksheet hiện tại
+        self._spreadsheets: Dict = {}
+        self._opened_key = None
+        # Header dòng 1 (cache, xem get_headers())
+        self._headers: Optional[List[str]] = None
+        # Snapshot worksheet: {'rows': [[...], ...], 'version': Drive version}
+        self.use_snapshot = use_snapshot
+        self._snapshot: Optional[Dict] = None
+        self._snapshot_lock = threading.RLock()
         
     def authenticate(self, credentials_path: str = None):
         """Xác thực với Google Sheets API
@@ -101,7 +298,31 @@ class GoogleSheetManager:
             raise Exception("File credentials không phải định dạng JSON hợp lệ")
         except Exception as e:
             raise Exception(f"Lỗi khi xác thực Google Sheets: {str(e)}")
+        
+        self._install_quota()
+    
+    def _install_quota(self):
+        """Cho mọi request Sheets của client đi qua SheetsQuota"""
+        # gspread 6 gửi request qua client.http_client, gspread 5 qua client.request
+        http = getattr(self.client, 'http_client', self.client)
+        if not getattr(http.request, '_sheets_quota', False):
+            http.request = self.quota.wrap(http.request)
+            http.request._sheets_quota = True
     
+    def _log_quota(self, operation: str, cost: Dict):
+        """Log chi phí quota của 1 thao tác khi đã phải chờ hoặc gần chạm giới hạn
+        (thao tác bình thường không log, tránh 1 dòng log / dòng sheet khi quét)"""
+        if not self.log_callback or not (cost['wait'] or self.quota.near_limit()):
+            return
+        usage = self.quota.usage()
+        waited = f", chờ {cost['wait']:.1f}s" if cost['wait'] else ""
+        self.log_callback(
+            f"📊 Sheets quota [{operation}]: {cost['read']} đọc, {cost['write']} ghi{waited} "
+            f"(phút này: {usage['read']}/{self.quota.limits['read']} đọc, "
+            f"{usage['write']}/{self.quota.limits['write']} ghi)"
+        )
+    
+    @_quota_operation("mở sheet")
     def create_or_get_sheet(self, spreadsheet_name: str = None):
         """Tạo hoặc lấy sheet nếu đã tồn tại
         
@@ -116,6 +337,10 @@ class GoogleSheetManager:
         if spreadsheet_name:
             self.sheet_name = spreadsheet_name
         
+        # Đã mở đúng sheet này trong phiên: dùng lại (không tốn request)
+        if self.worksheet and self._opened_key == ('name', self.sheet_name):
+            return self.worksheet
+        
         try:
             # Tìm sheet đã tồn tại
             try:
@@ -128,6 +353,8 @@ class GoogleSheetManager:
             
             # Lấy worksheet đầu tiên (sheet1 luôn tồn tại)
             self.worksheet = spreadsheet.sheet1
+            self._reset_worksheet_cache()
+            self._opened_key = ('name', self.sheet_name)
             
             # Kiểm tra và tạo header nếu chưa có
             self._ensure_headers()
@@ -136,13 +363,23 @@ class GoogleSheetManager:
         except Exception as e:
             raise Exception(f"Lỗi khi tạo/lấy sheet: {str(e)}")
     
+    @_quota_operation("mở sheet")
     def open_by_id(self, spreadsheet_id: str, worksheet_name: str = None):
         """Mở sheet bằng ID (cho sheet có sẵn)"""
         if not self.client:
             raise Exception("Chưa xác thực. Gọi authenticate() trước.")
         
+        # Đã mở đúng worksheet này trong phiên: dùng lại (không tốn request)
+        key = ('id', spreadsheet_id, worksheet_name or '')
+        if self.worksheet and self._opened_key == key:
+            return self.worksheet
+        
         try:
-            spreadsheet = self.client.open_by_key(spreadsheet_id)
+            # Metadata spreadsheet được cache theo ID cho cả phiên
+            spreadsheet = self._spreadsheets.get(spreadsheet_id)
+            if spreadsheet is None:
+                spreadsheet = self.client.open_by_key(spreadsheet_id)
+                self._spreadsheets[spreadsheet_id] = spreadsheet
             
             if worksheet_name:
                 # Mở worksheet theo tên
@@ -154,6 +391,8 @@ class GoogleSheetManager:
             else:
                 # Dùng worksheet đầu tiên
                 self.worksheet = spreadsheet.sheet1
+            self._reset_worksheet_cache()
+            self._opened_key = key
             
             # Đảm bảo có header
             self._ensure_headers()
@@ -203,27 +442,27 @@ class GoogleSheetManager:
         ]
         
         try:
-            first_cell = self.worksheet.get('A1')
-            if not first_cell or first_cell == []:
+            # 1 lần đọc dòng 1, dùng luôn làm cache header (get_headers())
+            existing_headers = self.get_headers()
+            if not existing_headers or not existing_headers[0]:
                 # Chưa có header, tạo mới
                 self.worksheet.append_row(headers)
-            else:
-                # Kiểm tra xem header có đúng không (tùy chọn)
-                existing_headers = self.worksheet.row_values(1)
-                if not existing_headers or len(existing_headers) < len(headers):
-                    # Header không đầy đủ, có thể cần cập nhật (tùy chọn)
-                    pass
+                self._headers = list(headers)
         except Exception as e:
             # Nếu lỗi khi đọc, thử tạo header
             try:
                 self.worksheet.append_row(headers)
+                self._headers = list(headers)
             except:
                 pass
     
     def add_video_record(self, film_name: str, episode_number: int, 
-                        video_data: Dict, description: str = ""):
+                        video_data: Dict, description: str = "", upsert: bool = False):
         """Thêm record video vào sheet
         
+        upsert=True: nếu đã có dòng cùng (Tên Bộ Phim, Số Tập) thì cập nhật
+        các ô thay đổi của dòng đó thay vì thêm dòng mới (xem upsert_rows())
+        
         Cấu trúc:
         - Cột A: Tên Bộ Phim
         - Cột B: Số Tập
@@ -235,6 +474,58 @@ class GoogleSheetManager:
         if not self.worksheet:
             self.create_or_get_sheet()
         
+        row = self._video_row(film_name, episode_number, video_data)
+        return self._append_row(row, "record", upsert=upsert)
+    
+    @_quota_operation("ghi lô")
+    def add_video_records(self, records: List[Dict]) -> int:
+        """Thêm nhiều record video vào sheet bằng 1 request (append_rows)
+        
+        Args:
+            records: List dict {film_name, episode_number, video_data}
+                (cùng tham số với add_video_record)
+        
+        Returns:
+            Số dòng đã ghi
+        """
+        if not records:
+            return 0
+        if not self.worksheet:
+            self.create_or_get_sheet()
+        
+        rows = [
+            self._video_row(r['film_name'], r['episode_number'], r['video_data'])
+            for r in records
+        ]
+        
+        try:
+            response = self._append_rows_with_retry(rows)
+        except Exception as e:
+            raise Exception(f"Lỗi khi thêm {len(rows)} record vào sheet: {str(e)}")
+        self._snapshot_append(rows, response)
+        self._note_writes(1)
+        return len(rows)
+    
+    def upsert_video_records(self, records: List[Dict]) -> Dict:
+        """Như add_video_records nhưng cập nhật dòng đã có cùng (Tên Bộ Phim, Số Tập)
+        
+        Returns:
+            dict {updated, appended, unchanged} (xem upsert_rows())
+        """
+        if not records:
+            return {'updated': 0, 'appended': 0, 'unchanged': 0}
+        rows = [
+            self._video_row(r['film_name'], r['episode_number'], r['video_data'])
+            for r in records
+        ]
+        try:
+            return self.upsert_rows(rows)
+        except Exception as e:
+            raise Exception(f"Lỗi khi cập nhật {len(rows)} record vào sheet: {str(e)}")
+    
+    @staticmethod
+    def _video_row(film_name: str, episode_number, video_data: Dict) -> List:
+        """Dòng sheet (cột A-F) cho 1 video upload"""
         from datetime import datetime
         
         # Lấy các thông tin cần thiết
@@ -243,7 +534,7 @@ class GoogleSheetManager:
         embed_url = video_data.get('embed_url', '')
         upload_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        row = [
+        return [
             film_name,                    # Cột A: Tên Bộ Phim
             f"Tập {episode_number}",      # Cột B: Số Tập
             title,                        # Cột C: Tiêu Đề Phim
@@ -251,17 +542,12 @@ class GoogleSheetManager:
             embed_url,                    # Cột E: Embed URL
             upload_date                   # Cột F: Ngày Upload
         ]
-        
-        try:
-            self.worksheet.append_row(row)
-            return True
-        except Exception as e:
-            raise Exception(f"Lỗi khi thêm record vào sheet: {str(e)}")
     
     def add_playlist_record(self, film_name: str, playlist_id: str, 
                            playlist_title: str, total_episodes: int,
-                           playlist_url: str = '', playlist_embed_url: str = ''):
-        """Thêm record playlist vào sheet
+                           playlist_url: str = '', playlist_embed_url: str = '',
+                           upsert: bool = False):
+        """Thêm record playlist vào sheet (upsert: xem add_video_record)
         
         Cấu trúc:
         - Cột A: Tên Bộ Phim
@@ -285,16 +571,13 @@ class GoogleSheetManager:
             datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Cột F: Ngày Upload
         ]
         
-        try:
-            self.worksheet.append_row(row)
-            return True
-        except Exception as e:
-            raise Exception(f"Lỗi khi thêm playlist record vào sheet: {str(e)}")
+        return self._append_row(row, "playlist record", upsert=upsert)
     
     def add_channel_video_record(self, film_name: str, episode_number: int,
                                  video_url: str, embed_url: str,
-                                 channel_id: str, upload_date: str):
-        """Thêm record video (cho chế độ quét kênh) vào sheet.
+                                 channel_id: str, upload_date: str,
+                                 upsert: bool = False):
+        """Thêm record video (cho chế độ quét kênh) vào sheet (upsert: xem add_video_record).
         
         Cấu trúc sheet (6 cột đầu):
         - Cột A: Tên Bộ Phim
@@ -321,12 +604,671 @@ class GoogleSheetManager:
             upload_date,     # F: Ngày lấy
         ]
         
+        return self._append_row(row, "channel video record", upsert=upsert)
+    
+    # ------------------------------------------------------------------
+    # Ghi theo lô
+    # ------------------------------------------------------------------
+    @contextlib.contextmanager
+    def buffered(self, max_rows: int = 50, max_delay: float = 10.0):
+        """Gom các add_*_record trong khối with thành append_rows theo lô
+        
+        Lô được ghi khi đủ max_rows dòng, khi dòng đầu tiên đã chờ max_delay
+        giây (timer nền, kể cả khi không có dòng mới), khi gọi flush() hoặc
+        khi ra khỏi khối with.
+        
+        Ví dụ:
+            with sheet.buffered() as report:
+                for ...: sheet.add_channel_video_record(...)
+            report['written'], report['failed']  # failed: [{'row', 'error'}]
+        """
+        with self._buffer_lock:
+            if self._buffer_depth == 0:
+                self.buffer_max_rows = max_rows
+                self.buffer_max_delay = max_delay
+                self._buffer_report = {'written': 0, 'failed': []}
+            self._buffer_depth += 1
+            report = self._buffer_report
+        try:
+            yield report
+        finally:
+            with self._buffer_lock:
+                self._buffer_depth -= 1
+                if self._buffer_depth == 0:
+                    self.flush()
+                    self._buffer_report = None
+    
+    @_quota_operation("ghi buffer")
+    def flush(self) -> Dict:
+        """Ghi ngay các dòng đang chờ trong buffer
+        
+        Cũng báo luồng ghi nền ghi ngay lô đang gom (không chờ, xem join()).
+        
+        Returns:
+            dict {written: số dòng đã ghi, failed: [{'row', 'error'}]} của buffer
+        """
+        self._writer_wake.set()
+        with self._buffer_lock:
+            pending, self._buffer = self._buffer, []
+            self._buffer_since = None
+            if self._buffer_timer is not None:
+                self._buffer_timer.cancel()
+                self._buffer_timer = None
+            result = {'written': 0, 'failed': []}
+            if pending:
+                if not self.worksheet:
+                    self.create_or_get_sheet()
+                appends = [(row, label) for row, label, upsert in pending if not upsert]
+                upserts = [(row, label) for row, label, upsert in pending if upsert]
+                if appends:
+                    self._flush_appends(appends, result)
+                if upserts:
+                    rows = [row for row, _ in upserts]
+                    try:
+                        self.upsert_rows(rows)
+                        result['written'] += len(rows)
+                    except Exception as e:
+                        result['failed'].extend(
+                            {'row': row, 'error': f"Lỗi khi cập nhật {label} vào sheet: {str(e)}"}
+                            for row, label in upserts
+                        )
+            if self._buffer_report is not None:
+                self._buffer_report['written'] += result['written']
+                self._buffer_report['failed'].extend(result['failed'])
+            return result
+    
+    def _start_buffer_timer(self, delay: float):
+        timer = threading.Timer(delay, self._flush_due)
+        timer.daemon = True
+        self._buffer_timer = timer
+        timer.start()
+    
+    def _flush_due(self):
+        """Timer của buffered(): ghi buffer khi dòng đầu đã chờ đủ buffer_max_delay"""
+        with self._buffer_lock:
+            if self._buffer_timer is not threading.current_thread():
+                return  # timer cũ (buffer đã được flush)
+            self._buffer_timer = None
+            if not self._buffer or self._buffer_since is None:
+                return
+            remaining = self._buffer_since + self.buffer_max_delay - time.monotonic()
+            if remaining > 0:
+                self._start_buffer_timer(remaining)
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                if self.log_callback:
+                    self.log_callback(f"⚠️ Lỗi khi ghi buffer: {str(e)}")
+    
+    def _flush_appends(self, pending: List, result: Dict):
+        """append_rows các dòng mới trong buffer, lỗi thì ghi từng dòng"""
+        rows = [row for row, _ in pending]
+        writes = 0
         try:
-            self.worksheet.append_row(row)
+            response = self._append_rows_with_retry(rows)
+            result['written'] += len(rows)
+            writes = 1
+            self._snapshot_append(rows, response)
+        except Exception as e:
+            if self._is_quota_error(e):
+                # Hết quota: ghi từng dòng cũng sẽ lỗi, báo lỗi cả lô
+                result['failed'].extend(
+                    {'row': row, 'error': f"Lỗi khi thêm {label} vào sheet: {str(e)}"}
+                    for row, label in pending
+                )
+            else:
+                # Ghi từng dòng để biết chính xác dòng nào lỗi
+                for row, label in pending:
+                    try:
+                        response = self.worksheet.append_row(row)
+                        result['written'] += 1
+                        writes += 1
+                        self._snapshot_append([row], response)
+                    except Exception as row_error:
+                        result['failed'].append({
+                            'row': row,
+                            'error': f"Lỗi khi thêm {label} vào sheet: {str(row_error)}"
+                        })
+        self._note_writes(writes)
+    
+    @_quota_operation("ghi dòng")
+    def _append_row(self, row: List, label: str, upsert: bool = False) -> bool:
+        """Ghi 1 dòng (hoặc đưa vào buffer nếu đang trong khối buffered())
+        
+        upsert=True: cập nhật dòng cùng (Tên Bộ Phim, Số Tập) nếu đã có
+        """
+        with self._buffer_lock:
+            if self._buffer_depth:
+                now = time.monotonic()
+                self._buffer.append((row, label, upsert))
+                if self._buffer_since is None:
+                    self._buffer_since = now
+                    self._start_buffer_timer(self.buffer_max_delay)
+                if (len(self._buffer) >= self.buffer_max_rows
+                        or now - self._buffer_since >= self.buffer_max_delay):
+                    self.flush()
+                return True
+        
+        if upsert:
+            try:
+                self.upsert_rows([row])
+            except Exception as e:
+                raise Exception(f"Lỗi khi cập nhật {label} vào sheet: {str(e)}")
             return True
+        
+        try:
+            response = self.worksheet.append_row(row)
         except Exception as e:
-            raise Exception(f"Lỗi khi thêm channel video record vào sheet: {str(e)}")
+            raise Exception(f"Lỗi khi thêm {label} vào sheet: {str(e)}")
+        self._snapshot_append([row], response)
+        self._note_writes(1)
+        return True
+    
+    def _append_rows_with_retry(self, rows: List[List]) -> Dict:
+        """append_rows 1 request, chờ backoff rồi thử lại khi bị giới hạn quota (429)
+        
+        Returns:
+            Response của Sheets API (có updates.updatedRange = vùng đã ghi)
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.worksheet.append_rows(rows)
+            except Exception as e:
+                if not self._is_quota_error(e) or attempt >= self.max_write_retries:
+                    raise
+                time.sleep(min(60.0, 5.0 * (2 ** attempt)) + random.uniform(0, 1))
+                attempt += 1
+                with self._writer_lock:
+                    self.writer_stats['retries'] += 1
+    
+    @staticmethod
+    def _is_quota_error(error: Exception) -> bool:
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None) == 429
+    
+    @_quota_operation("đọc video ID")
+    def get_existing_video_ids(self) -> set:
+        """Tập video ID đã có trong sheet (chỉ đọc các cột link/embed)
+        
+        Cột link/embed được xác định 1 lần từ header, sau đó chỉ tải dải cột đó
+        (1 request) thay vì get_all_records() cả sheet. Gồm cả cột C vì dòng
+        quét kênh ghi link ở cột C.
+        """
+        if not self.worksheet:
+            self.create_or_get_sheet()
+        
+        try:
+            cols = [self.CHANNEL_LINK_COL]
+            for names in (self.LINK_HEADERS, self.EMBED_HEADERS):
+                col = self._find_header_column(names)
+                if col:
+                    cols.append(col)
+            first, last = min(cols), max(cols)
+            if self.use_snapshot:
+                # Đọc từ snapshot (không tốn request nếu sheet không đổi)
+                values = [row[first - 1:last] for row in self.get_rows()[1:]]
+            else:
+                values = self.worksheet.get(f"{_col_letter(first)}2:{_col_letter(last)}")
+        except Exception as e:
+            raise Exception(f"Lỗi khi lấy danh sách video ID: {str(e)}")
+        
+        video_ids = set()
+        for row in values or []:
+            for cell in row:
+                video_id = canonical_video_id(cell)
+                if video_id:
+                    video_ids.add(video_id)
+        return video_ids
+    
+    # ------------------------------------------------------------------
+    # Ghi nền (write-behind)
+    # ------------------------------------------------------------------
+    def enqueue(self, row: List, label: str = "record", upsert: bool = False) -> Future:
+        """Đưa 1 dòng vào hàng đợi ghi nền, trả về ngay (không chờ Sheets)
+        
+        Luồng ghi gom các dòng trong hàng đợi thành lô (tối đa writer_max_rows
+        dòng hoặc chờ writer_max_delay giây), ghi bằng append_rows / upsert_rows
+        và tự thử lại với backoff khi bị giới hạn quota.
+        
+        Returns:
+            Future: result() = True khi dòng đã ghi, exception nếu ghi lỗi
+        """
+        future = Future()
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer_stop = False
+                self._writer = threading.Thread(target=self._writer_loop,
+                                                name="sheet-writer", daemon=True)
+                self._writer.start()
+            enqueued_at = time.monotonic()
+            self._writer_pending += 1
+            self._writer_times.append(enqueued_at)
+            self._write_queue.put((row, label, upsert, future, enqueued_at))
+        return future
+    
+    def enqueue_channel_video_record(self, film_name: str, episode_number,
+                                     video_url: str, embed_url: str,
+                                     channel_id: str, upload_date: str) -> Future:
+        """Như add_channel_video_record nhưng ghi nền (xem enqueue())"""
+        try:
+            ep_int = int(episode_number)
+        except Exception:
+            ep_int = episode_number
+        row = [film_name, ep_int, video_url, embed_url, channel_id, upload_date]
+        return self.enqueue(row, "channel video record")
+    
+    def join(self, timeout: float = None) -> bool:
+        """Chờ luồng ghi nền ghi hết hàng đợi
+        
+        Returns:
+            True nếu đã ghi hết, False nếu hết timeout
+        """
+        self._writer_wake.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._writer_lock:
+            while self._writer_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._writer_idle.wait(remaining)
+        return True
+    
+    def close_writer(self, timeout: float = None) -> bool:
+        """Ghi hết hàng đợi rồi dừng luồng ghi nền"""
+        done = self.join(timeout)
+        with self._writer_lock:
+            self._writer_stop = True
+            writer = self._writer
+        self._writer_wake.set()
+        if writer:
+            writer.join(timeout)
+        return done
+    
+    def get_writer_metrics(self) -> Dict:
+        """Số liệu luồng ghi nền
+        
+        Returns:
+            dict {queued: số dòng chờ ghi, lag: số giây dòng cũ nhất đã chờ,
+            written, failed, batches, retries, last_batch_seconds}
+        """
+        with self._writer_lock:
+            metrics = dict(self.writer_stats)
+            metrics['queued'] = self._writer_pending
+            metrics['lag'] = (time.monotonic() - self._writer_times[0]
+                              if self._writer_times else 0.0)
+        return metrics
+    
+    def _writer_loop(self):
+        """Luồng ghi nền: lấy lô từ hàng đợi và ghi vào sheet"""
+        while True:
+            try:
+                first = self._write_queue.get(timeout=0.5)
+            except queue.Empty:
+                with self._writer_lock:
+                    if self._writer_stop:
+                        return
+                continue
+            batch = [first]
+            # Gom thêm dòng tới khi đủ lô, hết thời gian chờ, hoặc có flush()/join()
+            deadline = first[4] + self.writer_max_delay
+            while len(batch) < self.writer_max_rows:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._writer_wake.is_set():
+                        break
+                    self._writer_wake.wait(min(remaining, 0.05))
+                    continue
+                batch.append(item)
+            self._writer_wake.clear()
+            self._write_batch(batch)
+    
+    @_quota_operation("ghi nền")
+    def _write_batch(self, batch: List):
+        """Ghi 1 lô của luồng nền, báo kết quả cho từng Future"""
+        started = time.monotonic()
+        result = {'written': 0, 'failed': []}
+        try:
+            if not self.worksheet:
+                self.create_or_get_sheet()
+            appends = [(row, label) for row, label, upsert, _, _ in batch if not upsert]
+            upserts = [(row, label) for row, label, upsert, _, _ in batch if upsert]
+            if appends:
+                self._flush_appends(appends, result)
+            if upserts:
+                try:
+                    self.upsert_rows([row for row, _ in upserts])
+                except Exception as e:
+                    result['failed'].extend(
+                        {'row': row, 'error': f"Lỗi khi cập nhật {label} vào sheet: {str(e)}"}
+                        for row, label in upserts
+                    )
+        except Exception as e:
+            result['failed'] = [
+                {'row': row, 'error': f"Lỗi khi thêm {label} vào sheet: {str(e)}"}
+                for row, label, _, _, _ in batch
+            ]
+        
+        errors = {id(f['row']): f['error'] for f in result['failed']}
+        for row, _, _, future, _ in batch:
+            if id(row) in errors:
+                future.set_exception(Exception(errors[id(row)]))
+            else:
+                future.set_result(True)
+        
+        with self._writer_lock:
+            self.writer_stats['written'] += len(batch) - len(errors)
+            self.writer_stats['failed'] += len(errors)
+            self.writer_stats['batches'] += 1
+            self.writer_stats['last_batch_seconds'] = time.monotonic() - started
+            # Chỉ 1 luồng ghi, lấy theo thứ tự enqueue → lô luôn là các dòng cũ nhất
+            for _ in batch:
+                self._writer_times.popleft()
+            self._writer_pending -= len(batch)
+            if not self._writer_pending:
+                self._writer_idle.notify_all()
+    
+    # ------------------------------------------------------------------
+    # Upsert theo (Tên Bộ Phim, Số Tập)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def row_key(row) -> Optional[tuple]:
+        """Khóa (tên phim, tập) của 1 dòng: "Tập 3" và 3 cùng khóa, "Playlist" giữ nguyên"""
+        if len(row) < 2:
+            return None
+        film = str(row[0] if row[0] is not None else '').strip().casefold()
+        episode = str(row[1] if row[1] is not None else '').strip()
+        if not film or not episode:
+            return None
+        match = re.search(r'\d+', episode)
+        return (film, int(match.group()) if match else episode.casefold())
+    
+    @_quota_operation("upsert")
+    def upsert_rows(self, rows: List[List]) -> Dict:
+        """Ghi các dòng theo khóa (Tên Bộ Phim, Số Tập)
+        
+        - Khóa đã có trong sheet: chỉ ghi các ô khác giá trị cũ, tất cả dòng
+          gộp vào 1 batch_update. Ô mới để trống và cột UPSERT_KEEP_COLS
+          (ngày upload) không ghi đè giá trị đang có
+        - Khóa mới: 1 append_rows (trùng khóa trong cùng lô → lấy dòng sau cùng)
+        Chỉ mục khóa → số dòng giữ trong snapshot (xem get_rows()), nên không
+        cần đọc lại sheet giữa các lần upsert. use_snapshot=False: mỗi lần
+        upsert đọc lại toàn bộ sheet, không giữ gì trong bộ nhớ.
+        
+        Returns:
+            dict {updated, appended, unchanged}
+        """
+        stats = {'updated': 0, 'appended': 0, 'unchanged': 0}
+        if not rows:
+            return stats
+        
+        with self._snapshot_lock:
+            values = self.get_rows()
+            snapshot = self._snapshot if self.use_snapshot else {'rows': values}
+            snapshot_rows = snapshot['rows']
+            index = self._key_index(snapshot)
+            
+            new_rows: Dict = {}   # khóa (hoặc id dòng không có khóa) → dòng mới
+            updates: Dict = {}    # số dòng → dòng mới
+            for row in rows:
+                key = self.row_key(row)
+                row_number = index.get(key) if key else None
+                if row_number:
+                    updates[row_number] = row
+                else:
+                    new_rows[key if key else id(row)] = row
+            
+            data = []
+            patched = {}
+            for row_number, row in updates.items():
+                old = snapshot_rows[row_number - 1]
+                merged = list(old) + [''] * max(0, len(row) - len(old))
+                changed = []
+                # Cột A-B là khóa (đã khớp sau chuẩn hóa), giữ nguyên cách viết cũ
+                for col, value in enumerate(row[2:], start=2):
+                    text = '' if value is None else str(value)
+                    if text == '' or text == merged[col]:
+                        continue
+                    if col in self.UPSERT_KEEP_COLS and merged[col]:
+                        continue
+                    merged[col] = text
+                    changed.append((col, value))
+                if not changed:
+                    stats['unchanged'] += 1
+                    continue
+                patched[row_number] = merged
+                data.extend(self._update_ranges(row_number, changed))
+            
+            response = None
+            try:
+                if data:
+                    self.worksheet.batch_update(data)
+                if new_rows:
+                    response = self._append_rows_with_retry(list(new_rows.values()))
+            except Exception as e:
+                # Không rõ phần nào đã ghi: lần sau tải lại sheet
+                self.invalidate_snapshot()
+                raise Exception(f"Lỗi khi upsert {len(rows)} dòng vào sheet: {str(e)}")
+            
+            for row_number, merged in patched.items():
+                snapshot_rows[row_number - 1] = merged
+            stats['updated'] = len(patched)
+            stats['appended'] = len(new_rows)
+            if new_rows:
+                self._snapshot_append(list(new_rows.values()), response)
+            self._note_writes(bool(data) + bool(new_rows))
+            return stats
+    
+    @staticmethod
+    def _update_ranges(row_number: int, changed: List) -> List[Dict]:
+        """Gộp các ô thay đổi liền nhau của 1 dòng thành range cho batch_update"""
+        ranges = []
+        start = prev = None
+        values = []
+        for col, value in changed + [(None, None)]:
+            if start is not None and col == prev + 1:
+                values.append(value)
+            else:
+                if start is not None:
+                    ranges.append({
+                        'range': f"{_col_letter(start + 1)}{row_number}:{_col_letter(prev + 1)}{row_number}",
+                        'values': [values],
+                    })
+                start, values = col, [value]
+            prev = col
+        return ranges
+    
+    def _key_index(self, snapshot: Dict) -> Dict:
+        """Chỉ mục (tên phim, tập) → số dòng, gắn với snapshot
+        
+        Snapshot tải lại → chỉ mục dựng lại; snapshot thêm dòng → chỉ mục
+        chỉ đánh thêm các dòng mới. Trùng khóa → giữ dòng đầu tiên.
+        """
+        index = snapshot.setdefault('index', {})
+        rows = snapshot['rows']
+        start = snapshot.get('indexed', 1)  # bỏ qua header (dòng 1)
+        for i in range(start, len(rows)):
+            key = self.row_key(rows[i])
+            if key and key not in index:
+                index[key] = i + 1
+        snapshot['indexed'] = len(rows)
+        return index
+    
+    # ------------------------------------------------------------------
+    # Snapshot worksheet
+    # ------------------------------------------------------------------
+    @_quota_operation("đọc sheet")
+    def get_rows(self) -> List[List[str]]:
+        """Toàn bộ giá trị worksheet (gồm header), qua snapshot trong bộ nhớ
+        
+        - Lần đầu: tải toàn bộ (get_all_values)
+        - Các lần sau: hỏi Drive version của spreadsheet (1 request Drive, không
+          tốn quota Sheets). Không đổi → dùng snapshot; đổi (có người sửa sheet)
+          → tải lại toàn bộ, trừ khi chỉ do chính manager này ghi (xem
+          _own_writes_only())
+        - Không đọc được version (thiếu quyền Drive, lỗi mạng) → chỉ tải các
+          dòng mới được thêm sau dòng cuối của snapshot; snapshot cũ hơn
+          SNAPSHOT_RELOAD_SECONDS thì tải lại toàn bộ (sửa / xóa dòng cũ)
+        - Ghi qua manager này cập nhật thẳng vào snapshot
+        use_snapshot=False: luôn tải toàn bộ, không giữ snapshot.
+        """
+        if not self.worksheet:
+            self.create_or_get_sheet()
+        
+        if not self.use_snapshot:
+            try:
+                return self.worksheet.get_all_values()
+            except Exception as e:
+                raise Exception(f"Lỗi khi đọc dữ liệu sheet: {str(e)}")
+        
+        with self._snapshot_lock:
+            version = self._drive_version()
+            snapshot = self._snapshot
+            try:
+                if (snapshot is None
+                        or (version is not None and version != snapshot['version']
+                            and not self._own_writes_only(snapshot, version))
+                        or (version is None and time.monotonic() - snapshot['loaded_at']
+                            >= self.SNAPSHOT_RELOAD_SECONDS)):
+                    rows = self.worksheet.get_all_values()
+                    self._snapshot = {'rows': rows, 'version': version,
+                                      'loaded_at': time.monotonic()}
+                elif version is None:
+                    # Không biết sheet có đổi không: tải phần đuôi (dòng mới append)
+                    start = len(snapshot['rows']) + 1
+                    tail = self.worksheet.get(f"A{start}:{_col_letter(self.worksheet.col_count)}")
+                    snapshot['rows'].extend(tail or [])
+            except Exception as e:
+                raise Exception(f"Lỗi khi đọc dữ liệu sheet: {str(e)}")
+            return list(self._snapshot['rows'])
+    
+    def invalidate_snapshot(self):
+        """Bỏ snapshot, lần đọc sau tải lại toàn bộ worksheet"""
+        with self._snapshot_lock:
+            self._snapshot = None
+    
+    def _snapshot_append(self, rows: List[List], response: Dict):
+        """Cập nhật snapshot sau khi chính manager này append dòng
+        
+        Dòng được đặt đúng vị trí Sheets báo đã ghi (updates.updatedRange của
+        response): append ghi sau bảng mà Sheets nhận ra, có thể là khoảng trống
+        giữa sheet chứ không luôn là sau dòng cuối. Không đọc được vị trí → bỏ
+        snapshot, lần đọc sau tải lại.
+        """
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            start = self._appended_row_number(response)
+            if start is None:
+                self._snapshot = None
+                return
+            values = snapshot['rows']
+            first = start - 1
+            if first < len(values):
+                # Ghi đè vào giữa snapshot → chỉ mục khóa dựng lại từ đầu
+                snapshot.pop('index', None)
+                snapshot.pop('indexed', None)
+            values.extend([] for _ in range(first + len(rows) - len(values)))
+            for i, row in enumerate(rows):
+                values[first + i] = ['' if v is None else str(v) for v in row]
+    
+    def _note_writes(self, writes: int):
+        """Đếm request ghi của manager này kể từ version Drive của snapshot"""
+        with self._snapshot_lock:
+            if self._snapshot is not None and writes:
+                self._snapshot['writes'] = self._snapshot.get('writes', 0) + writes
+    
+    def _own_writes_only(self, snapshot: Dict, version: str) -> bool:
+        """Version Drive đổi chỉ vì các lần ghi của chính manager này?
+        
+        Drive không hứa mỗi request ghi tăng version đúng 1 (có thể tăng hơn,
+        hoặc trễ sau vài giây), nên không so version chính xác: chấp nhận khi
+        version nhích lên không quá SNAPSHOT_MAX_DRIFT lần số request đã ghi và
+        SNAPSHOT_CHECK_ROWS dòng cuối trên sheet (cùng số dòng) khớp snapshot.
+        Tốn 1 request đọc nhỏ thay vì get_all_values().
+        """
+        writes = snapshot.get('writes', 0)
+        old = snapshot['version']
+        if not writes or not str(old).isdigit() or not version.isdigit():
+            return False
+        if not 0 < int(version) - int(old) <= self.SNAPSHOT_MAX_DRIFT * writes:
+            return False
+        rows = snapshot['rows']
+        start = max(2, len(rows) - self.SNAPSHOT_CHECK_ROWS + 1)
+        tail = self.worksheet.get(f"A{start}:{_col_letter(self.worksheet.col_count)}") or []
+        if self._trim_rows(tail) != self._trim_rows(rows[start - 1:]):
+            return False
+        snapshot['version'] = version
+        snapshot['writes'] = 0
+        return True
+    
+    @staticmethod
+    def _trim_rows(rows: List[List]) -> List[List[str]]:
+        """Các dòng dạng chuỗi, bỏ ô trống cuối dòng và dòng trống cuối bảng
+        (Sheets API không trả về các ô / dòng này)"""
+        values = []
+        for row in rows:
+            cells = ['' if v is None else str(v) for v in row]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+    
+    @staticmethod
+    def _appended_row_number(response) -> Optional[int]:
+        """Số dòng đầu tiên append_row(s) đã ghi, từ updates.updatedRange
+        (vd: "'Sheet4'!A1235:P1236" → 1235), None nếu không đọc được"""
+        try:
+            updated_range = response['updates']['updatedRange']
+        except (TypeError, KeyError):
+            return None
+        match = re.match(r'\$?[A-Za-z]+\$?(\d+)', str(updated_range).rsplit('!', 1)[-1])
+        return int(match.group(1)) if match else None
+    
+    def _drive_version(self) -> Optional[str]:
+        """Drive version của spreadsheet (tăng mỗi khi file bị sửa), None nếu lỗi
+        hoặc response không có trường version"""
+        try:
+            spreadsheet_id = self.worksheet.spreadsheet.id
+            # gspread 6 dùng client.http_client, gspread 5 dùng client.request
+            http = getattr(self.client, 'http_client', self.client)
+            response = http.request(
+                'get', f"{DRIVE_FILES_URL}/{spreadsheet_id}",
+                params={'fields': 'version', 'supportsAllDrives': True},
+            )
+            version = response.json().get('version')
+        except Exception:
+            return None
+        return None if version is None else str(version)
+    
+    def _reset_worksheet_cache(self):
+        """Xóa cache header/snapshot khi đổi worksheet"""
+        self._headers = None
+        self.invalidate_snapshot()
+    
+    def get_headers(self) -> List[str]:
+        """Header (dòng 1) của worksheet, đọc 1 lần rồi dùng lại"""
+        if not self.worksheet:
+            self.create_or_get_sheet()
+        if self._headers is None:
+            self._headers = [h.strip() for h in self.worksheet.row_values(1)]
+        return self._headers
+    
+    def _find_header_column(self, names) -> Optional[int]:
+        """Số thứ tự cột (bắt đầu từ 1) của header đầu tiên khớp names"""
+        headers = self.get_headers()
+        for name in names:
+            if name in headers:
+                return headers.index(name) + 1
+        return None
     
+    @_quota_operation("đọc records")
     def get_all_records(self) -> List[Dict]:
         """Lấy tất cả records từ sheet"""
         if not self.worksheet:
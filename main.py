@@ -2,11 +2,22 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import os
+import contextlib
 import json
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 from dailymotion_api import DailymotionAPI
 from google_sheet import GoogleSheetManager
+from response_cache import ResponseCache
+from upload_index import UploadIndex
+
+# Field cần cho quét kênh: lấy luôn embed_url trong listing để mỗi page 100
+# video chỉ tốn 1 request
+SCAN_VIDEO_FIELDS = "id,title,url,embed_url,created_time,private"
 
 
 class DailymotionHelperGUI:
@@ -37,15 +48,23 @@ class DailymotionHelperGUI:
         self.scan_interval_minutes = tk.IntVar(value=60)
         self.scan_thread: threading.Thread | None = None
         self.scan_stop_event = threading.Event()
+        # Số kênh quét song song (dùng chung rate limit của Dailymotion API)
+        self.scan_workers = 4
 
         # Quản lý API / Google Sheet
         self.dm_api: DailymotionAPI | None = None
         self.sheet_manager: GoogleSheetManager | None = None
 
         self.config_file = "config.json"
+        # Watermark quét kênh: {channel_id: {"created_time": ..., "video_id": ...}}
+        # Xóa file này để buộc quét lại toàn bộ kênh
+        self.scan_state_file = "scan_state.json"
+
+        self._log_queue: "queue.Queue[str]" = queue.Queue()
 
         self._build_ui()
         self._load_config()
+        self._poll_log_queue()
 
     # ---------------------------------------------------------------------
     # UI
@@ -132,6 +151,7 @@ class DailymotionHelperGUI:
             "sheet_name": self.sheet_name.get(),
             "channel_ids": self._get_channel_ids(),
             "scan_interval_minutes": self.scan_interval_minutes.get(),
+            "scan_workers": self.scan_workers,
         }
         try:
             with open(self.config_file, "w", encoding="utf-8") as f:
@@ -160,10 +180,33 @@ class DailymotionHelperGUI:
                 for cid in channel_ids:
                     self.channel_ids_text.insert(tk.END, cid + "\n")
             self.scan_interval_minutes.set(cfg.get("scan_interval_minutes", 60))
+            self.scan_workers = int(cfg.get("scan_workers", 4) or 4)
             self._log("Đã tải cấu hình.")
         except Exception as e:
             self._log(f"❌ Không thể tải cấu hình: {e}")
 
+    def _load_scan_state(self) -> dict:
+        """Đọc watermark (video mới nhất đã quét) của từng kênh."""
+        if not os.path.exists(self.scan_state_file):
+            return {}
+        try:
+            with open(self.scan_state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except Exception as e:
+            self._log(f"⚠️ Không thể đọc {self.scan_state_file}, sẽ quét toàn bộ: {e}")
+            return {}
+
+    def _save_scan_state(self, state: dict):
+        """Ghi watermark quét kênh (ghi file tạm rồi replace để không hỏng file)."""
+        tmp_path = self.scan_state_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.scan_state_file)
+        except Exception as e:
+            self._log(f"⚠️ Không thể lưu {self.scan_state_file}: {e}")
+
     # ---------------------------------------------------------------------
     # Google Sheet
     # ---------------------------------------------------------------------
@@ -188,6 +231,9 @@ class DailymotionHelperGUI:
             self.sheet_manager = GoogleSheetManager(
                 credentials_path=self.google_credentials_path.get(),
                 token_path="tokens/token.json",
+                # Quét kênh định kỳ: chỉ tải lại sheet khi có người khác sửa
+                use_snapshot=True,
+                log_callback=self._log,
             )
             self.sheet_manager.authenticate()
             # Mở sheet theo ID + name
@@ -213,6 +259,11 @@ class DailymotionHelperGUI:
                 self.api_key.get(),
                 self.api_secret.get(),
                 log_callback=self._log,
+                # Dùng lại token giữa các lần mở app (không tốn request lấy token)
+                token_cache_path="tokens/dailymotion_token.json",
+                cache=ResponseCache(disk_path="dailymotion_cache.sqlite3"),
+                # Cùng chỉ mục với batch_upload.py: file trùng nội dung không upload lại
+                upload_index=UploadIndex("upload_index.json"),
             )
             # Test token
             token = self.dm_api.get_access_token()
@@ -314,6 +365,7 @@ class DailymotionHelperGUI:
                             episode_number=str(episode),
                             video_data=record,
                             description=title,
+                            upsert=True,
                         )
                         result_text.insert(tk.END, "✅ Đã lưu vào Google Sheet.\n")
                         self._log(f"Đã lưu video {vid} (Tập {episode}) vào Google Sheet.")
@@ -367,14 +419,10 @@ class DailymotionHelperGUI:
                 result_text.insert(tk.END, "Đang lấy video trong playlist...\n")
                 dialog.update()
 
-                videos = self.dm_api.get_playlist_videos(pl_url)
-                if not videos:
-                    result_text.insert(tk.END, "❌ Không tìm thấy video nào trong playlist.\n")
-                    result_text.config(state=tk.DISABLED)
-                    return
-
-                result_text.insert(tk.END, f"✅ Tìm thấy {len(videos)} video.\n\n")
+                # Duyệt lazy: xử lý/ghi từng video ngay khi page về, prefetch page kế tiếp
+                videos = self.dm_api.iter_playlist_videos(pl_url, prefetch=True)
                 saved = 0
+                total = 0
 
                 import re as _re
 
@@ -388,73 +436,90 @@ class DailymotionHelperGUI:
                     r"(\d+)\s*集",
                 ]
 
-                for idx, v in enumerate(videos, 1):
-                    vid = v.get("id")
-                    original_title = v.get("title", "")
-                    embed = v.get("embed_url")
-                    url = v.get("url")
-                    thumb = v.get("thumbnail_url")
-                    created = v.get("created_time", "")
-
-                    # Extract episode
-                    episode = None
-                    for p in patterns:
-                        m = _re.search(p, original_title, _re.IGNORECASE)
-                        if m:
+                # Gom các dòng ghi sheet thành append_rows theo lô
+                buffer = self.sheet_manager.buffered() if self.sheet_manager else contextlib.nullcontext({})
+                with buffer as report:
+                    for idx, v in enumerate(videos, 1):
+                        total = idx
+                        vid = v.get("id")
+                        original_title = v.get("title", "")
+                        embed = v.get("embed_url")
+                        url = v.get("url")
+                        thumb = v.get("thumbnail_url")
+                        created = v.get("created_time", "")
+
+                        # Extract episode
+                        episode = None
+                        for p in patterns:
+                            m = _re.search(p, original_title, _re.IGNORECASE)
+                            if m:
+                                try:
+                                    episode = int(m.group(1))
+                                except Exception:
+                                    episode = None
+                                break
+                        if episode is None:
+                            episode = idx
+
+                        new_title = f"Tập {episode} - {film_title}"
+
+                        # Format date
+                        upload_date = ""
+                        if created:
                             try:
-                                episode = int(m.group(1))
+                                ts = int(created)
+                                upload_date = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
                             except Exception:
-                                episode = None
-                            break
-                    if episode is None:
-                        episode = idx
+                                upload_date = str(created)
+
+                        result_text.insert(
+                            tk.END,
+                            f"[{idx}] {vid}\n"
+                            f"  Gốc : {original_title}\n"
+                            f"  Mới : {new_title}\n"
+                            f"  Tập : {episode}\n"
+                            f"  Embed: {embed}\n\n",
+                        )
+                        dialog.update()
+
+                        if self.sheet_manager:
+                            record = {
+                                "video_id": vid,
+                                "title": new_title,
+                                "embed_url": embed,
+                                "url": url,
+                                "thumbnail_url": thumb,
+                                "private": v.get("private", True),
+                            }
+                            try:
+                                self.sheet_manager.add_video_record(
+                                    film_name=film_title,
+                                    episode_number=str(episode),
+                                    video_data=record,
+                                    description=f"Tập {episode}\n{original_title}",
+                                    upsert=True,
+                                )
+                                saved += 1
+                                self._log(f"Đã thêm video {vid} (Tập {episode}) vào hàng đợi ghi Sheet.")
+                            except Exception as e:
+                                result_text.insert(tk.END, f"  ⚠️ Lỗi khi lưu Sheet: {e}\n\n")
+                                self._log(f"Lỗi khi lưu video {vid}: {e}")
 
-                    new_title = f"Tập {episode} - {film_title}"
+                if self.sheet_manager:
+                    # Dòng đã vào buffer chưa chắc đã ghi được: tính lại theo kết quả flush
+                    saved = report["written"]
+                    for failure in report["failed"]:
+                        result_text.insert(tk.END, f"  ⚠️ Lỗi khi lưu Sheet: {failure['error']}\n")
+                        self._log(f"Lỗi khi lưu Sheet: {failure['error']}")
 
-                    # Format date
-                    upload_date = ""
-                    if created:
-                        try:
-                            ts = int(created)
-                            upload_date = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
-                        except Exception:
-                            upload_date = str(created)
-
-                    result_text.insert(
-                        tk.END,
-                        f"[{idx}/{len(videos)}] {vid}\n"
-                        f"  Gốc : {original_title}\n"
-                        f"  Mới : {new_title}\n"
-                        f"  Tập : {episode}\n"
-                        f"  Embed: {embed}\n\n",
-                    )
-                    dialog.update()
-
-                    if self.sheet_manager:
-                        record = {
-                            "video_id": vid,
-                            "title": new_title,
-                            "embed_url": embed,
-                            "url": url,
-                            "thumbnail_url": thumb,
-                            "private": v.get("private", True),
-                        }
-                        try:
-                            self.sheet_manager.add_video_record(
-                                film_name=film_title,
-                                episode_number=str(episode),
-                                video_data=record,
-                                description=f"Tập {episode}\n{original_title}",
-                            )
-                            saved += 1
-                            self._log(f"Đã lưu video {vid} (Tập {episode}) vào Sheet.")
-                        except Exception as e:
-                            result_text.insert(tk.END, f"  ⚠️ Lỗi khi lưu Sheet: {e}\n\n")
-                            self._log(f"Lỗi khi lưu video {vid}: {e}")
-
-                result_text.insert(tk.END, "\nHoàn thành.\n")
+                if not total:
+                    result_text.insert(tk.END, "❌ Không tìm thấy video nào trong playlist.\n")
+                    result_text.config(state=tk.DISABLED)
+                    return
+
+                result_text.insert(tk.END, f"\nHoàn thành. Tìm thấy {total} video.\n")
                 if self.sheet_manager:
-                    result_text.insert(tk.END, f"✅ Đã lưu {saved}/{len(videos)} video vào Google Sheet.\n")
+                    result_text.insert(tk.END, f"✅ Đã lưu {saved}/{total} video vào Google Sheet.\n")
 
                 result_text.config(state=tk.DISABLED)
             except Exception as e:
@@ -471,7 +536,12 @@ class DailymotionHelperGUI:
     # ---------------------------------------------------------------------
 
     def _scan_channels_once(self):
-        """Quét tất cả kênh đã cấu hình và lưu embed vào Google Sheet."""
+        """Quét tất cả kênh đã cấu hình và lưu embed vào Google Sheet.
+
+        Các kênh được quét song song trên thread pool giới hạn (scan_workers),
+        dùng chung rate limiter của DailymotionAPI. Kết quả được ghi sheet theo
+        đúng thứ tự kênh đã cấu hình, trong mỗi kênh sort theo (Tên phim, Tập).
+        """
         if not self._ensure_dm_api():
             return
         if not self.sheet_manager:
@@ -484,119 +554,232 @@ class DailymotionHelperGUI:
             return
 
         from datetime import datetime as _dt
-        import re as _re
 
-        # Lấy toàn bộ record hiện có để tránh trùng (dựa trên Link Dailymotion)
-        # Lưu ý: tên header trên sheet có thể khác nhau, hoặc người dùng đã chỉnh sửa,
-        # nên ta sẽ:
-        # 1) Thử lấy theo key chuẩn 'Link Dailymotion' (và vài biến thể)
-        # 2) Nếu không có, quét tất cả value trong hàng, lấy cell nào là URL (bắt đầu bằng http)
-        existing_urls = set()
+        # Video ID đã có trong sheet để tránh trùng. Chỉ đọc cột link/embed
+        # (xác định theo header) thay vì tải toàn bộ sheet.
+        existing_ids = set()
         try:
-            records = self.sheet_manager.get_all_records()
-            for r in records:
-                url = (
-                    r.get("Link Dailymotion")
-                    or r.get("Link Dailymotio")  # phòng khi thiếu chữ 'n'
-                    or r.get("Link")             # fallback rất lỏng
-                )
-                if not url:
-                    # Fallback: kiếm bất kỳ value nào là URL
-                    for v in r.values():
-                        if isinstance(v, str) and v.strip().startswith("http"):
-                            url = v
-                            break
-                if url:
-                    existing_urls.add(str(url).strip())
+            existing_ids = self.sheet_manager.get_existing_video_ids()
         except Exception as e:
-            self._log(f"⚠️ Không thể lấy records hiện có từ Sheet: {e}")
-
-        self._log(f"🚀 Bắt đầu quét {len(channel_ids)} kênh...")
-
-        for cid in channel_ids:
-            cid = cid.strip()
-            if not cid:
-                continue
-            try:
-                self._log(f"🔍 Đang quét kênh: {cid}")
-                videos = self.dm_api.get_user_videos(cid, max_videos=1000)
-                self._log(f"   → Tìm thấy {len(videos)} video (PUBLIC)")
-
-                # Gom tất cả entry mới rồi sort theo (Tên phim, Tập) trước khi ghi sheet
-                entries = []  # mỗi entry: (film_name, episode, video_url, embed_url, upload_date, vid)
-
-                for v in videos:
-                    vid = v.get("id")
-                    title = v.get("title", "")
-
-                    # Chỉ lấy video có pattern: final-<tên phim>-partX hoặc final-<tên phim>-partX-daily.mp4
-                    # Pattern match cả 2 format: final-*-part* và final-*-part*-daily.mp4
-                    m = _re.search(r"^final-(.+?)-part(\d+)(?:-daily)?(?:\.mp4)?$", title, _re.IGNORECASE)
-                    if not m:
-                        # Log video không match pattern để debug
-                        self._log(f"  ⏭️  Bỏ qua video {vid}: không match pattern (title: {title[:50]}...)")
-                        continue
-
-                    film_name = m.group(1).strip()
-                    try:
-                        episode = int(m.group(2))
-                    except Exception:
-                        episode = 0
-
-                    # Lấy thông tin chi tiết để có embed URL
-                    try:
-                        info = self.dm_api.get_video_info(vid)
-                    except Exception as e:
-                        self._log(f"  ❌ Lỗi lấy info video {vid}: {e}")
+            self._log(f"⚠️ Không thể lấy danh sách video hiện có từ Sheet: {e}")
+
+        scan_state = self._load_scan_state()
+        channel_ids = [cid.strip() for cid in channel_ids if cid.strip()]
+        workers = max(1, min(self.scan_workers, len(channel_ids)))
+
+        self._log(f"🚀 Bắt đầu quét {len(channel_ids)} kênh ({workers} luồng)...")
+        scan_started = time.monotonic()
+
+        # Kênh đã enqueue dòng, chờ ghi xong để cập nhật watermark
+        pending_marks = []
+
+        # Quét song song: mỗi kênh chỉ đọc API, chưa ghi sheet
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+            futures = [
+                pool.submit(self._scan_channel, cid, scan_state.get(cid) or {}, existing_ids)
+                for cid in channel_ids
+            ]
+
+            # Ghi sheet theo thứ tự kênh cố định (kết quả xác định, không phụ
+            # thuộc kênh nào quét xong trước)
+            for cid, future in zip(channel_ids, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self._log(f"❌ Lỗi khi quét kênh {cid}: {e}")
+                    continue
+
+                # Ghi nền: chỉ enqueue rồi chuyển sang kênh kế tiếp, không chờ Sheets
+                futures_written = []
+                for film_name, episode, video_url, embed_url, upload_date, vid in result["entries"]:
+                    # Kiểm tra lại: kênh trước có thể vừa ghi cùng video
+                    if vid in existing_ids:
                         continue
+                    self._log(f"  ➕ {film_name} - Tập {episode} ({vid})")
+                    futures_written.append(self.sheet_manager.enqueue_channel_video_record(
+                        film_name=film_name,
+                        episode_number=episode,
+                        video_url=video_url,
+                        embed_url=embed_url,
+                        channel_id=cid,
+                        upload_date=upload_date or _dt.now().strftime("%Y-%m-%d"),
+                    ))
+                    existing_ids.add(vid)
+                pending_marks.append((cid, result["newest"], futures_written, result["failed"]))
+                self._settle_scan_marks(pending_marks, scan_state, block=False)
+
+                metrics = self.sheet_manager.get_writer_metrics()
+                self._log(
+                    f"⏱ Kênh {cid}: {result['total']} video, {len(result['entries'])} mới, "
+                    f"quét trong {result['elapsed']:.1f}s "
+                    f"(chờ ghi sheet: {metrics['queued']} dòng, trễ {metrics['lag']:.1f}s)"
+                )
 
-                    video_url = info.get("url") or v.get("url", "")
-                    embed_url = info.get("embed_url", "")
-                    created_time = info.get("created_time") or v.get("created_time", "")
+        self.sheet_manager.join()
+        self._settle_scan_marks(pending_marks, scan_state, block=True)
+        metrics = self.sheet_manager.get_writer_metrics()
+        self._log(
+            f"💾 Google Sheet (tổng): {metrics['written']} dòng / {metrics['batches']} lô, "
+            f"{metrics['failed']} lỗi, {metrics['retries']} lần retry"
+        )
+        quota = self.sheet_manager.quota.stats
+        self._log(
+            f"📊 Sheets API (tổng): {quota['read']} đọc, {quota['write']} ghi, "
+            f"chờ quota {quota['throttled']} lần ({quota['wait_seconds']:.1f}s)"
+        )
+        self._log(f"✅ Quét kênh hoàn tất ({time.monotonic() - scan_started:.1f}s).")
+        stats = self.dm_api.get_stats()
+        self._log(
+            f"📊 Dailymotion API: {stats['requests']} request, {stats['throttled']} lần bị 429, "
+            f"{stats['retried']} lần retry, chờ {stats['wait_seconds']:.1f}s"
+        )
 
-                    # Bỏ qua nếu video đã tồn tại trong sheet
-                    if video_url and video_url.strip() in existing_urls:
-                        self._log(f"  ⏭️  Bỏ qua video {vid}: đã có trong Sheet")
-                        continue
+    def _settle_scan_marks(self, pending_marks: list, scan_state: dict, block: bool):
+        """Cập nhật watermark cho các kênh đã ghi sheet xong (theo thứ tự kênh).
 
-                    # Format ngày
-                    upload_date = ""
-                    if created_time:
-                        try:
-                            dt = _dt.fromtimestamp(int(created_time))
-                            upload_date = dt.strftime("%Y-%m-%d")
-                        except Exception:
-                            upload_date = str(created_time)
+        Không cập nhật watermark nếu kênh có video quét/ghi sheet lỗi, để lần
+        quét sau thử lại. block=False: dừng ở kênh đầu tiên còn dòng chưa ghi.
+        """
+        while pending_marks:
+            cid, newest, futures, write_failed = pending_marks[0]
+            if not block and not all(f.done() for f in futures):
+                return
+            pending_marks.pop(0)
+            written = 0
+            for future in futures:
+                try:
+                    future.result()
+                    written += 1
+                except Exception as e:
+                    self._log(f"  ⚠️ Kênh {cid}: {e}")
+                    write_failed = True
+            if written:
+                self._log(f"  💾 Kênh {cid}: đã ghi {written} dòng vào sheet")
+            if newest and newest.get("created_time") and not write_failed:
+                scan_state[cid] = {
+                    "created_time": int(newest["created_time"]),
+                    "video_id": newest.get("id"),
+                }
+                self._save_scan_state(scan_state)
+
+    def _scan_channel(self, cid: str, watermark: dict, existing_ids: set) -> dict:
+        """Quét 1 kênh (chạy trên thread pool), không ghi sheet.
+
+        Returns:
+            dict với entries (đã sort theo (Tên phim, Tập)), newest (video mới
+            nhất để cập nhật watermark), failed, total, elapsed (giây)
+        """
+        from datetime import datetime as _dt
+        import re as _re
 
-                    entries.append(
-                        (film_name, episode, video_url, embed_url, upload_date, vid)
-                    )
+        started = time.monotonic()
+        self._log(f"🔍 Đang quét kênh: {cid}")
+        # Chỉ lấy video mới hơn watermark lần quét trước (list sort=recent)
+        wm_time = watermark.get("created_time")
+        wm_id = watermark.get("video_id")
+
+        # Gom tất cả entry mới rồi sort theo (Tên phim, Tập) trước khi ghi sheet
+        entries = []  # mỗi entry: (film_name, episode, video_url, embed_url, upload_date, vid)
+        matched = []  # mỗi item: (video, film_name, episode)
+        failed = False
+        total = 0
+        newest = None  # video mới nhất (để cập nhật watermark)
+
+        # Duyệt lazy từng page (prefetch page kế tiếp), chỉ giữ lại video match
+        videos = self.dm_api.iter_user_videos(
+            cid,
+            fields=SCAN_VIDEO_FIELDS,
+            # -1 để không bỏ sót video upload cùng giây với watermark
+            created_after=int(wm_time) - 1 if wm_time else None,
+            stop_at_id=wm_id,
+            prefetch=True,
+        )
+        for v in islice(videos, 1000):
+            total += 1
+            if int(v.get("created_time") or 0) > int((newest or {}).get("created_time") or 0):
+                newest = v
+            vid = v.get("id")
+            title = v.get("title", "")
+
+            # Chỉ lấy video có pattern: final-<tên phim>-partX hoặc final-<tên phim>-partX-daily.mp4
+            # Pattern match cả 2 format: final-*-part* và final-*-part*-daily.mp4
+            m = _re.search(r"^final-(.+?)-part(\d+)(?:-daily)?(?:\.mp4)?$", title, _re.IGNORECASE)
+            if not m:
+                # Log video không match pattern để debug
+                self._log(f"  ⏭️  [{cid}] Bỏ qua video {vid}: không match pattern (title: {title[:50]}...)")
+                continue
 
-                # Sort theo tên phim + số tập
-                entries.sort(key=lambda x: (x[0], x[1]))
+            film_name = m.group(1).strip()
+            try:
+                episode = int(m.group(2))
+            except Exception:
+                episode = 0
+            matched.append((v, film_name, episode))
+
+        if watermark:
+            self._log(f"   → [{cid}] Tìm thấy {total} video mới kể từ lần quét trước (PUBLIC)")
+        else:
+            self._log(f"   → [{cid}] Tìm thấy {total} video (PUBLIC)")
+
+        # Listing đã có sẵn embed_url/url/created_time, chỉ lấy info
+        # (batch) cho những video còn thiếu field (fallback)
+        fallback_ids = [
+            v.get("id") for v, _, _ in matched
+            if any(not v.get(f) for f in ("url", "embed_url", "created_time"))
+        ]
+        needs_fallback = set(fallback_ids)
+        fallback_info = {}
+        if fallback_ids:
+            try:
+                result = self.dm_api.get_videos_info(fallback_ids)
+                fallback_info = result["videos"]
+                for vid in result["missing"]:
+                    self._log(f"  ❌ [{cid}] Không lấy được info video {vid}")
+                    failed = True
+            except Exception as e:
+                self._log(f"  ❌ [{cid}] Lỗi lấy info {len(fallback_ids)} video: {e}")
+                failed = True
+
+        for v, film_name, episode in matched:
+            vid = v.get("id")
+            info = v
+            if vid in needs_fallback:
+                if vid not in fallback_info:
+                    continue
+                info = fallback_info[vid]
+
+            video_url = info.get("url") or v.get("url", "")
+            embed_url = info.get("embed_url", "")
+            created_time = info.get("created_time") or v.get("created_time", "")
+
+            # Bỏ qua nếu video đã tồn tại trong sheet
+            if vid in existing_ids:
+                self._log(f"  ⏭️  [{cid}] Bỏ qua video {vid}: đã có trong Sheet")
+                continue
 
-                # Ghi vào sheet theo thứ tự đã sort
-                for film_name, episode, video_url, embed_url, upload_date, vid in entries:
-                    self._log(f"  ➕ {film_name} - Tập {episode} ({vid})")
-                    try:
-                        self.sheet_manager.add_channel_video_record(
-                            film_name=film_name,
-                            episode_number=episode,
-                            video_url=video_url,
-                            embed_url=embed_url,
-                            channel_id=cid,
-                            upload_date=upload_date or _dt.now().strftime("%Y-%m-%d"),
-                        )
-                        if video_url:
-                            existing_urls.add(video_url.strip())
-                    except Exception as e:
-                        self._log(f"  ⚠️ Lỗi khi lưu video {vid} vào sheet: {e}")
-                        continue
+            # Format ngày
+            upload_date = ""
+            if created_time:
+                try:
+                    dt = _dt.fromtimestamp(int(created_time))
+                    upload_date = dt.strftime("%Y-%m-%d")
+                except Exception:
+                    upload_date = str(created_time)
+
+            entries.append(
+                (film_name, episode, video_url, embed_url, upload_date, vid)
+            )
 
-            except Exception as e:
-                self._log(f"❌ Lỗi khi quét kênh {cid}: {e}")
+        # Sort theo tên phim + số tập
+        entries.sort(key=lambda x: (x[0], x[1]))
 
-        self._log("✅ Quét kênh hoàn tất.")
+        return {
+            "entries": entries,
+            "newest": newest,
+            "failed": failed,
+            "total": total,
+            "elapsed": time.monotonic() - started,
+        }
 
     def _scan_worker(self):
         """Thread quét kênh định kỳ."""
@@ -637,12 +820,34 @@ class DailymotionHelperGUI:
     # ---------------------------------------------------------------------
 
     def _log(self, msg: str):
-        self.log_text.config(state=tk.NORMAL)
+        """Ghi log (gọi được từ mọi thread).
+
+        Tkinter chỉ an toàn trên main thread, nên log từ thread khác được đưa
+        vào hàng đợi và main thread ghi ra widget (_poll_log_queue).
+        """
         ts = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{ts}] {msg}\n")
+        self._log_queue.put(f"[{ts}] {msg}\n")
+        if threading.current_thread() is threading.main_thread():
+            self._flush_log_queue()
+
+    def _flush_log_queue(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self._log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not lines:
+            return
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.insert(tk.END, "".join(lines))
         self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
 
+    def _poll_log_queue(self):
+        self._flush_log_queue()
+        self.root.after(100, self._poll_log_queue)
+
 
 def main():
     root = tk.Tk()
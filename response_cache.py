@@ -0,0 +1,209 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+from urllib.parse import urlencode
+
+
+class MemoryCacheBackend:
+    """Cache LRU trong bộ nhớ (thread-safe)"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCacheBackend:
+    """Cache lưu trên đĩa bằng SQLite (giữ được giữa các lần chạy app)"""
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def set(self, key: str, entry: Dict):
+        value = json.dumps(entry, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, updated) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            # Giới hạn kích thước: thỉnh thoảng xóa các entry cũ nhất
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key NOT IN "
+                    "(SELECT key FROM cache ORDER BY updated DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def delete_prefix(self, prefix: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Cache response GET của Dailymotion API
+
+    - Lớp 1: LRU trong bộ nhớ; lớp 2 (tùy chọn): SQLite trên đĩa
+    - TTL theo loại endpoint (video, playlist, playlist_videos, ...)
+    - Entry hết hạn nhưng có ETag → caller revalidate bằng If-None-Match
+    - Nhiều thread cùng hỏi 1 key chưa có trong cache → chỉ 1 request thực sự
+    """
+
+    DEFAULT_TTLS = {
+        'video': 24 * 3600,         # embed_url/url/thumbnail gần như không đổi
+        'playlist': 10 * 60,
+        'playlist_videos': 10 * 60,
+    }
+    DEFAULT_TTL = 5 * 60
+
+    def __init__(self, disk_path: str = None, ttls: Dict[str, float] = None,
+                 max_entries: int = 2048):
+        """
+        Args:
+            disk_path: File SQLite để lưu cache trên đĩa (None = chỉ dùng bộ nhớ)
+            ttls: TTL (giây) theo endpoint, ghi đè DEFAULT_TTLS
+            max_entries: Số entry tối đa của LRU trong bộ nhớ
+        """
+        self.memory = MemoryCacheBackend(max_entries)
+        self.disk = SQLiteCacheBackend(disk_path) if disk_path else None
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'coalesced': 0}
+
+    @staticmethod
+    def make_key(url: str, params: Dict = None) -> str:
+        """Key = URL + query params đã sort"""
+        if not params:
+            return url + '?'
+        return url + '?' + urlencode(sorted((k, str(v)) for k, v in params.items()))
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Lấy entry {'data', 'etag', 'expires_at'} (có thể đã hết hạn)"""
+        entry = self.memory.get(key)
+        if entry is None and self.disk:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    def get_fresh(self, key: str):
+        """Trả về bản sao data nếu entry còn hạn, ngược lại None"""
+        entry = self.get(key)
+        if entry is not None and entry.get('expires_at', 0) > time.time():
+            self._count('hits')
+            return copy.deepcopy(entry['data'])
+        self._count('misses')
+        return None
+
+    def set(self, key: str, data, endpoint: str, etag: str = None):
+        entry = {
+            'data': copy.deepcopy(data),
+            'etag': etag,
+            'expires_at': time.time() + self.ttls.get(endpoint, self.DEFAULT_TTL),
+        }
+        self.memory.set(key, entry)
+        if self.disk:
+            self.disk.set(key, entry)
+
+    def touch(self, key: str, entry: Dict, endpoint: str):
+        """Gia hạn entry sau khi server trả 304 Not Modified, trả về bản sao data"""
+        self._count('revalidated')
+        self.set(key, entry['data'], endpoint, entry.get('etag'))
+        return copy.deepcopy(entry['data'])
+
+    def coalesce(self, key: str, fn: Callable):
+        """Chạy fn() cho key; các thread gọi cùng key trong lúc đó dùng chung kết quả"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            self._count('coalesced')
+            return copy.deepcopy(future.result())
+        try:
+            result = fn()
+            future.set_result(result)
+            # Caller sửa kết quả cũng không ảnh hưởng các thread đang chờ cùng key
+            return copy.deepcopy(result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self, prefix: str):
+        """Xóa mọi entry có key bắt đầu bằng prefix"""
+        self.memory.delete_prefix(prefix)
+        if self.disk:
+            self.disk.delete_prefix(prefix)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from batch_upload import BatchUploader, UploadJournal
+
+
+def make_video(tmp_path, name='Tap 01.mp4', data=b'video'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def make_item(path, episode=1):
+    return {'file': path, 'film_name': 'Phim', 'episode': episode, 'title': f"Tập {episode} - Phim"}
+
+
+def test_journal_survives_restart(tmp_path):
+    path = str(tmp_path / 'journal.json')
+    journal = UploadJournal(path)
+    journal.update('a.mp4', stage='uploaded', file_url='https://upload/a')
+    journal.update('a.mp4', force_save=False, resume_state={'offset': 10})
+
+    reloaded = UploadJournal(path)
+    assert reloaded.get('a.mp4')['stage'] == 'uploaded'
+    assert reloaded.get('a.mp4')['file_url'] == 'https://upload/a'
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_journal_rejects_corrupt_file(tmp_path):
+    path = tmp_path / 'journal.json'
+    path.write_text('{not json', encoding='utf-8')
+    with pytest.raises(Exception, match="Lỗi khi đọc journal"):
+        UploadJournal(str(path))
+
+
+@pytest.mark.parametrize("saved, expected", [
+    ({'stage': 'published', 'video_id': 'x1'}, 'published'),
+    ({'stage': 'uploaded', 'file_url': 'https://upload/a'}, 'uploaded'),
+    ({'stage': 'failed', 'file_url': 'https://upload/a', 'video_id': 'x1'}, 'created'),
+    ({'stage': 'failed', 'file_url': 'https://upload/a'}, 'uploaded'),
+    ({'stage': 'failed', 'resume_state': {'offset': 10}}, 'pending'),
+])
+def test_resume_from_journal_stage(tmp_path, saved, expected):
+    video = make_video(tmp_path)
+    journal_path = str(tmp_path / 'journal.json')
+    journal = UploadJournal(journal_path)
+    journal.update(video, size=os.path.getsize(video), mtime=int(os.path.getmtime(video)), **saved)
+
+    uploader = BatchUploader(api=None, journal_path=journal_path)
+    entry = uploader._prepare_entry(make_item(video))
+    assert entry['stage'] == expected
+    if expected == 'pending':
+        # Upload dở vẫn giữ resume_state để upload tiếp
+        assert entry['resume_state'] == {'offset': 10}
+
+
+def test_changed_file_restarts_upload(tmp_path):
+    video = make_video(tmp_path)
+    journal_path = str(tmp_path / 'journal.json')
+    UploadJournal(journal_path).update(video, stage='published', size=1, mtime=0, video_id='x1')
+
+    entry = BatchUploader(api=None, journal_path=journal_path)._prepare_entry(make_item(video))
+    assert entry['stage'] == 'pending'
+    assert entry['resume_state'] == {}
+
+
+def test_load_items_sorts_text_episodes_last(tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'film_name': 'Phim', 'items': [
+        {'file': 'full.mp4', 'episode': 'FULL'},
+        {'file': 'Tập 10.mp4'},
+        {'file': 'Tập 2.mp4'},
+        {'file': 'Trailer 1080p 2024.mp4'},
+    ]}), encoding='utf-8')
+    items = BatchUploader.load_items(str(manifest))
+    assert [item['episode'] for item in items] == [2, 10, '', 'FULL']
+    assert items[2]['title'] == 'Phim'
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("gspread")
+
+from google_sheet import GoogleSheetManager  # noqa: E402
+
+
+@pytest.mark.parametrize("updated_range, expected", [
+    ("'Sheet4'!A1235:P1236", 1235),
+    ("Sheet4!A2:P2", 2),
+    ("'Phim mới'!$A$17:$P$20", 17),
+    ("'Sheet!4'!B9:C9", 9),
+    ("'Sheet4'!A:P", None),
+])
+def test_appended_row_number(updated_range, expected):
+    response = {'updates': {'updatedRange': updated_range}}
+    assert GoogleSheetManager._appended_row_number(response) == expected
+
+
+@pytest.mark.parametrize("response", [None, {}, {'updates': {}}, "ok"])
+def test_appended_row_number_unreadable(response):
+    assert GoogleSheetManager._appended_row_number(response) is None
+
+
+def test_trim_rows_matches_sheets_api():
+    rows = [['a', '', None], [1, 2.5], ['', ''], []]
+    assert GoogleSheetManager._trim_rows(rows) == [['a'], ['1', '2.5']]
@@ -0,0 +1,50 @@
+import pytest
+
+from dailymotion_api import DailymotionAPI
+
+CURRENT = [f"x{i}" for i in range(10)]
+
+
+@pytest.mark.parametrize("desired, chunk_size, mode", [
+    (CURRENT, 100, 'noop'),
+    (CURRENT + ['y1'], 100, 'append'),
+    # Thêm nhiều video: replace 1 request rẻ hơn thêm từng video
+    (CURRENT + ['y1', 'y2'], 100, 'replace'),
+    (CURRENT[:5] + CURRENT[6:], 100, 'remove'),
+    (CURRENT[1:] + CURRENT[:1], 100, 'replace'),
+    (CURRENT[:5] + ['y1'], 100, 'replace'),
+    ([], 100, 'remove'),
+])
+def test_sync_plan_mode(desired, chunk_size, mode):
+    assert DailymotionAPI._sync_plan(CURRENT, desired, chunk_size)['mode'] == mode
+
+
+def test_sync_plan_remove_costs_chunks():
+    desired = CURRENT[:2]
+    # 8 video bị xóa = 3 request DELETE (chunk 3) > 1 request replace
+    assert DailymotionAPI._sync_plan(CURRENT, desired, 3)['mode'] == 'replace'
+    assert DailymotionAPI._sync_plan(CURRENT, desired, 8)['mode'] == 'remove'
+
+
+def test_sync_plan_lists_changes():
+    plan = DailymotionAPI._sync_plan(CURRENT, ['y1'] + CURRENT[2:], 100)
+    assert plan['added'] == ['y1']
+    assert plan['removed'] == ['x0', 'x1']
+
+
+def test_replace_plan_sends_cumulative_prefix():
+    ids = [f"v{i}" for i in range(5)]
+    steps = DailymotionAPI._replace_plan(ids, 2)
+    assert [step['ids'] for step in steps] == [ids[:2], ids[:4], ids]
+    assert [step['new'] for step in steps] == [ids[0:2], ids[2:4], ids[4:]]
+    assert DailymotionAPI._replace_cost(len(ids), 2) == len(steps)
+    assert DailymotionAPI._replace_cost(0, 2) == 1
+
+
+def test_mark_replace_failed():
+    ids = [f"v{i}" for i in range(5)]
+    steps = DailymotionAPI._replace_plan(ids, 2)
+    results = dict.fromkeys(steps[0]['new'], 'ok')
+    DailymotionAPI._mark_replace_failed(results, steps, 1, 'lỗi: 500')
+    assert results == {'v0': 'ok', 'v1': 'ok', 'v2': 'lỗi: 500', 'v3': 'lỗi: 500',
+                       'v4': 'chưa gửi'}
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from response_cache import ResponseCache
+
+URL = "https://api.dailymotion.com/video/x1"
+
+
+def test_make_key_sorts_params():
+    assert ResponseCache.make_key(URL, {'b': 2, 'a': 1}) == ResponseCache.make_key(URL, {'a': '1', 'b': '2'})
+    assert ResponseCache.make_key(URL) == URL + '?'
+
+
+def test_ttl_per_endpoint(monkeypatch):
+    cache = ResponseCache(ttls={'playlist': 60})
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now)
+    cache.set('video', {'id': 'x1'}, 'video')
+    cache.set('playlist', {'id': 'p1'}, 'playlist')
+
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    assert cache.get_fresh('video') == {'id': 'x1'}
+    assert cache.get_fresh('playlist') is None
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+
+def test_expired_entry_keeps_etag_for_revalidation(monkeypatch):
+    cache = ResponseCache(ttls={'video': 10})
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now)
+    cache.set('k', {'id': 'x1'}, 'video', etag='"abc"')
+
+    monkeypatch.setattr(time, 'time', lambda: now + 60)
+    assert cache.get_fresh('k') is None
+    entry = cache.get('k')
+    assert entry['etag'] == '"abc"'
+
+    # Server trả 304 → gia hạn entry, giữ ETag
+    assert cache.touch('k', entry, 'video') == {'id': 'x1'}
+    assert cache.get_fresh('k') == {'id': 'x1'}
+    assert cache.get('k')['etag'] == '"abc"'
+    assert cache.stats['revalidated'] == 1
+
+
+def test_returns_copies():
+    cache = ResponseCache()
+    data = {'list': [1]}
+    cache.set('k', data, 'video')
+    data['list'].append(2)
+    cache.get_fresh('k')['list'].append(3)
+    assert cache.get_fresh('k') == {'list': [1]}
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResponseCache(disk_path=path)
+    cache.set('k', {'id': 'x1'}, 'video', etag='"abc"')
+    cache.disk.close()
+
+    reopened = ResponseCache(disk_path=path)
+    assert reopened.get_fresh('k') == {'id': 'x1'}
+    reopened.invalidate(URL)
+    reopened.set(URL + '?fields=id', {'id': 'x1'}, 'video')
+    reopened.invalidate(URL)
+    assert reopened.get(URL + '?fields=id') is None
+    assert reopened.get('k') is not None
+    reopened.disk.close()
+
+
+def test_coalesce_runs_once_per_key():
+    cache = ResponseCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'id': 'x1'}
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.coalesce('k', fetch)))
+    owner.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.coalesce('k', fetch)))
+               for _ in range(3)]
+    for t in waiters:
+        t.start()
+    deadline = time.monotonic() + 5
+    while cache.stats['coalesced'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in [owner] + waiters:
+        t.join(5)
+    assert calls == [1]
+    assert results == [{'id': 'x1'}] * 4
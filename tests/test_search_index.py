@@ -0,0 +1,55 @@
+from export_sheet_to_json import SEARCH_PREFIX_MAX, build_search_index, normalize_search
+
+
+def lookup(index, query):
+    """Tra cứu giống phía trang web (xem docstring build_search_index)"""
+    result = None
+    for word in normalize_search(query).split():
+        grams = [word[j:j + 3] for j in range(len(word) - 2)]
+        by_gram = None
+        for gram in grams:
+            ids = set(index['trigrams'].get(gram, []))
+            by_gram = ids if by_gram is None else by_gram & ids
+        found = set(by_gram or [])
+        if len(word) <= index['prefixMax']:
+            found |= set(index['prefixes'].get(word, []))
+        result = found if result is None else result & found
+    return sorted(result or [])
+
+
+MOVIES = [
+    {'name': '武神主宰', 'vietName': 'Võ Thần Chúa Tể'},
+    {'name': 'Đấu Phá Thương Khung', 'vietName': 'Đấu Phá Thương Khung'},
+    {'name': 'Supercalifragilistic Adventures', 'vietName': ''},
+]
+
+
+def test_prefixes_ignore_diacritics_and_case():
+    index = build_search_index(MOVIES)
+    assert index['count'] == 3
+    assert index['prefixMax'] == SEARCH_PREFIX_MAX
+    assert lookup(index, 'vo than') == [0]
+    assert lookup(index, 'ĐẤU PHÁ') == [1]
+    assert lookup(index, 'thu') == [1]
+
+
+def test_cjk_substring_search():
+    index = build_search_index(MOVIES)
+    assert lookup(index, '主宰') == [0]
+    assert lookup(index, '神主') == [0]
+
+
+def test_trigrams_only_for_long_tokens():
+    index = build_search_index(MOVIES)
+    assert lookup(index, 'fragilistic') == [2]
+    assert lookup(index, 'califrag') == [2]
+    # Từ ngắn hơn prefixMax đã có đủ tiền tố, không sinh trigram
+    assert 'ven' not in index['trigrams']
+    assert lookup(index, 'xyz') == []
+
+
+def test_postings_sorted_and_deterministic():
+    index = build_search_index(MOVIES + MOVIES)
+    assert index['prefixes']['vo'] == [0, 3]
+    assert list(index['prefixes']) == sorted(index['prefixes'])
+    assert build_search_index(MOVIES) == build_search_index(MOVIES)
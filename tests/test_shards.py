@@ -0,0 +1,69 @@
+import json
+import os
+
+import export_sheet_to_json as export
+from export_sheet_to_json import build_shards, write_shards
+
+
+def movie(name, viet_name, episodes=2):
+    return {
+        'name': name,
+        'vietName': viet_name,
+        'poster': f"https://img.example/{viet_name}.jpg",
+        'top': False,
+        'episodes': [{'episode': i + 1, 'url': f"https://dm.example/{name}/{i}"}
+                     for i in range(episodes)],
+    }
+
+
+def output(*movies):
+    return {'movies': list(movies), 'banners': [], 'updated': '2026-10-18 10:00'}
+
+
+def test_build_shards_catalog_and_files():
+    catalog, files = build_shards(output(movie('武神主宰', 'Võ Thần Chúa Tể', 3)), 'movies')
+    entry = catalog['movies'][0]
+    assert entry['episodes'] == 3
+    assert entry['file'].startswith('movies/vo-than-chua-te.')
+    assert 'episodes' in json.loads(files[entry['file']])
+    assert catalog['updated'] == '2026-10-18 10:00'
+
+
+def test_shard_name_follows_content():
+    first, _ = build_shards(output(movie('A', 'Phim A')))
+    same, _ = build_shards(output(movie('A', 'Phim A')))
+    changed, _ = build_shards(output(movie('A', 'Phim A', episodes=3)))
+    assert first['movies'][0]['file'] == same['movies'][0]['file']
+    assert first['movies'][0]['file'] != changed['movies'][0]['file']
+
+
+def test_slug_falls_back_to_name():
+    catalog, _ = build_shards(output(movie('Some Film', ''), movie('武神', '')))
+    assert catalog['movies'][0]['file'].startswith('movies/some-film.')
+    assert catalog['movies'][1]['file'].startswith('movies/phim.')
+
+
+def test_write_shards_removes_stale_after_catalog(tmp_path, monkeypatch):
+    shard_dir = str(tmp_path / 'movies')
+    catalog_path = str(tmp_path / 'catalog.json')
+    stats = write_shards(output(movie('A', 'Phim A'), movie('B', 'Phim B')),
+                         catalog_path, shard_dir)
+    assert (stats['written'], stats['kept'], stats['removed']) == (2, 0, 0)
+
+    new_output = output(movie('A', 'Phim A'), movie('B', 'Phim B', episodes=5))
+    new_catalog, _ = build_shards(new_output, shard_dir)
+    remove = os.remove
+
+    def checked_remove(path):
+        # File cũ chỉ bị xóa khi catalog (và bản .min) đã trỏ sang file mới
+        with open(catalog_path, encoding='utf-8') as f:
+            assert json.load(f) == new_catalog
+        with open(export.compact_variants(catalog_path)[0], encoding='utf-8') as f:
+            assert json.load(f) == new_catalog
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', checked_remove)
+    stats = write_shards(new_output, catalog_path, shard_dir)
+    assert (stats['written'], stats['kept'], stats['removed']) == (1, 1, 1)
+    assert sorted(os.listdir(shard_dir)) == sorted(
+        os.path.basename(entry['file']) for entry in new_catalog['movies'])
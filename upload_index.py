@@ -0,0 +1,201 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+# Kích thước mỗi đoạn khi hash file (mỗi đoạn hash ở 1 process riêng)
+HASH_CHUNK_SIZE = 64 * 1024 * 1024
+# File nhỏ hơn ngưỡng này hash ngay trong process hiện tại (khỏi tốn chi phí spawn)
+PARALLEL_HASH_MIN_SIZE = 256 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+def _hash_range(path: str, offset: int, length: int) -> str:
+    """Hash 1 đoạn [offset, offset+length) của file (chạy trong process pool)"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            h.update(data)
+            remaining -= len(data)
+    return h.hexdigest()
+
+
+class UploadIndex:
+    """Chỉ mục nội dung file đã upload → video Dailymotion đã tạo
+
+    - Fingerprint = blake2b của danh sách hash từng đoạn 64 MB + kích thước file;
+      file lớn được hash song song trên process pool
+    - Cache fingerprint theo (đường dẫn, size, mtime) nên chạy lại không hash lại
+    - Export/import phần fingerprint → video để dùng chung giữa các máy
+    """
+
+    def __init__(self, path: str = "upload_index.json", hash_workers: int = None):
+        """
+        Args:
+            path: File JSON lưu chỉ mục
+            hash_workers: Số process hash song song (None = số CPU)
+        """
+        self.path = path
+        self.hash_workers = hash_workers
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.videos: Dict[str, Dict] = {}   # fingerprint → {video_id, url, embed_url, ...}
+        self.files: Dict[str, Dict] = {}    # đường dẫn → {size, mtime, fingerprint}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.videos = data.get('videos', {})
+                self.files = data.get('files', {})
+            except (OSError, ValueError) as e:
+                raise Exception(f"Lỗi khi đọc upload index {path}: {e}")
+
+    # ------------------------------------------------------------------
+    # Fingerprint
+    # ------------------------------------------------------------------
+    def fingerprint_file(self, file_path: str) -> str:
+        """Fingerprint nội dung file (dùng cache nếu file không đổi)"""
+        file_path = os.path.abspath(file_path)
+        size = os.path.getsize(file_path)
+        mtime = int(os.path.getmtime(file_path))
+        with self._lock:
+            cached = self.files.get(file_path)
+        if cached and cached.get('size') == size and cached.get('mtime') == mtime:
+            return cached['fingerprint']
+
+        ranges = [(offset, min(HASH_CHUNK_SIZE, size - offset))
+                  for offset in range(0, size, HASH_CHUNK_SIZE)] or [(0, 0)]
+        if size >= PARALLEL_HASH_MIN_SIZE:
+            pool = self._get_pool()
+            futures = [pool.submit(_hash_range, file_path, o, n) for o, n in ranges]
+            digests = [f.result() for f in futures]
+        else:
+            digests = [_hash_range(file_path, o, n) for o, n in ranges]
+
+        h = hashlib.blake2b(digest_size=20)
+        h.update(str(size).encode())
+        for d in digests:
+            h.update(bytes.fromhex(d))
+        fingerprint = f"{size}-{h.hexdigest()}"
+
+        with self._lock:
+            self.files[file_path] = {'size': size, 'mtime': mtime, 'fingerprint': fingerprint}
+            self._save_locked()
+        return fingerprint
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.hash_workers)
+            return self._pool
+
+    # ------------------------------------------------------------------
+    # Tra cứu / ghi
+    # ------------------------------------------------------------------
+    def lookup(self, fingerprint: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self.videos.get(fingerprint)
+            return dict(entry) if entry else None
+
+    def lookup_file(self, file_path: str) -> Optional[Dict]:
+        return self.lookup(self.fingerprint_file(file_path))
+
+    def record(self, fingerprint: str, video: Dict, file_path: str = None):
+        """Ghi nhận fingerprint đã có video trên Dailymotion"""
+        with self._lock:
+            self.videos[fingerprint] = {
+                'video_id': video.get('video_id') or video.get('id'),
+                'url': video.get('url'),
+                'embed_url': video.get('embed_url'),
+                'title': video.get('title'),
+                'file_name': os.path.basename(file_path) if file_path else None,
+                'recorded_at': int(time.time()),
+            }
+            self._save_locked()
+
+    def forget(self, fingerprint: str):
+        """Xóa fingerprint (vd: video đã bị xóa trên Dailymotion)"""
+        with self._lock:
+            if self.videos.pop(fingerprint, None) is not None:
+                self._save_locked()
+
+    # ------------------------------------------------------------------
+    # Export / import
+    # ------------------------------------------------------------------
+    def export(self, path: str) -> int:
+        """Xuất fingerprint → video ra file JSON (không gồm đường dẫn file của máy này)"""
+        with self._lock:
+            data = {'videos': dict(self.videos), 'exported_at': int(time.time())}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return len(data['videos'])
+
+    def import_file(self, path: str, overwrite: bool = False) -> int:
+        """Nhập chỉ mục từ máy khác, trả về số fingerprint được thêm/cập nhật"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                videos = json.load(f).get('videos', {})
+        except (OSError, ValueError, AttributeError) as e:
+            raise Exception(f"Lỗi khi đọc file import {path}: {e}")
+        added = 0
+        with self._lock:
+            for fingerprint, video in videos.items():
+                if overwrite or fingerprint not in self.videos:
+                    self.videos[fingerprint] = video
+                    added += 1
+            if added:
+                self._save_locked()
+        return added
+
+    def _save_locked(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'videos': self.videos, 'files': self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quản lý chỉ mục file đã upload")
+    parser.add_argument("--index", default="upload_index.json")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="Xuất chỉ mục ra file")
+    p.add_argument("output")
+    p = sub.add_parser("import", help="Nhập chỉ mục từ file")
+    p.add_argument("input")
+    p.add_argument("--overwrite", action="store_true")
+    p = sub.add_parser("check", help="Kiểm tra file đã được upload chưa")
+    p.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    index = UploadIndex(args.index)
+    try:
+        if args.command == "export":
+            print(f"✅ Đã xuất {index.export(args.output)} video ra {args.output}")
+        elif args.command == "import":
+            print(f"✅ Đã nhập {index.import_file(args.input, args.overwrite)} video từ {args.input}")
+        else:
+            for path in args.files:
+                hit = index.lookup_file(path)
+                status = f"đã upload → {hit['video_id']}" if hit else "chưa upload"
+                print(f"{os.path.basename(path)}: {status}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()